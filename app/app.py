@@ -1,31 +1,119 @@
 """FastAPI web application for RAG system."""
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Literal, Awaitable, Callable
+from contextlib import asynccontextmanager, aclosing, suppress
+import asyncio
+import json
+import time
 
-from src.config import PERSIST_DIR, TOP_K
-from src.store import get_client, get_or_create_collection
-from src.rag import retrieve_and_answer
+from src.config import (
+    PERSIST_DIR, TOP_K, ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES, BATCH_CONCURRENCY, BATCH_MAX_QUESTIONS,
+    PREWARM, SESSION_MAX, SESSION_TTL, SESSION_MAX_TURNS,
+    GENERATION_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_QUEUE_TIMEOUT, REQUEST_TIMEOUT
+)
+from src.store import get_collection, collection_version, warm_up
+from src.embed_cache import get_embedding_cache
+from src.answer_cache import AnswerCache
+from src.rag import (
+    retrieve_and_answer_async, retrieve_and_answer_stream_async, answer_many_async,
+    answer_in_session_async, answer_in_session_stream_async
+)
+from src.sessions import Session, SessionStore
+from src.admission import AdmissionController, Rejected, Ticket
+from src.async_ollama import AsyncOllamaClient
+from src import metrics
 
-app = FastAPI(title="Local RAG System", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the pooled Ollama client for the lifetime of the server, prewarmed."""
+    app.state.ollama = AsyncOllamaClient()
+    if PREWARM:
+        await asyncio.to_thread(_prewarm)
+    yield
+    await app.state.ollama.aclose()
+
+def _prewarm():
+    """Open the store, its indexes and the embedding cache before serving."""
+    start = time.perf_counter()
+    try:
+        timings = warm_up(get_collection(PERSIST_DIR))
+        get_embedding_cache()
+    except Exception as e:
+        # A broken store should fail the first request, not the server
+        print(f"Warning: Prewarm failed: {e}")
+        return
+    steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+    print(f"Prewarmed in {time.perf_counter() - start:.2f}s ({steps})")
+
+app = FastAPI(title="Local RAG System", version="1.0.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Record request latency per route (streams: until the response starts)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep the series bounded
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            path=getattr(route, "path", "unmatched"),
+            status=status
+        )
 
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
-# Initialize vector store
-client = get_client(PERSIST_DIR)
-collection = get_or_create_collection(client)
+# Answers to repeated questions, dropped whenever ingestion changes the store
+answer_cache = AnswerCache(
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    version_source=lambda: collection_version(PERSIST_DIR)
+) if ANSWER_CACHE_ENABLED else None
+
+# Multi-turn conversations; /ask and /ask_stream continue one given its ID
+sessions = SessionStore(max_sessions=SESSION_MAX, ttl_seconds=SESSION_TTL, max_turns=SESSION_MAX_TURNS)
+
+# Questions answered at once; the rest wait their turn by priority, or are
+# turned away with 429/503 and a Retry-After when too many are waiting
+admission = AdmissionController(
+    max_active=GENERATION_CONCURRENCY,
+    max_queue=ADMISSION_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT
+)
+
+Priority = Literal["high", "normal", "low"]
 
 class QuestionRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None
+    priority: Priority = "normal"
+    # Seconds the request may take, queueing included (at most REQUEST_TIMEOUT)
+    timeout: Optional[float] = None
+
+class BatchRequest(BaseModel):
+    questions: List[str]
+    priority: Priority = "low"
+    timeout: Optional[float] = None
 
 class AnswerResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
+    session_id: Optional[str] = None
+
+class SessionResponse(BaseModel):
+    session_id: str
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -33,14 +121,38 @@ async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/ask", response_model=AnswerResponse)
-async def ask_question(request: QuestionRequest):
-    """Answer a question using the RAG system."""
+async def ask_question(request: QuestionRequest, http_request: Request):
+    """
+    Answer a question using the RAG system.
+
+    Waits for a generation slot first (429/503 with Retry-After if none is
+    to be had). Answering stops, and Ollama with it, when the client
+    disconnects (499) or the deadline passes (504).
+    """
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
-    
+    session = _session(request.session_id)
+    deadline = _deadline(request.timeout)
+
+    async def answer() -> AnswerResponse:
+        ticket = await _admit(request.priority, deadline)
+        try:
+            if session is not None:
+                answer, sources = await answer_in_session_async(
+                    request.question, session, get_collection(PERSIST_DIR), app.state.ollama, TOP_K
+                )
+                return AnswerResponse(answer=answer, sources=sources, session_id=session.id)
+            answer, sources = await retrieve_and_answer_async(
+                request.question, get_collection(PERSIST_DIR), app.state.ollama, TOP_K, answer_cache
+            )
+            return AnswerResponse(answer=answer, sources=sources)
+        finally:
+            ticket.release()
+
     try:
-        answer, sources = retrieve_and_answer(request.question, collection, TOP_K)
-        return AnswerResponse(answer=answer, sources=sources)
+        return await _until_done(answer(), http_request.receive, deadline)
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the full error for debugging
         import traceback
@@ -48,13 +160,230 @@ async def ask_question(request: QuestionRequest):
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+@app.post("/ask_stream")
+async def ask_question_stream(request: QuestionRequest, http_request: Request):
+    """
+    Answer a question as a Server-Sent Events stream.
+
+    Emits one `sources` event, then a `token` event per piece of the answer,
+    and finally `done` (or `error` if generation fails part-way or the
+    deadline passes). Admission works as for /ask; generation stops when
+    the client disconnects.
+    """
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    session = _session(request.session_id)
+    deadline = _deadline(request.timeout)
+    ticket = await _until_done(_admit(request.priority, deadline), http_request.receive, deadline)
+    
+    async def events():
+        if session is not None:
+            stream = answer_in_session_stream_async(
+                request.question, session, get_collection(PERSIST_DIR), app.state.ollama, TOP_K
+            )
+        else:
+            stream = retrieve_and_answer_stream_async(
+                request.question, get_collection(PERSIST_DIR), app.state.ollama, TOP_K, answer_cache
+            )
+        try:
+            async with aclosing(stream):
+                async for kind, payload in stream:
+                    if kind == "token":
+                        yield _sse("token", {"text": payload})
+                    else:
+                        yield _sse(kind, payload)
+            yield _sse("done", {})
+        except Exception as e:
+            print(f"Error in /ask_stream endpoint: {e}")
+            yield _sse("error", {"detail": f"Internal error: {str(e)}"})
+    
+    return AdmittedStreamingResponse(
+        events(),
+        ticket,
+        deadline,
+        _sse("error", {"detail": "Deadline exceeded"}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/ask_batch")
+async def ask_batch(request: BatchRequest, http_request: Request):
+    """
+    Answer several questions as newline-delimited JSON.
+
+    All questions are retrieved together, answers are generated a few at a
+    time, and each result line is sent as soon as its answer is ready, so
+    lines arrive in completion order; `index` gives the question's position.
+    The batch is admitted as one request, at low priority by default; if the
+    deadline passes, a last line carries an `error` and no `index`.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_MAX_QUESTIONS} questions per request"
+        )
+    
+    deadline = _deadline(request.timeout)
+    ticket = await _until_done(_admit(request.priority, deadline), http_request.receive, deadline)
+    
+    async def lines():
+        results = answer_many_async(
+            request.questions, get_collection(PERSIST_DIR), app.state.ollama, TOP_K, BATCH_CONCURRENCY, answer_cache
+        )
+        async with aclosing(results):
+            async for result in results:
+                yield json.dumps(result) + "\n"
+    
+    return AdmittedStreamingResponse(
+        lines(),
+        ticket,
+        deadline,
+        json.dumps({"error": "Deadline exceeded"}) + "\n",
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/sessions", response_model=SessionResponse)
+async def create_session():
+    """
+    Start a chat session.
+
+    Pass the returned `session_id` with questions to /ask or /ask_stream to
+    answer them as follow-ups of the earlier questions in the session.
+    """
+    return SessionResponse(session_id=sessions.create().id)
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a chat session."""
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"deleted": session_id}
+
+def _session(session_id: Optional[str]) -> Optional[Session]:
+    """The session a request continues, or None for a standalone question."""
+    if session_id is None:
+        return None
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return session
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that holds an admission ticket while it streams.
+
+    The ticket is released when the stream ends, fails or is abandoned,
+    including when it never started. A client that disconnects stops the
+    stream at once, even while no data is being sent (such as while Ollama
+    evaluates the prompt), which closes the Ollama request behind it. At
+    the deadline the stream is stopped the same way and ends with
+    `timeout_chunk`.
+    """
+
+    def __init__(self, content, ticket: Ticket, deadline: float, timeout_chunk: str, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+        self.deadline = deadline
+        self.timeout_chunk = timeout_chunk
+
+    async def __call__(self, scope, receive, send):
+        stream = asyncio.ensure_future(super().__call__(scope, receive, send))
+        watcher = asyncio.ensure_future(_disconnected(receive))
+        try:
+            done, _ = await asyncio.wait(
+                {stream, watcher},
+                timeout=max(0.0, self.deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if stream in done:
+                await stream
+                return
+
+            stream.cancel()
+            with suppress(asyncio.CancelledError):
+                await stream
+            if watcher in done:
+                metrics.ABANDONED_REQUESTS.inc(reason="disconnect")
+            else:
+                metrics.ABANDONED_REQUESTS.inc(reason="deadline")
+                await send({"type": "http.response.body", "body": self.timeout_chunk.encode(), "more_body": False})
+        finally:
+            stream.cancel()
+            watcher.cancel()
+            self.ticket.release()
+
+def _deadline(timeout: Optional[float]) -> float:
+    """time.monotonic() by which a request must finish: its timeout, at most REQUEST_TIMEOUT."""
+    seconds = REQUEST_TIMEOUT if timeout is None or timeout <= 0 else min(timeout, REQUEST_TIMEOUT)
+    return time.monotonic() + seconds
+
+async def _admit(priority: str, deadline: float) -> Ticket:
+    """Wait for a generation slot, turning a rejection into its HTTP error."""
+    try:
+        return await admission.acquire(priority, deadline)
+    except Rejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def _disconnected(receive: Callable[[], Awaitable[Dict[str, Any]]]):
+    """Return once the client has disconnected."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+async def _until_done(work: Awaitable, receive: Callable[[], Awaitable[Dict[str, Any]]], deadline: float):
+    """
+    Await `work`, cancelling it if the client disconnects or the deadline passes.
+
+    Raises:
+        HTTPException: 499 after a disconnect, 504 after the deadline
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_disconnected(receive))
+    try:
+        await asyncio.wait({task, watcher}, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    if not task.cancelled():
+        return task.result()
+    if watcher.done() and not watcher.cancelled():
+        metrics.ABANDONED_REQUESTS.inc(reason="disconnect")
+        # nginx's "client closed request"; nobody is left to read it
+        raise HTTPException(status_code=499, detail="Client closed request")
+    metrics.ABANDONED_REQUESTS.inc(reason="deadline")
+    raise HTTPException(status_code=504, detail="Deadline exceeded")
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.get("/favicon.ico")
 async def favicon():
     """Serve favicon to avoid 404 errors."""
     from fastapi.responses import FileResponse
     return FileResponse("app/static/favicon.ico")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Latency histograms and counters in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    health = {
+        "status": "healthy",
+        "admission": admission.stats(),
+        "sessions": sessions.stats(),
+        "ollama": app.state.ollama.router.stats()
+    }
+    if answer_cache is not None:
+        health["answer_cache"] = answer_cache.stats()
+    if app.state.ollama.query_batcher is not None:
+        health["query_batching"] = app.state.ollama.query_batcher.stats()
+    return health
@@ -0,0 +1,100 @@
+"""
+Chunking throughput and peak memory: the original whole-document chunker
+versus the streaming iter_chunks, on multi-MB synthetic documents fed page
+by page.
+
+Usage:
+    python -m benchmarks.bench_chunking [--sizes-mb 2,8,32] [--max-chars 1100] [--overlap 200]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+from src import chunking
+
+WORDS = ("patient fever neutropenia dose culture antibiotic guideline review "
+         "protocol infusion count therapy response grade").split()
+
+def pages(total_bytes: int, page_bytes: int = 3000, seed: int = 0):
+    """Deterministic pages of sentence-like text, roughly `total_bytes` in all."""
+    rng = random.Random(seed)
+    produced = 0
+    while produced < total_bytes:
+        sentences = []
+        size = 0
+        while size < page_bytes:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 24))]
+            sentence = " ".join(words).capitalize() + rng.choice((".", ".", ".", "?", "!"))
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        page = " ".join(sentences) + "\n"
+        produced += len(page)
+        yield page
+
+def original_chunks(text: str, max_chars: int, overlap: int, tokenizer):
+    """The previous split_into_chunks: whole-text sentence split and string growth."""
+    chunks = []
+    current_chunk = ""
+    for sentence in tokenizer.tokenize(text):
+        if len(current_chunk) + len(sentence) > max_chars and current_chunk:
+            chunks.append(current_chunk.strip())
+            if overlap > 0:
+                current_chunk = current_chunk[-overlap:] + " " + sentence
+            else:
+                current_chunk = sentence
+        else:
+            if current_chunk:
+                current_chunk += " " + sentence
+            else:
+                current_chunk = sentence
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    return chunks
+
+def run_original(size: int, max_chars: int, overlap: int, tokenizer) -> int:
+    text = "".join(pages(size))
+    return len(original_chunks(text, max_chars, overlap, tokenizer))
+
+def run_streaming(size: int, max_chars: int, overlap: int, tokenizer) -> int:
+    return sum(1 for _ in chunking._iter_sentence_chunks(pages(size), tokenizer, max_chars, overlap))
+
+def measure(fn, *args):
+    """Return (result, seconds) from a plain run and peak traced MB from a second run."""
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chunker")
+    parser.add_argument("--sizes-mb", default="2,8,32")
+    parser.add_argument("--max-chars", type=int, default=1100)
+    parser.add_argument("--overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        tokenizer = chunking._get_sentence_tokenizer()
+        source = "punkt english"
+    except LookupError:
+        tokenizer = PunktSentenceTokenizer()
+        source = "untrained punkt (english data not installed)"
+
+    print(f"tokenizer: {source}, max_chars={args.max_chars}, overlap={args.overlap}")
+    print(f"{'MB':>5} {'chunker':<10} {'chunks':>8} {'seconds':>8} {'MB/s':>7} {'peak MB':>8}")
+
+    for size_mb in (float(s) for s in args.sizes_mb.split(",")):
+        size = int(size_mb * 1024 * 1024)
+        for name, fn in (("original", run_original), ("streaming", run_streaming)):
+            count, seconds, peak = measure(fn, size, args.max_chars, args.overlap, tokenizer)
+            print(f"{size_mb:>5g} {name:<10} {count:>8} {seconds:>8.2f} {size_mb / seconds:>7.2f} {peak:>8.1f}")
+
+if __name__ == "__main__":
+    main()
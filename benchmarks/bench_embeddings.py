@@ -0,0 +1,54 @@
+"""
+Embedding throughput by batch size and concurrency, against a local stub server.
+
+Usage:
+    python -m benchmarks.bench_embeddings [--chunks 512] [--dim 768]
+"""
+import argparse
+import time
+
+from benchmarks.fake_ollama import FakeOllama
+from src import embeddings
+from src.ollama_client import OllamaClient
+
+def run(url: str, texts, batch_size: int, concurrency: int) -> float:
+    """Embed `texts` once and return chunks per second."""
+    client = OllamaClient(base_url=url, pool_size=concurrency)
+    embeddings.get_ollama_client = lambda: client
+    embeddings.get_embedding_cache = lambda: None
+    embeddings.EMBED_CONCURRENCY = concurrency
+    embeddings._legacy_endpoint = False
+
+    start = time.perf_counter()
+    vectors = embeddings.embed_texts(texts, batch_size=batch_size, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+
+    assert len(vectors) == len(texts)
+    return len(texts) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding client")
+    parser.add_argument("--chunks", type=int, default=512, help="Texts to embed per run")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--batch-sizes", default="1,8,32,64")
+    parser.add_argument("--concurrency", default="1,4,8")
+    args = parser.parse_args()
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    texts = [f"Synthetic chunk number {i}. " * 20 for i in range(args.chunks)]
+
+    with FakeOllama(dim=args.dim) as fake:
+        print(f"{args.chunks} chunks, dim={args.dim}, stub server at {fake.url}")
+        print(f"{'batch':>6} " + " ".join(f"{f'c={c}':>10}" for c in levels) + "   (chunks/sec)")
+
+        for batch_size in batch_sizes:
+            row = [run(fake.url, texts, batch_size, c) for c in levels]
+            print(f"{batch_size:>6} " + " ".join(f"{r:>10.1f}" for r in row))
+
+    with FakeOllama(dim=args.dim, legacy=True) as fake:
+        rate = run(fake.url, texts[:64], 1, 1)
+        print(f"legacy /api/embeddings, serial: {rate:.1f} chunks/sec")
+
+if __name__ == "__main__":
+    main()
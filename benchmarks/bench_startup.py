@@ -0,0 +1,82 @@
+"""
+Import-time profile of the entry points, each measured in a fresh interpreter.
+
+Heavy dependencies (chromadb, nltk, pypdf, httpx) should only be imported by
+the code paths that use them; this reports how long importing each entry
+module takes and which modules dominate it.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 8]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+MODULES = ("src.config", "src.chunking", "src.store", "src.rag", "src.pipeline", "query", "ingest", "app.app")
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import `module` in a new interpreter with -X importtime.
+
+    Returns:
+        (milliseconds to import the module, {module: self milliseconds})
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+
+    total = 0.0
+    own: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # the header line
+        name = fields[2].strip()
+        own[name] = self_us / 1000
+        if name == module:
+            total = cumulative_us / 1000
+
+    return total, own
+
+def measure(modules=MODULES, runs: int = 5) -> Dict[str, Dict[str, object]]:
+    """Median import time of each module over `runs` fresh interpreters, with its heaviest imports."""
+    results = {}
+    for module in modules:
+        totals: List[float] = []
+        own: Dict[str, List[float]] = {}
+        for _ in range(runs):
+            total, profile = import_profile(module)
+            totals.append(total)
+            for name, ms in profile.items():
+                own.setdefault(name, []).append(ms)
+
+        heaviest = sorted(((statistics.median(v), k) for k, v in own.items()), reverse=True)
+        results[module] = {
+            "import_ms": round(statistics.median(totals), 1),
+            "heaviest": {name: round(ms, 1) for ms, name in heaviest[:8]}
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the entry points")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports listed per module")
+    parser.add_argument("--modules", default=",".join(MODULES))
+    args = parser.parse_args()
+
+    results = measure(args.modules.split(","), args.runs)
+    for module, result in results.items():
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in list(result["heaviest"].items())[:args.top])
+        print(f"{module:<14} {result['import_ms']:>8.1f} ms   ({heaviest})")
+
+if __name__ == "__main__":
+    main()
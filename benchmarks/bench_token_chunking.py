@@ -0,0 +1,62 @@
+"""
+Character versus token-budget chunking on a document folder: chunk counts,
+tokens per chunk, how many chunks overflow the embedding model's context,
+and the /api/embed requests an ingest would make.
+
+Token counts come from TOKENIZER_PATH when it is set, otherwise from the
+approximate counter.
+
+Usage:
+    python -m benchmarks.bench_token_chunking [--folder docs] [--context 2048]
+        [--max-chars 1100] [--overlap 200] [--max-tokens 512] [--token-overlap 64]
+        [--batch-size 32]
+"""
+import argparse
+import math
+import statistics
+from pathlib import Path
+
+from src import chunking, rag
+from src.config import MAX_CHARS, OVERLAP, MAX_TOKENS, TOKEN_OVERLAP, TOKENIZER_PATH, EMBED_BATCH_SIZE
+from src.pipeline import discover_files
+from src.tokenizer import get_token_counter
+
+def document_pieces(file_path: str):
+    if Path(file_path).suffix.lower() == ".pdf":
+        return rag._iter_pdf_text(file_path)
+    return rag._iter_file_text(file_path)
+
+def summarize(name: str, per_file, counter, context: int, batch_size: int):
+    sizes = [counter.count(chunk) for chunks in per_file for chunk in chunks]
+    # ingest_path embeds each file's chunks in batches of EMBED_BATCH_SIZE
+    requests = sum(math.ceil(len(chunks) / batch_size) for chunks in per_file)
+    over = sum(1 for size in sizes if size > context)
+    print(f"{name:<22} {len(sizes):>7} {requests:>9} {sum(sizes):>9} "
+          f"{statistics.mean(sizes) if sizes else 0:>7.0f} {max(sizes, default=0):>6} "
+          f"{over:>6} {100 * statistics.mean(sizes) / context if sizes else 0:>6.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark character vs token chunking")
+    parser.add_argument("--folder", default="docs")
+    parser.add_argument("--context", type=int, default=2048, help="Embedding model context in tokens")
+    parser.add_argument("--max-chars", type=int, default=MAX_CHARS)
+    parser.add_argument("--overlap", type=int, default=OVERLAP)
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS)
+    parser.add_argument("--token-overlap", type=int, default=TOKEN_OVERLAP)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    files = discover_files(args.folder)
+    counter = get_token_counter(TOKENIZER_PATH or None)
+    print(f"{len(files)} files in {args.folder}, {counter.name} token counts, context={args.context}")
+    print(f"{'mode':<22} {'chunks':>7} {'requests':>9} {'tokens':>9} {'mean':>7} {'max':>6} {'over':>6} {'fill':>7}")
+
+    chars = [list(chunking.iter_chunks(document_pieces(f), args.max_chars, args.overlap)) for f in files]
+    tokens = [list(chunking.iter_token_chunks(document_pieces(f), args.max_tokens, args.token_overlap, counter))
+              for f in files]
+
+    summarize(f"chars {args.max_chars}/{args.overlap}", chars, counter, args.context, args.batch_size)
+    summarize(f"tokens {args.max_tokens}/{args.token_overlap}", tokens, counter, args.context, args.batch_size)
+
+if __name__ == "__main__":
+    main()
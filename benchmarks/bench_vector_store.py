@@ -0,0 +1,153 @@
+"""
+Query latency, recall@k and memory of the vector store backends.
+
+Each (backend, size) case is loaded in one process and queried from a fresh
+one, like an ingest run followed by the API server. "query MB" is how much
+the querying process's RSS grew while opening the store and answering the
+queries, i.e. the part of the index a server keeps resident.
+
+Usage:
+    python -m benchmarks.bench_vector_store [--sizes 10000,100000] [--dim 768]
+        [--backends chroma,numpy,numpy-f16,numpy-int8,numpy-pq,numpy-ivf,numpy-ivf-pq]
+        [--queries 200]
+
+Pass --sizes 10000,100000,1000000 for the full comparison; 1M rows of 768-dim
+float32 needs about 3 GB of disk per backend and a long Chroma load.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BACKENDS = {
+    "chroma": None,
+    "numpy": {},
+    "numpy-f16": {"dtype": "float16"},
+    "numpy-int8": {"quantization": "int8"},
+    "numpy-pq": {"quantization": "pq"},
+    "numpy-ivf": {"index": "ivf"},
+    "numpy-ivf-pq": {"index": "ivf", "quantization": "pq"}
+}
+LOAD_BATCH = 5000  # below Chroma's maximum batch size
+
+def corpus_batch(start: int, count: int, dim: int, clusters: int = 256):
+    """Deterministic batch of clustered unit vectors, so every process sees the same corpus."""
+    centers = np.random.default_rng(0).normal(size=(clusters, dim)).astype(np.float32)
+    rng = np.random.default_rng(start + 1)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def exact_neighbours(size: int, dim: int, probe: np.ndarray, k: int):
+    """True top-k IDs for each probe vector, streamed over the corpus in batches."""
+    best_scores = np.full((len(probe), k), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(probe), k), dtype=np.int64)
+
+    for start in range(0, size, LOAD_BATCH):
+        count = min(LOAD_BATCH, size - start)
+        scores = np.concatenate([best_scores, probe @ corpus_batch(start, count, dim).T], axis=1)
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + count), (len(probe), count))], axis=1)
+        top = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_rows = np.take_along_axis(rows, top, axis=1)
+
+    return [{f"c{row}" for row in rows} for rows in best_rows]
+
+def _open(name: str, persist_dir: str):
+    from src.numpy_store import NumpyClient
+    from src.store import get_client
+
+    if BACKENDS[name] is None:
+        client = get_client(persist_dir, backend="chroma")
+    else:
+        client = NumpyClient(persist_dir, **BACKENDS[name])
+    return client.get_or_create_collection(name="bench")
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _dir_size_mb(path: str) -> float:
+    total = sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+    return total / (1024 * 1024)
+
+def load_case(name: str, persist_dir: str, size: int, dim: int) -> float:
+    """Load `size` vectors into a backend and return the load time."""
+    collection = _open(name, persist_dir)
+    start_time = time.perf_counter()
+    for start in range(0, size, LOAD_BATCH):
+        count = min(LOAD_BATCH, size - start)
+        collection.upsert(
+            ids=[f"c{i}" for i in range(start, start + count)],
+            documents=[f"chunk {i}" for i in range(start, start + count)],
+            metadatas=[{"file_path": f"f{i // 100}"} for i in range(start, start + count)],
+            embeddings=corpus_batch(start, count, dim).tolist()
+        )
+    return time.perf_counter() - start_time
+
+def query_case(name: str, persist_dir: str, probe: np.ndarray, truth, k: int) -> dict:
+    """Open an existing store and time single-vector queries against it."""
+    import src.store  # noqa: F401  (imports are not part of the index's footprint)
+    baseline = _rss_mb()
+    collection = _open(name, persist_dir)
+    latencies = []
+    found = 0
+
+    for vector, expected in zip(probe, truth):
+        start = time.perf_counter()
+        results = collection.query(query_embeddings=[vector.tolist()], n_results=k)
+        latencies.append(time.perf_counter() - start)
+        found += len(expected & set(results["ids"][0]))
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "recall": found / (len(probe) * k),
+        "query_mb": _rss_mb() - baseline
+    }
+
+def _in_fresh_process(fn, *args):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(fn, *args).result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"dim={args.dim}, {args.queries} queries, k={args.k}")
+    print(f"{'backend':<13} {'rows':>9} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'recall':>7} {'query MB':>9} {'disk MB':>8}")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        probe = corpus_batch(size + 7, args.queries, args.dim)
+        truth = exact_neighbours(size, args.dim, probe, args.k)
+
+        for name in args.backends.split(","):
+            persist_dir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+            try:
+                load_seconds = _in_fresh_process(load_case, name, persist_dir, size, args.dim)
+                result = _in_fresh_process(query_case, name, persist_dir, probe, truth, args.k)
+                disk_mb = _dir_size_mb(persist_dir)
+            finally:
+                shutil.rmtree(persist_dir, ignore_errors=True)
+
+            print(f"{name:<13} {size:>9} {load_seconds:>8.1f} {result['p50_ms']:>8.2f} "
+                  f"{result['p99_ms']:>8.2f} {result['recall']:>7.3f} {result['query_mb']:>9.0f} {disk_mb:>8.0f}")
+
+if __name__ == "__main__":
+    main()
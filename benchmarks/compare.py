@@ -0,0 +1,82 @@
+"""
+Compare two benchmark suite result files and flag regressions.
+
+A metric regresses when it moved the wrong way by more than the threshold:
+`_per_s` metrics (throughput) should not drop, `_ms` metrics (latency)
+should not rise. Exits with status 1 if anything regressed, so the check
+can gate a CI job.
+
+Usage:
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 15]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Nested results as {"retrieval.5000.p50_ms": 1.2, ...}, numbers only."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None for plain counts."""
+    if metric.endswith(("_per_s", "_per_second")):
+        return 1
+    if metric.endswith("_ms"):
+        return -1
+    return None
+
+def compare(old: Dict, new: Dict, threshold: float):
+    """
+    Yield (metric, old, new, change %, regressed) for metrics present in both runs.
+
+    Args:
+        old: Results of the baseline run
+        new: Results of the run under test
+        threshold: Percent change in the wrong direction tolerated as noise
+    """
+    before = flatten(old.get("results", {}))
+    after = flatten(new.get("results", {}))
+
+    for metric in sorted(before.keys() & after.keys()):
+        better = direction(metric)
+        if better is None:
+            continue
+        change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+        yield metric, before[metric], after[metric], change, change * better < -threshold
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old", help="Baseline results JSON")
+    parser.add_argument("new", help="Results JSON to check")
+    parser.add_argument("--threshold", type=float, default=15.0, help="Tolerated change in percent")
+    args = parser.parse_args()
+
+    with open(args.old, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"{old.get('commit') or args.old} -> {new.get('commit') or args.new} (threshold {args.threshold:g}%)")
+    print(f"{'metric':<44} {'old':>11} {'new':>11} {'change':>8}")
+
+    regressions = 0
+    for metric, before, after, change, regressed in compare(old, new, args.threshold):
+        flag = "  ❌ regression" if regressed else ""
+        regressions += regressed
+        print(f"{metric:<44} {before:>11.2f} {after:>11.2f} {change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} metrics regressed by more than {args.threshold:g}%")
+        sys.exit(1)
+    print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Deterministic synthetic corpus: text and Markdown files of sentence-like prose.
+
+The same seed always produces the same files, so ingestion and retrieval
+numbers from different commits are measured on identical input.
+
+Usage:
+    python -m benchmarks.corpus --out bench_docs [--files 40] [--kb 32] [--seed 0]
+"""
+import argparse
+import os
+import random
+from typing import Iterator, List
+
+TOPICS = ("billing", "firmware", "onboarding", "backup", "networking", "security",
+          "storage", "scheduling", "reporting", "licensing", "monitoring", "search")
+WORDS = ("system request user account device update policy error service report "
+         "customer data server release window access limit default setting value "
+         "configure restart verify enable disable schedule review approve migrate").split()
+
+def sentences(rng: random.Random, topic: str) -> Iterator[str]:
+    """Endless sentences about `topic`, with the odd identifier mixed in."""
+    while True:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 22))]
+        words.insert(rng.randrange(len(words)), topic)
+        if rng.random() < 0.1:
+            words.append(f"{topic[:3].upper()}-{rng.randint(100, 9999)}")
+        yield " ".join(words).capitalize() + rng.choice((".", ".", ".", "?"))
+
+def document(rng: random.Random, topic: str, size: int, markdown: bool) -> str:
+    """One document of roughly `size` characters in paragraphs of 3-8 sentences."""
+    stream = sentences(rng, topic)
+    parts: List[str] = []
+    length = 0
+    section = 1
+
+    if markdown:
+        parts.append(f"# {topic.capitalize()} guide\n")
+    while length < size:
+        if markdown and rng.random() < 0.2:
+            parts.append(f"## {topic.capitalize()} section {section}\n")
+            section += 1
+        paragraph = " ".join(next(stream) for _ in range(rng.randint(3, 8)))
+        parts.append(paragraph + "\n")
+        length += len(paragraph) + 1
+
+    return "\n".join(parts)
+
+def generate_corpus(folder: str, files: int = 40, kb_per_file: int = 32, seed: int = 0) -> List[str]:
+    """
+    Write `files` documents of about `kb_per_file` KB each into `folder`.
+
+    Every third file is Markdown, the rest plain text.
+
+    Returns:
+        Paths of the written files, in order
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+
+    for i in range(files):
+        topic = TOPICS[i % len(TOPICS)]
+        markdown = i % 3 == 2
+        path = os.path.join(folder, f"{topic}_{i:04d}.{'md' if markdown else 'txt'}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(document(rng, topic, kb_per_file * 1024, markdown))
+        paths.append(path)
+
+    return paths
+
+def chunk_texts(count: int, seed: int = 0) -> List[str]:
+    """`count` chunk-sized passages, for loading a store without ingesting files."""
+    rng = random.Random(seed)
+    streams = {topic: sentences(rng, topic) for topic in TOPICS}
+    return [
+        " ".join(next(streams[TOPICS[i % len(TOPICS)]]) for _ in range(rng.randint(4, 9)))
+        for i in range(count)
+    ]
+
+def questions(count: int, seed: int = 1) -> List[str]:
+    """`count` short questions over the corpus vocabulary."""
+    rng = random.Random(seed)
+    return [
+        f"How do I {rng.choice(WORDS)} the {rng.choice(TOPICS)} {rng.choice(WORDS)}?"
+        for _ in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic document corpus")
+    parser.add_argument("--out", required=True, help="Folder to write the documents to")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--kb", type=int, default=32, help="Approximate size of each file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out, args.files, args.kb, args.seed)
+    total = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} files ({total / (1024 * 1024):.1f} MB) to {args.out}")
+
+if __name__ == "__main__":
+    main()
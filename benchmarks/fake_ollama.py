@@ -0,0 +1,191 @@
+"""Minimal local stand-in for the Ollama HTTP API, used by the benchmarks."""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Deterministic unit-length vector derived from the text's sha256."""
+    values = []
+    counter = 0
+
+    while len(values) < dim:
+        digest = hashlib.sha256(f"{counter}:{text}".encode()).digest()
+        values.extend((byte - 127.5) / 127.5 for byte in digest)
+        counter += 1
+
+    values = values[:dim]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is expected, not an error
+        pass
+
+class FakeOllama:
+    """
+    Threaded HTTP server answering /api/embed, /api/embeddings and /api/chat.
+
+    Each embedding request sleeps `request_latency + item_latency * len(inputs)`
+    seconds, which is a rough model of a CPU-bound Ollama embedding worker.
+    Chat responses stream `answer_tokens` NDJSON lines, one every
+    `token_interval` seconds after a `first_token_latency` delay.
+
+    With `prefill_latency` set, chat requests also pay that many seconds per
+    prompt token (4 characters) not shared with one of the `prompt_slots`
+    most recent prompts, which is how Ollama reuses an evaluated prompt
+    prefix while the model stays loaded.
+
+    GET /api/version answers health checks; set `failing` to answer every
+    request with a 503, as a server that is up but broken would.
+    """
+
+    def __init__(
+        self,
+        dim: int = 768,
+        request_latency: float = 0.005,
+        item_latency: float = 0.001,
+        legacy: bool = False,
+        answer_tokens: int = 32,
+        first_token_latency: float = 0.05,
+        token_interval: float = 0.01,
+        prefill_latency: float = 0.0,
+        prompt_slots: int = 4
+    ):
+        self.dim = dim
+        self.request_latency = request_latency
+        self.item_latency = item_latency
+        self.legacy = legacy
+        self.answer_tokens = answer_tokens
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        self.prefill_latency = prefill_latency
+        self.prompt_slots = prompt_slots
+        self._prompts: "OrderedDict[str, None]" = OrderedDict()
+        self.requests = 0
+        self.failing = False
+        self._lock = threading.Lock()
+        self._server = _QuietServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def evaluate_prompt(self, messages) -> int:
+        """Prompt tokens to evaluate for a chat request, remembering it for later prefix reuse."""
+        prompt = "".join(f"<{m.get('role')}>{m.get('content')}" for m in messages)
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, seen])) for seen in self._prompts), default=0)
+            self._prompts[prompt] = None
+            self._prompts.move_to_end(prompt)
+            while len(self._prompts) > self.prompt_slots:
+                self._prompts.popitem(last=False)
+        return (len(prompt) - shared) // 4
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; with Nagle's algorithm
+            # the body would wait ~40 ms for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if fake.failing:
+                    self._send(503, {"error": "unavailable"})
+                elif self.path == "/api/version":
+                    self._send(200, {"version": "0.0.0-fake"})
+                else:
+                    self._send(404, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                with fake._lock:
+                    fake.requests += 1
+
+                if fake.failing:
+                    self._send(503, {"error": "unavailable"})
+                elif self.path == "/api/embed" and not fake.legacy:
+                    inputs = body.get("input", [])
+                    if isinstance(inputs, str):
+                        inputs = [inputs]
+                    time.sleep(fake.request_latency + fake.item_latency * len(inputs))
+                    self._send(200, {
+                        "model": body.get("model"),
+                        "embeddings": [fake_embedding(t, fake.dim) for t in inputs]
+                    })
+                elif self.path == "/api/chat":
+                    self._stream_chat(body)
+                elif self.path == "/api/embeddings":
+                    time.sleep(fake.request_latency + fake.item_latency)
+                    self._send(200, {"embedding": fake_embedding(body.get("prompt", ""), fake.dim)})
+                else:
+                    self._send(404, None)
+
+            def _stream_chat(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                started = time.perf_counter()
+                prompt_tokens = fake.evaluate_prompt(body.get("messages", []))
+                time.sleep(fake.first_token_latency + fake.prefill_latency * prompt_tokens)
+                try:
+                    for i in range(fake.answer_tokens):
+                        if i:
+                            time.sleep(fake.token_interval)
+                        self._chunk({"model": body.get("model"), "message": {"role": "assistant", "content": f"tok{i} "}, "done": False})
+                    eval_ns = int((time.perf_counter() - started) * 1e9)
+                    self._chunk({
+                        "model": body.get("model"),
+                        "message": {"role": "assistant", "content": ""},
+                        "done": True,
+                        "prompt_eval_count": prompt_tokens,
+                        "eval_count": fake.answer_tokens,
+                        "eval_duration": eval_ns
+                    })
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client went away mid-generation
+                    self.close_connection = True
+
+            def _chunk(self, payload):
+                line = json.dumps(payload).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            def _send(self, status: int, payload):
+                data = json.dumps(payload).encode() if payload is not None else b"404 page not found"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json" if payload is not None else "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
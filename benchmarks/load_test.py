@@ -0,0 +1,125 @@
+"""
+Concurrent /ask load test against the API server and a stub Ollama.
+
+Compares the async request path with the previous blocking one (a sync
+retrieve_and_answer called from an async handler) at several concurrency
+levels.
+
+Usage:
+    python -m benchmarks.load_test [--requests 32] [--concurrency 1,4,16]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.fake_ollama import FakeOllama
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def serve_app(app) -> str:
+    """Run `app` under uvicorn in a background thread and return its URL."""
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+def _blocking_app(collection):
+    """The pre-async handler: blocking calls made directly on the event loop."""
+    from fastapi import FastAPI
+    from src.rag import retrieve_and_answer
+
+    app = FastAPI()
+
+    @app.post("/ask")
+    async def ask(payload: dict):
+        answer, sources = retrieve_and_answer(payload["question"], collection, 5)
+        return {"answer": answer, "sources": sources}
+
+    return app
+
+async def run_load(url: str, total: int, concurrency: int):
+    import httpx
+
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        async def one(i: int):
+            async with slots:
+                start = time.perf_counter()
+                response = await client.post("/ask", json={"question": f"What about topic {i % 7}?"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /ask load test")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--tokens", type=int, default=32, help="Tokens per stub answer")
+    args = parser.parse_args()
+
+    with FakeOllama(dim=256, answer_tokens=args.tokens) as fake:
+        os.environ["OLLAMA_URL"] = fake.url
+        os.environ["PERSIST_DIR"] = tempfile.mkdtemp(prefix="rag-load-")
+        os.environ["EMBED_CACHE"] = "0"
+        # Fake embeddings are unrelated to the text, so keep every chunk
+        os.environ["MIN_SCORE"] = "0"
+        # The fake server generates in parallel; measure the handlers, not the limiter
+        os.environ["GENERATION_CONCURRENCY"] = "0"
+
+        from app import app as api
+        from src.embeddings import embed_texts
+        from src.store import add_texts, get_collection
+
+        docs = [f"Topic {i} is discussed in this synthetic paragraph." for i in range(50)]
+        add_texts(
+            get_collection(),
+            [f"doc{i}" for i in range(len(docs))],
+            docs,
+            [{"source": f"doc{i}.txt", "chunk": 1, "file_path": f"doc{i}.txt"} for i in range(len(docs))],
+            embed_texts(docs)
+        )
+
+        targets = {
+            "async": serve_app(api.app),
+            "blocking": serve_app(_blocking_app(get_collection()))
+        }
+
+        print(f"{args.requests} requests per level, {args.tokens}-token answers")
+        print(f"{'mode':<9} {'conc':>5} {'req/s':>8} {'p50 s':>8} {'p99 s':>8}")
+        for mode, url in targets.items():
+            for level in (int(c) for c in args.concurrency.split(",")):
+                result = asyncio.run(run_load(url, args.requests, level))
+                print(f"{mode:<9} {level:>5} {result['rps']:>8.2f} {result['p50']:>8.3f} {result['p99']:>8.3f}")
+
+        import httpx
+        batching = httpx.get(f"{targets['async']}/health").json().get("query_batching")
+        if batching:
+            print(f"async question embeddings: {batching['requests']} in {batching['batches']} "
+                  f"requests (mean batch {batching['mean_batch_size']}, mean wait {batching['mean_wait_ms']} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+End-to-end benchmark suite against the local Ollama stand-in.
+
+Runs each scenario on a deterministic synthetic corpus and writes one JSON
+file of results, which benchmarks.compare diffs against another run:
+
+    chunking   chunker throughput (character and token modes)
+    ingest     extract -> embed -> write pipeline throughput
+    retrieval  store.search p50/p99 at several corpus sizes
+    ask        concurrent /ask requests against the API server
+    session    per-turn /ask latency of multi-turn chat sessions, against
+               standalone questions, with prompt prefill priced per token
+    startup    import time of the entry points, each in a fresh interpreter
+
+Every metric name ends in its unit: `_per_s` (higher is better) or `_ms`
+(lower is better). CPU-bound scenarios keep the best of --repeat runs, which
+is far less sensitive to a busy machine than a single run or the mean.
+
+Usage:
+    python -m benchmarks.suite [--out benchmarks/results/HEAD.json]
+        [--scenarios chunking,ingest,retrieval,ask,session,startup] [--sizes 1000,5000]
+        [--dim 384] [--embed-latency 0.005] [--token-interval 0.005] [--repeat 3] [--quick]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks import corpus
+from benchmarks.fake_ollama import FakeOllama, fake_embedding
+
+SCENARIOS = ("chunking", "ingest", "retrieval", "ask", "session", "startup")
+
+def _percentiles(seconds: List[float]) -> Dict[str, float]:
+    ordered = sorted(seconds)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3)
+    }
+
+def _quiet(fn: Callable, *args, **kwargs):
+    """Call `fn` with its progress printing swallowed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+@contextlib.contextmanager
+def _patched(module, name: str, value):
+    original = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+def bench_chunking(args, workdir: str, fake: FakeOllama) -> Dict[str, Any]:
+    """Chunks per second and MB per second of both chunking modes."""
+    from nltk.tokenize.punkt import PunktSentenceTokenizer
+    from src import chunking
+
+    pages = [
+        corpus.document(random.Random(i), corpus.TOPICS[i % len(corpus.TOPICS)], 3000, False)
+        for i in range(args.chunk_pages)
+    ]
+    megabytes = sum(len(page) for page in pages) / (1024 * 1024)
+    tokenizer = PunktSentenceTokenizer()
+    results = {}
+
+    with _patched(chunking, "_get_sentence_tokenizer", lambda: tokenizer):
+        runs = {
+            "chars": lambda: chunking.iter_chunks(iter(pages), 1100, 200),
+            "tokens": lambda: chunking.iter_token_chunks(iter(pages), 512, 64)
+        }
+        for mode, run in runs.items():
+            elapsed = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                count = sum(1 for _ in run())
+                elapsed = min(elapsed, time.perf_counter() - start)
+            results[mode] = {
+                "chunks": count,
+                "chunks_per_s": round(count / elapsed, 1),
+                "mb_per_s": round(megabytes / elapsed, 2)
+            }
+
+    return results
+
+def bench_ingest(args, workdir: str, fake: FakeOllama) -> Dict[str, Any]:
+    """Files and chunks per second through the full ingestion pipeline."""
+    from src.manifest import Manifest
+    from src.pipeline import discover_files, run_pipeline
+    from src.store import get_client, get_or_create_collection
+
+    folder = os.path.join(workdir, "docs")
+    corpus.generate_corpus(folder, args.files, args.kb, seed=0)
+    files = discover_files(folder)
+    elapsed = float("inf")
+
+    for run in range(args.repeat):
+        # A fresh store each run, so every run writes the same chunks
+        persist_dir = os.path.join(workdir, f"ingest_store_{run}")
+        collection = get_or_create_collection(get_client(persist_dir), "bench_ingest")
+        start = time.perf_counter()
+        run_stats = _quiet(
+            run_pipeline, files, collection, Manifest.for_store(persist_dir), folder,
+            incremental=False, workers=args.workers
+        )
+        seconds = time.perf_counter() - start
+        if seconds < elapsed:
+            elapsed, stats = seconds, run_stats
+
+    return {
+        "files": stats["ingested"],
+        "chunks": stats["chunks"],
+        "files_per_s": round(stats["ingested"] / elapsed, 2),
+        "chunks_per_s": round(stats["chunks"] / elapsed, 1),
+        "stages": stats["stages"]
+    }
+
+def bench_retrieval(args, workdir: str, fake: FakeOllama) -> Dict[str, Any]:
+    """Latency of store.search (question embedding included) by corpus size."""
+    from src import store
+
+    questions = corpus.questions(args.queries)
+    results = {}
+
+    for size in args.sizes:
+        persist_dir = os.path.join(workdir, f"retrieval_{size}")
+        collection = store.get_or_create_collection(store.get_client(persist_dir), "bench_retrieval")
+        texts = corpus.chunk_texts(size, seed=size)
+
+        for start in range(0, size, 1000):
+            batch = texts[start:start + 1000]
+            ids = [f"c{start + i}" for i in range(len(batch))]
+            store.add_texts(
+                collection, ids, batch,
+                [{"source": f"doc{(start + i) // 50}.txt", "chunk": i, "file_path": f"doc{(start + i) // 50}.txt"}
+                 for i in range(len(batch))],
+                [fake_embedding(text, args.dim) for text in batch]
+            )
+
+        store.search(collection, questions[0], 5)  # warm up
+        latencies = []
+        for question in questions:
+            begin = time.perf_counter()
+            store.search(collection, question, 5)
+            latencies.append(time.perf_counter() - begin)
+
+        results[str(size)] = {
+            **_percentiles(latencies),
+            "queries_per_s": round(len(latencies) / sum(latencies), 1)
+        }
+
+    return results
+
+_api_url = None
+
+def _serve_api(args) -> str:
+    """Load the /ask corpus and start the API server, once per suite run."""
+    global _api_url
+    if _api_url is None:
+        from benchmarks.load_test import serve_app
+        from src.store import add_texts, get_collection
+
+        from app import app as api
+
+        texts = corpus.chunk_texts(500, seed=7)
+        add_texts(
+            get_collection(),
+            [f"ask{i}" for i in range(len(texts))],
+            texts,
+            [{"source": f"doc{i // 20}.txt", "chunk": i, "file_path": f"doc{i // 20}.txt"} for i in range(len(texts))],
+            [fake_embedding(text, args.dim) for text in texts]
+        )
+        _api_url = serve_app(api.app)
+    return _api_url
+
+def bench_ask(args, workdir: str, fake: FakeOllama) -> Dict[str, Any]:
+    """Throughput and latency of concurrent /ask requests against the API server."""
+    from benchmarks.load_test import run_load
+
+    url = _serve_api(args)
+    results = {}
+    for level in args.concurrency:
+        outcome = asyncio.run(run_load(url, args.requests, level))
+        results[str(level)] = {
+            "requests_per_s": round(outcome["rps"], 2),
+            "p50_ms": round(outcome["p50"] * 1000, 1),
+            "p99_ms": round(outcome["p99"] * 1000, 1)
+        }
+
+    return results
+
+def bench_session(args, workdir: str, fake: FakeOllama) -> Dict[str, Any]:
+    """
+    Latency of each turn of concurrent chat sessions, with and without the
+    stand-in reusing evaluated prompt prefixes, and of the same questions
+    asked standalone.
+
+    The stand-in charges --prefill-latency per prompt token it has not seen
+    as the prefix of a recent prompt, so follow-ups that keep their session's
+    prompt prefix only pay for their new question and context, while without
+    reuse every turn pays for the whole conversation again.
+    """
+    import httpx
+
+    url = _serve_api(args)
+    questions = corpus.questions(args.sessions * args.turns, seed=3)
+    standalone: List[float] = []
+
+    async def conversation(client, first: int):
+        session_id = (await client.post("/sessions")).json()["session_id"]
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            response = await client.post("/ask", json={"question": questions[first + turn], "session_id": session_id})
+            response.raise_for_status()
+            turns[turn].append(time.perf_counter() - start)
+        await client.delete(f"/sessions/{session_id}")
+
+    async def standalone_questions(client, first: int):
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            response = await client.post("/ask", json={"question": questions[first + turn]})
+            response.raise_for_status()
+            standalone.append(time.perf_counter() - start)
+
+    async def run(each):
+        async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+            await asyncio.gather(*(each(client, i * args.turns) for i in range(args.sessions)))
+
+    results = {}
+    with _patched(fake, "prefill_latency", args.prefill_latency):
+        for name, slots in (("reuse", args.sessions * 2), ("no_reuse", 0)):
+            turns: List[List[float]] = [[] for _ in range(args.turns)]
+            with _patched(fake, "prompt_slots", slots):
+                asyncio.run(run(conversation))
+            results[name] = {f"turn_{i}": _percentiles(latencies) for i, latencies in enumerate(turns, 1)}
+            results[name]["follow_up"] = _percentiles([seconds for latencies in turns[1:] for seconds in latencies])
+        asyncio.run(run(standalone_questions))
+
+    results["standalone"] = _percentiles(standalone)
+    return results
+
+def bench_startup(args, workdir: str, fake: FakeOllama) -> Dict[str, Any]:
+    """Median import time of each entry module, which lazy imports keep low."""
+    from benchmarks.bench_startup import measure
+
+    return {
+        module: {"import_ms": result["import_ms"]}
+        for module, result in measure(runs=args.startup_runs).items()
+    }
+
+BENCHMARKS = {
+    "chunking": bench_chunking,
+    "ingest": bench_ingest,
+    "retrieval": bench_retrieval,
+    "ask": bench_ask,
+    "session": bench_session,
+    "startup": bench_startup
+}
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite")
+    parser.add_argument("--out", help="JSON results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--quick", action="store_true", help="Smaller corpus and fewer requests")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of CPU-bound scenarios (best is kept)")
+    parser.add_argument("--dim", type=int, default=384, help="Fake embedding dimension")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Fake seconds per embedding request")
+    parser.add_argument("--item-latency", type=float, default=0.0005, help="Fake seconds per embedded text")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="Fake seconds before the first token")
+    parser.add_argument("--token-interval", type=float, default=0.005, help="Fake seconds between answer tokens")
+    parser.add_argument("--tokens", type=int, default=32, help="Tokens per fake answer")
+    parser.add_argument("--chunk-pages", type=int, default=1000, help="3 KB pages fed to the chunkers")
+    parser.add_argument("--files", type=int, default=40, help="Documents in the ingestion corpus")
+    parser.add_argument("--kb", type=int, default=32, help="Size of each ingestion document")
+    parser.add_argument("--workers", type=int, default=2, help="Ingestion extraction processes")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Retrieval corpus sizes in chunks")
+    parser.add_argument("--queries", type=int, default=200, help="Retrieval queries per corpus size")
+    parser.add_argument("--concurrency", default="1,8,32", help="/ask concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="/ask requests per concurrency level")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Questions per chat session")
+    parser.add_argument("--prefill-latency", type=float, default=0.001, help="Fake seconds per uncached prompt token in the session scenario")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters per imported module")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.chunk_pages, args.files, args.queries, args.requests = 200, 10, 50, 16
+        args.startup_runs, args.sessions, args.turns = 3, 2, 3
+        args.sizes = "1000,5000"
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    fake = FakeOllama(
+        dim=args.dim,
+        request_latency=args.embed_latency,
+        item_latency=args.item_latency,
+        answer_tokens=args.tokens,
+        first_token_latency=args.first_token_latency,
+        token_interval=args.token_interval
+    )
+
+    with fake:
+        # Configuration is read at import, so it must be in place before src loads
+        os.environ.update({
+            "OLLAMA_URL": fake.url,
+            "PERSIST_DIR": os.path.join(workdir, "api_store"),
+            "EMBED_CACHE": "0",
+            "PDF_CACHE": "0",
+            "ANSWER_CACHE": "0",
+            # Fake embeddings are unrelated to the text, so keep every chunk
+            "MIN_SCORE": "0",
+            # The fake server generates in parallel; measure the pipeline, not the limiter
+            "GENERATION_CONCURRENCY": "0"
+        })
+
+        commit = _commit()
+        report = {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count()
+            },
+            "settings": {key: value for key, value in vars(args).items() if key not in ("out", "scenarios")},
+            "results": {}
+        }
+
+        try:
+            for name in scenarios:
+                print(f"▶️ {name}...", flush=True)
+                start = time.perf_counter()
+                report["results"][name] = BENCHMARKS[name](args, workdir, fake)
+                print(f"   {json.dumps(report['results'][name])} ({time.perf_counter() - start:.1f}s)")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join("benchmarks", "results", f"{commit or 'latest'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,54 @@ import argparse
 import os
 from pathlib import Path
 
-from src.config import PERSIST_DIR
-from src.store import get_client, get_or_create_collection
-from src.rag import ingest_path
+from src.config import PERSIST_DIR, SHARDS, SHARD_BY
+from src.store import get_client, get_or_create_collection, rebuild_lexical_index, clear_collection
+from src.pipeline import discover_files, run_pipeline, SUPPORTED_EXTENSIONS
+from src.manifest import Manifest
+from src.embed_cache import get_embedding_cache
+from src.shards import sharding_enabled, shard_of, shard_dir, list_shards
+
+STAT_COUNTS = ("ingested", "unchanged", "resumed", "removed", "failed", "chunks")
+
+def plan_stores(files, folder: str, only_shard: str = None):
+    """
+    Decide which store each file is ingested into.
+
+    Returns:
+        (shard name or None, persist dir, files) per store to update; with
+        sharding, shards that no longer get any file are included so that
+        their removed files are cleaned up
+    """
+    if not sharding_enabled():
+        if list_shards(PERSIST_DIR):
+            print(f"⚠️ {PERSIST_DIR} is sharded, but SHARDS / SHARD_BY are not set; queries read the shards only")
+        return [(None, PERSIST_DIR, files)]
+
+    routed = {name: [] for name in list_shards(PERSIST_DIR)}
+    for file_path in files:
+        routed.setdefault(shard_of(file_path, folder, SHARDS, SHARD_BY), []).append(file_path)
+
+    if only_shard is not None:
+        if only_shard not in routed:
+            raise ValueError(f"Unknown shard {only_shard}; shards: {', '.join(sorted(routed)) or 'none'}")
+        routed = {only_shard: routed[only_shard]}
+
+    return [(name, shard_dir(name, PERSIST_DIR), routed[name]) for name in sorted(routed)]
+
+def merge_stats(total, stats):
+    """Add one store's pipeline stats to the running total."""
+    if total is None:
+        return stats
+    for key in STAT_COUNTS:
+        total[key] += stats[key]
+    total["wall_seconds"] = round(total["wall_seconds"] + stats["wall_seconds"], 3)
+    for name, stage in stats["stages"].items():
+        merged = total["stages"][name]
+        for key in ("files", "chunks"):
+            merged[key] += stage[key]
+        merged["busy_seconds"] = round(merged["busy_seconds"] + stage["busy_seconds"], 3)
+        merged["chunks_per_second"] = round(merged["chunks"] / merged["busy_seconds"], 1) if merged["busy_seconds"] else 0.0
+    return total
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest documents into RAG vector store")
@@ -14,6 +59,42 @@ def main():
         default="docs",
         help="Folder containing documents to ingest (default: docs)"
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only ingest new or modified files (removed files are always cleaned up)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Processes used to extract and chunk files (default: up to 4)"
+    )
+    parser.add_argument(
+        "--write-batch-size",
+        type=int,
+        default=256,
+        help="Chunks per vector store upsert, grouped across files (default: 256)"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard the checkpoint of an interrupted run instead of resuming it"
+    )
+    parser.add_argument(
+        "--reindex-lexical",
+        action="store_true",
+        help="Rebuild the BM25 keyword index from the existing collection and exit"
+    )
+    parser.add_argument(
+        "--shard",
+        help="With SHARDS or SHARD_BY set, only update this shard; the others keep serving unchanged"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Empty the store (or the --shard) and ingest it again from scratch"
+    )
     
     args = parser.parse_args()
     
@@ -24,56 +105,73 @@ def main():
     print(f"📁 Scanning folder: {docs_dir.absolute()}")
     
     try:
-        # Get collection
-        client = get_client(PERSIST_DIR)
-        collection = get_or_create_collection(client)
-        
         # Find files to ingest
-        supported_extensions = ['.pdf', '.txt', '.md']
-        files_to_ingest = []
+        files_to_ingest = discover_files(str(docs_dir))
+        stores = plan_stores(files_to_ingest, str(docs_dir), args.shard)
         
-        for ext in supported_extensions:
-            files_to_ingest.extend(docs_dir.glob(f"*{ext}"))
-            files_to_ingest.extend(docs_dir.glob(f"**/*{ext}"))
+        if args.reindex_lexical:
+            for shard, persist_dir, _ in stores:
+                indexed = rebuild_lexical_index(get_or_create_collection(get_client(persist_dir)))
+                print(f"🔤 Rebuilt lexical index{f' of shard {shard}' if shard else ''}: {indexed} chunks")
+            return
         
         if not files_to_ingest:
             print(f"❌ No supported files found in {args.folder}/")
-            print(f"📋 Supported formats: {', '.join(supported_extensions)}")
+            print(f"📋 Supported formats: {', '.join(SUPPORTED_EXTENSIONS)}")
             print("💡 Add some .pdf, .txt, or .md files to the docs/ folder and try again.")
             return
         
-        # Ingest files
-        total_chunks = 0
-        processed_files = 0
-        failed_files = 0
-        
         print(f"🔍 Found {len(files_to_ingest)} files to process")
         print("-" * 60)
         
-        for file_path in files_to_ingest:
-            print(f"📄 Processing: {file_path.name}")
-            try:
-                chunks_added = ingest_path(str(file_path), collection)
-                if chunks_added > 0:
-                    total_chunks += chunks_added
-                    processed_files += 1
-                    print(f"  ✅ Added {chunks_added} chunks")
-                else:
-                    failed_files += 1
-                    print(f"  ⚠️ No chunks added (empty or unsupported content)")
-            except Exception as e:
-                failed_files += 1
-                print(f"  ❌ Error: {e}")
-            print()
+        stats = None
+        for shard, persist_dir, files in stores:
+            # Each shard is a complete store with its own manifest and checkpoint
+            collection = get_or_create_collection(get_client(persist_dir))
+            manifest = Manifest.for_store(persist_dir)
+            if shard:
+                print(f"🧩 Shard {shard}: {len(files)} files")
+            if args.rebuild:
+                print(f"♻️ Cleared {clear_collection(collection)} chunks")
+                manifest.files.clear()
+                manifest.save()
+            
+            stats = merge_stats(stats, run_pipeline(
+                files,
+                collection,
+                manifest,
+                str(docs_dir),
+                incremental=args.incremental and not args.rebuild,
+                workers=max(1, args.workers),
+                write_batch_size=max(1, args.write_batch_size),
+                resume=not (args.restart or args.rebuild)
+            ))
+        total_chunks = stats["chunks"]
         
         print("-" * 60)
         print(f"🎉 Ingestion complete!")
-        print(f"✅ Successfully processed: {processed_files} files")
-        if failed_files > 0:
-            print(f"⚠️ Failed to process: {failed_files} files")
+        print(f"✅ Successfully processed: {stats['ingested']} files")
+        if stats["unchanged"] > 0:
+            print(f"⏭️ Unchanged since last run: {stats['unchanged']} files")
+        if stats["resumed"] > 0:
+            print(f"↩️ Finished by the interrupted run: {stats['resumed']} files")
+        if stats["removed"] > 0:
+            print(f"🗑️ Removed deleted files: {stats['removed']}")
+        if stats["failed"] > 0:
+            print(f"⚠️ Failed to process: {stats['failed']} files")
         print(f"📊 Total chunks added: {total_chunks}")
+        print(f"⏱️ Stage throughput ({stats['wall_seconds']}s wall time):")
+        for name, stage in stats["stages"].items():
+            print(f"   {name:<8} {stage['files']:>6} files {stage['chunks']:>8} chunks "
+                  f"{stage['busy_seconds']:>9.2f}s busy {stage['chunks_per_second']:>9.1f} chunks/s")
+
+        cache = get_embedding_cache()
+        if cache is not None:
+            cache_stats = cache.stats()
+            print(f"🗃️ Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                  f"({cache_stats['entries']} vectors, {cache_stats['size_mb']} MB)")
         
-        if total_chunks == 0:
+        if total_chunks == 0 and stats["unchanged"] == 0 and stats["resumed"] == 0:
             print("\n💡 Tips:")
             print("- Ensure your documents contain readable text")
             print("- Check that PDF files are not scanned images")
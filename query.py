@@ -1,8 +1,10 @@
 """CLI script for querying the RAG system."""
 import argparse
-from src.config import PERSIST_DIR, TOP_K
-from src.store import get_client, get_or_create_collection
-from src.rag import retrieve_and_answer
+import json
+import sys
+from src.config import PERSIST_DIR, TOP_K, BATCH_CONCURRENCY
+from src.store import open_collection
+from src.rag import retrieve_and_answer, answer_many
 
 def main():
     parser = argparse.ArgumentParser(description="Query the RAG system")
@@ -11,25 +13,44 @@ def main():
         dest="question",
         help="Question to ask"
     )
+    parser.add_argument(
+        "--file",
+        help="Answer every question in this file (one per line) and write JSON lines"
+    )
+    parser.add_argument(
+        "--out",
+        help="With --file, write the JSON lines here instead of stdout"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help=f"With --file, answers generated at once (default: {BATCH_CONCURRENCY})"
+    )
     
     args = parser.parse_args()
+    # Keep stdout clean for JSON lines in batch mode
+    status = sys.stderr if args.file and not args.out else sys.stdout
     
     try:
-        # Get collection
-        client = get_client(PERSIST_DIR)
-        collection = get_or_create_collection(client)
+        # Get collection (every shard, if the store is sharded)
+        collection = open_collection(PERSIST_DIR)
         
         # Check if collection has any documents
         try:
             count = collection.count()
             if count == 0:
-                print("❌ No documents found in the knowledge base.")
-                print("💡 Run 'python ingest.py' first to add documents.")
+                print("❌ No documents found in the knowledge base.", file=status)
+                print("💡 Run 'python ingest.py' first to add documents.", file=status)
                 return
             else:
-                print(f"📚 Knowledge base contains {count} document chunks")
+                print(f"📚 Knowledge base contains {count} document chunks", file=status)
         except:
-            print("⚠️ Could not check document count, but proceeding...")
+            print("⚠️ Could not check document count, but proceeding...", file=status)
+        
+        if args.file:
+            run_batch(collection, args.file, args.out, max(1, args.concurrency), status)
+            return
         
         # Get question
         question = args.question
@@ -52,20 +73,51 @@ def main():
         if sources:
             print(f"📖 Sources ({len(sources)} found):")
             for i, source in enumerate(sources, 1):
-                print(f"[{i}] 📄 {source['source']} (chunk {source['chunk']})")
+                page = f"page {source['page']}, " if 'page' in source else ""
+                chunks = f"chunks {source['chunk']}-{source['last_chunk']}" if 'last_chunk' in source else f"chunk {source['chunk']}"
+                score = f", score {source['score']:.2f}" if 'score' in source else ""
+                print(f"[{i}] 📄 {source['source']} ({page}{chunks}{score})")
                 print(f"    💬 {source['text']}")
                 print()
         else:
             print("📭 No sources found.")
             
     except KeyboardInterrupt:
-        print("\n👋 Goodbye!")
+        print("\n👋 Goodbye!", file=status)
     except Exception as e:
-        print(f"❌ Error: {e}")
-        print("💡 Make sure:")
-        print("  - Ollama is running: ollama serve")
-        print("  - Required models are installed: ollama pull nomic-embed-text")
-        print("  - Documents have been ingested: python ingest.py")
+        print(f"❌ Error: {e}", file=status)
+        print("💡 Make sure:", file=status)
+        print("  - Ollama is running: ollama serve", file=status)
+        print("  - Required models are installed: ollama pull nomic-embed-text", file=status)
+        print("  - Documents have been ingested: python ingest.py", file=status)
+
+def run_batch(collection, path: str, out_path: str, concurrency: int, status):
+    """Answer the questions in a file, writing one JSON line per answer as it completes."""
+    with open(path, 'r', encoding='utf-8') as f:
+        questions = [line.strip() for line in f if line.strip()]
+    
+    if not questions:
+        print(f"❌ No questions found in {path}.", file=status)
+        return
+    
+    print(f"❓ Answering {len(questions)} questions ({concurrency} at a time)", file=status)
+    
+    out = open(out_path, 'w', encoding='utf-8') if out_path else sys.stdout
+    failed = 0
+    try:
+        for done, result in enumerate(answer_many(questions, collection, TOP_K, concurrency), 1):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            failed += "error" in result
+            if out_path:
+                print(f"\r✅ {done}/{len(questions)} answered", end="", file=status, flush=True)
+    finally:
+        if out_path:
+            out.close()
+            print(file=status)
+    
+    if failed:
+        print(f"⚠️ {failed} questions failed", file=status)
 
 if __name__ == "__main__":
     main()
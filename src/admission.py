@@ -0,0 +1,160 @@
+"""Admission control for the API server: a bounded number of generations, the rest queued by priority."""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from src.metrics import QUEUE_WAIT_SECONDS, REJECTED_REQUESTS
+
+# Queue order of the request priorities; lower goes first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+class Rejected(RuntimeError):
+    """
+    A request turned away without running.
+
+    Attributes:
+        status_code: 429 when the queue was full, 503 when the request
+            waited too long for a slot
+        retry_after: Whole seconds after which a retry may be admitted
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class Ticket:
+    """A held slot; release() it when the request's work ends, however it ends."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started)
+
+class AdmissionController:
+    """
+    Limits the requests running at once and queues the rest by priority.
+
+    Up to `max_active` requests hold a slot. Others wait in a queue ordered
+    by priority, then arrival, of at most `max_queue` requests; beyond that
+    a request is rejected at once (429). A queued request that gets no slot
+    within `queue_timeout` seconds, or before its own deadline, is rejected
+    too (503). Both carry an estimate of when a retry may be admitted, from
+    the queue length and how long requests have recently held their slot.
+    A freed slot goes straight to the first request in the queue, so later
+    arrivals cannot overtake it. `max_active` 0 admits everything.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_active: int = 4, max_queue: int = 32, queue_timeout: float = 30.0):
+        self.max_active = max(0, max_active)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Moving average of slot hold times, for Retry-After
+        self._hold_seconds = 1.0
+        self._order = itertools.count()
+        self._waiters: List[List[Any]] = []
+
+    async def acquire(self, priority: str = "normal", deadline: Optional[float] = None) -> Ticket:
+        """
+        Wait for a slot.
+
+        Args:
+            priority: "high", "normal" or "low"
+            deadline: time.monotonic() by which the request must have finished
+
+        Returns:
+            The held slot
+
+        Raises:
+            Rejected: If the queue is full or no slot was free in time
+        """
+        if self.max_active == 0 or (self.active < self.max_active and not self._waiters):
+            return self._admit(0.0)
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            REJECTED_REQUESTS.inc(status=429)
+            raise Rejected("Too many requests are waiting; try again later", 429, self.retry_after())
+
+        wait = self.queue_timeout
+        if deadline is not None:
+            wait = min(wait, deadline - time.monotonic())
+
+        started = time.monotonic()
+        granted = asyncio.get_running_loop().create_future()
+        waiter = [PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._order), granted]
+        heapq.heappush(self._waiters, waiter)
+        try:
+            await asyncio.wait_for(granted, max(0.0, wait))
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            # Handed a slot as the wait ran out: pass it on
+            if granted.done() and not granted.cancelled():
+                self._release(None)
+            self.timed_out += 1
+            REJECTED_REQUESTS.inc(status=503)
+            raise Rejected("No capacity within the time allowed; try again later", 503, self.retry_after())
+        except asyncio.CancelledError:
+            self._forget(waiter)
+            # Cancelled just after being handed a slot: pass it on
+            if granted.done() and not granted.cancelled():
+                self._release(None)
+            raise
+
+        return self._admit(time.monotonic() - started, handed_over=True)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue as it is now has likely drained."""
+        slots = max(1, self.max_active)
+        return max(1, math.ceil(self._hold_seconds * (len(self._waiters) + 1) / slots))
+
+    def stats(self) -> Dict[str, Any]:
+        """Slot and queue counts for monitoring."""
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+    def _admit(self, waited: float, handed_over: bool = False) -> Ticket:
+        # A handed-over slot was never given back, so is still counted
+        if not handed_over:
+            self.active += 1
+        self.admitted += 1
+        QUEUE_WAIT_SECONDS.observe(waited)
+        return Ticket(self)
+
+    def _release(self, held: Optional[float]):
+        if held is not None:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held
+        while self._waiters:
+            _, _, granted = heapq.heappop(self._waiters)
+            if not granted.done():
+                granted.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+
+    def _forget(self, waiter: List[Any]):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
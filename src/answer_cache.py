@@ -0,0 +1,145 @@
+"""Semantic cache of generated answers for repeated questions."""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+class AnswerCache:
+    """
+    In-memory LRU cache of answers keyed on the question embedding.
+
+    A lookup hits when an entry was generated by the same chat model from
+    exactly the same retrieved chunk IDs, and its question embedding has a
+    cosine similarity of at least `threshold` with the new question. Entries
+    expire after `ttl_seconds`, and everything is dropped when
+    `version_source` reports that the collection has changed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600.0,
+        threshold: float = 0.95,
+        version_source: Optional[Callable[[], Any]] = None
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.version_source = version_source
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._groups: Dict[Tuple, List[int]] = {}
+        self._next_id = 0
+        self._version = version_source() if version_source else None
+
+    def lookup(
+        self,
+        embedding: List[float],
+        chunk_ids: List[str],
+        model: str
+    ) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Find a cached answer for a question.
+
+        Returns:
+            (answer, sources) on a hit, otherwise None
+        """
+        query = _normalize(embedding)
+        key = (model, tuple(chunk_ids))
+        now = time.time()
+
+        with self._lock:
+            self._check_version()
+            best_id, best_score = None, self.threshold
+
+            for entry_id in list(self._groups.get(key, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                score = sum(a * b for a, b in zip(query, entry["embedding"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return entry["answer"], entry["sources"]
+
+    def store(
+        self,
+        embedding: List[float],
+        chunk_ids: List[str],
+        model: str,
+        answer: str,
+        sources: List[Dict[str, Any]]
+    ):
+        """Cache a generated answer."""
+        key = (model, tuple(chunk_ids))
+
+        with self._lock:
+            self._check_version()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "key": key,
+                "embedding": _normalize(embedding),
+                "answer": answer,
+                "sources": sources,
+                "created": time.time()
+            }
+            self._groups.setdefault(key, []).append(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _check_version(self):
+        """Drop every entry if the collection changed since the last check."""
+        if self.version_source is None:
+            return
+        version = self.version_source()
+        if version != self._version:
+            self._version = version
+            if self._entries:
+                self._entries.clear()
+                self._groups.clear()
+                self.invalidations += 1
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        group = self._groups[entry["key"]]
+        group.remove(entry_id)
+        if not group:
+            del self._groups[entry["key"]]
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
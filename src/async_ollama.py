@@ -0,0 +1,327 @@
+"""Asynchronous Ollama client for the API server."""
+import asyncio
+import json
+import random
+import time
+import httpx
+from typing import Any, List, Dict, AsyncIterator, Optional, Set, Union
+from src.config import (
+    EMBED_MODEL, CHAT_MODEL, EMBED_BATCH_SIZE, EMBED_CONCURRENCY, OLLAMA_KEEP_ALIVE,
+    QUERY_BATCHING, QUERY_BATCH_WAIT_MS, QUERY_BATCH_MAX,
+    OLLAMA_RETRIES, OLLAMA_BACKOFF, OLLAMA_BACKOFF_MAX, EMBED_TIMEOUT, CHAT_TIMEOUT
+)
+from src.batching import MicroBatcher
+from src.embed_cache import get_embedding_cache
+from src.metrics import STAGE_SECONDS, observe_generation
+from src.ollama_client import CONNECT_TIMEOUT
+from src.router import CircuitOpenError, Endpoint, EndpointRouter, get_router, role_of
+
+class AsyncOllamaClient:
+    """
+    httpx.AsyncClient wrapper for embeddings and streamed chat.
+
+    One instance holds a keep-alive connection pool and must be used from a
+    single event loop; the API creates it at startup and closes it on shutdown.
+    Requests go to the server the router picks (by default the configured
+    servers, shared with the sync client), with the sync client's retry
+    policy: connection errors, timeouts, 5xx and 429 are retried up to
+    `retries` times, on another server straight away if there is one,
+    otherwise after full-jitter backoff, within EMBED_TIMEOUT or
+    CHAT_TIMEOUT in total.
+    """
+
+    def __init__(
+        self,
+        base_url: Union[str, List[str], None] = None,
+        max_connections: int = 32,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        query_batching: bool = QUERY_BATCHING,
+        router: Optional[EndpointRouter] = None,
+        retries: int = OLLAMA_RETRIES,
+        backoff: float = OLLAMA_BACKOFF,
+        backoff_max: float = OLLAMA_BACKOFF_MAX
+    ):
+        if router is None:
+            if base_url is None:
+                router = get_router()
+            else:
+                router = EndpointRouter([base_url] if isinstance(base_url, str) else list(base_url))
+        self.router = router
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        # Each request sets its own timeouts from its remaining budget
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            transport=transport
+        )
+        self._embed_slots = asyncio.Semaphore(EMBED_CONCURRENCY)
+        self._legacy_endpoint = False
+        # Questions from concurrent requests share embedding calls
+        self.query_batcher = MicroBatcher(
+            self.embed, QUERY_BATCH_MAX, QUERY_BATCH_WAIT_MS / 1000, name="query_embed"
+        ) if query_batching else None
+
+    async def aclose(self):
+        if self.query_batcher is not None:
+            await self.query_batcher.aclose()
+        await self._client.aclose()
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embed one question, batched with questions from concurrent requests.
+
+        Args:
+            text: Question to embed
+
+        Returns:
+            The question's embedding vector
+        """
+        if self.query_batcher is None:
+            return (await self.embed([text]))[0]
+        return await self.query_batcher.submit(text)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings, checking the embedding cache first.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embedding vectors, in the same order as `texts`
+        """
+        if not texts:
+            return []
+
+        with STAGE_SECONDS.time(stage="embed"):
+            cache = get_embedding_cache()
+            if cache is None:
+                return await self._fetch_embeddings(texts)
+
+            # SQLite lookups are quick but blocking, so keep them off the event loop
+            vectors = await asyncio.to_thread(cache.get_many, EMBED_MODEL, texts)
+
+            missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+            if missing:
+                fetched = await self._fetch_embeddings(missing)
+                await asyncio.to_thread(cache.put_many, EMBED_MODEL, missing, fetched)
+                by_text = dict(zip(missing, fetched))
+                vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+
+            return vectors
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        """Send chat messages to Ollama and get the full response text."""
+        return ''.join([piece async for piece in self.chat_stream(messages)])
+
+    async def chat_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Send chat messages to Ollama and yield the response as it is generated.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+
+        Yields:
+            Pieces of response text, in order
+        """
+        started = time.perf_counter()
+        first_token = final = None
+        try:
+            response = await self._post(
+                "/api/chat",
+                {
+                    "model": CHAT_MODEL,
+                    "messages": messages,
+                    "stream": True,
+                    **({"keep_alive": OLLAMA_KEEP_ALIVE} if OLLAMA_KEEP_ALIVE != "" else {})
+                },
+                CHAT_TIMEOUT,
+                stream=True,
+                read_timeout=CHAT_TIMEOUT
+            )
+            try:
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    if isinstance(data, dict) and 'message' in data:
+                        content = data['message'].get('content')
+                        if content:
+                            if first_token is None:
+                                first_token = time.perf_counter()
+                            yield content
+                        if data.get('done', False):
+                            final = data
+                            break
+            finally:
+                # Closing mid-answer stops Ollama generating the rest
+                await response.aclose()
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise RuntimeError(f"Failed to get chat response: {e}")
+        finally:
+            observe_generation(started, first_token, final)
+
+    async def _fetch_embeddings(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+
+        try:
+            results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise RuntimeError(f"Failed to generate embeddings: {e}")
+        except (KeyError, ValueError) as e:
+            raise RuntimeError(f"Invalid embedding response: {e}")
+
+        return [vector for batch in results for vector in batch]
+
+    async def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        async with self._embed_slots:
+            if not self._legacy_endpoint:
+                response = await self._post(
+                    "/api/embed",
+                    {"model": EMBED_MODEL, "input": batch},
+                    EMBED_TIMEOUT
+                )
+
+                if not _is_missing_endpoint(response):
+                    response.raise_for_status()
+                    embeddings = response.json().get('embeddings')
+                    if not embeddings or len(embeddings) != len(batch):
+                        raise ValueError(
+                            f"Expected {len(batch)} embeddings, got {len(embeddings or [])}"
+                        )
+                    return embeddings
+
+                self._legacy_endpoint = True
+
+            return [await self._embed_single(text) for text in batch]
+
+    async def _embed_single(self, text: str) -> List[float]:
+        response = await self._post(
+            "/api/embeddings",
+            {"model": EMBED_MODEL, "prompt": text},
+            EMBED_TIMEOUT
+        )
+        response.raise_for_status()
+
+        data = response.json()
+        vector = data.get('embedding') or data.get('embeddings')
+        if not vector:
+            raise ValueError(f"No embedding returned for text: {text[:50]}...")
+
+        norm = sum(x * x for x in vector) ** 0.5
+        return [x / norm for x in vector] if norm else vector
+
+    async def _post(
+        self,
+        path: str,
+        body: Dict[str, Any],
+        timeout: float,
+        stream: bool = False,
+        read_timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        POST to an Ollama endpoint, retrying transient failures.
+
+        Args:
+            path: Endpoint path such as "/api/embed"
+            body: Request body
+            timeout: Seconds the request may take in total, retries included
+                (for a streamed request, until the response starts)
+            stream: Return as soon as the response headers arrive; the
+                caller must aclose() the response
+            read_timeout: Longest wait for data once the response started
+                (default: whatever remains of `timeout`)
+
+        Returns:
+            The response; a 5xx or 429 is returned as-is once retries run out
+
+        Raises:
+            CircuitOpenError: If the circuit breaker of every server is open
+            httpx.TransportError: If the last attempt failed to connect or timed out
+        """
+        role = role_of(path)
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        tried: Set[str] = set()
+
+        while True:
+            endpoint = self.router.acquire(role, exclude=tried)
+
+            remaining = max(0.001, deadline - time.monotonic())
+            request = self._client.build_request(
+                "POST",
+                f"{endpoint.url}{path}",
+                json=body,
+                timeout=httpx.Timeout(read_timeout or remaining, connect=min(CONNECT_TIMEOUT, remaining))
+            )
+            started = time.perf_counter()
+            error = response = None
+            try:
+                response = await self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = e
+                self.router.release(endpoint, role, started, ok=False)
+            except BaseException:
+                # Cancelled: no verdict on the server
+                self.router.release(endpoint, role, started, ok=True)
+                raise
+            else:
+                ok = response.status_code < 500
+                if ok and response.status_code != 429:
+                    if stream:
+                        self._release_on_close(response, endpoint, role, started)
+                    else:
+                        self.router.release(endpoint, role, started, ok=True)
+                    return response
+                self.router.release(endpoint, role, started, ok=ok)
+
+            tried.add(endpoint.url)
+            if self.router.has_untried(role, tried):
+                delay = 0.0
+            else:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+            attempt += 1
+            if attempt > self.retries or time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+
+    def _release_on_close(self, response: httpx.Response, endpoint: Endpoint, role: str, started: float):
+        """Keep the server reserved until a streamed response is closed."""
+        aclose = response.aclose
+        released = []
+
+        async def aclose_and_release():
+            try:
+                await aclose()
+            finally:
+                if not released:
+                    released.append(True)
+                    self.router.release(endpoint, role, started, ok=True)
+
+        response.aclose = aclose_and_release
+
+def _is_missing_endpoint(response: httpx.Response) -> bool:
+    """Tell an unknown route apart from a JSON 404 such as 'model not found'."""
+    if response.status_code != 404:
+        return False
+
+    try:
+        return 'error' not in response.json()
+    except ValueError:
+        return True
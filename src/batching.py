@@ -0,0 +1,154 @@
+"""Micro-batching of concurrent single-item async calls."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.metrics import SIZE_BUCKETS as _SIZE_BUCKETS, BATCH_SIZE, BATCH_WAIT_SECONDS, BATCH_QUEUE_DEPTH
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent callers and processes them together.
+
+    The first item to arrive starts a `max_wait` second timer; when it fires,
+    or as soon as `max_batch` items are waiting, the pending items are passed
+    to `process` in one call and each caller gets back its own result. A
+    longer wait forms bigger batches at the cost of that much added latency.
+
+    Must be used from a single event loop, like the client it batches for.
+    Batch sizes, waits and the queue depth are also exported as metrics
+    labelled with `name`.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int,
+        max_wait: float,
+        name: str = "batch"
+    ):
+        self.process = process
+        self.name = name
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self._wait_seconds = 0.0
+        self._size_counts = [0] * (len(_SIZE_BUCKETS) + 1)
+
+    @property
+    def queue_depth(self) -> int:
+        """Items waiting for their batch to be sent."""
+        return len(self._pending)
+
+    @property
+    def requests_sent(self) -> int:
+        """Items handed to `process` so far."""
+        return self.requests - self.queue_depth
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, loop.time()))
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        BATCH_QUEUE_DEPTH.set(len(self._pending), batcher=self.name)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters describing how well calls are being coalesced."""
+        sizes = {
+            f"<={bound}": count for bound, count in zip(_SIZE_BUCKETS, self._size_counts) if count
+        }
+        if self._size_counts[-1]:
+            sizes[f">{_SIZE_BUCKETS[-1]}"] = self._size_counts[-1]
+
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests_sent / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": sizes,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_wait_ms": round(1000 * self._wait_seconds / self.requests_sent, 2) if self.requests_sent else 0.0
+        }
+
+    async def aclose(self):
+        """Fail waiting callers and cancel batches in flight."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, future, _ in self._pending:
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        BATCH_QUEUE_DEPTH.set(0, batcher=self.name)
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        BATCH_QUEUE_DEPTH.set(len(self._pending), batcher=self.name)
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        now = asyncio.get_running_loop().time()
+        self.batches += 1
+        self._wait_seconds += sum(now - queued for _, _, queued in batch)
+        self._size_counts[_bucket(len(batch))] += 1
+        BATCH_SIZE.observe(len(batch), batcher=self.name)
+        for _, _, queued in batch:
+            BATCH_WAIT_SECONDS.observe(now - queued, batcher=self.name)
+
+        # Callers that gave up (timeout, disconnect) no longer need a result
+        live = [(item, future) for item, future, _ in batch if not future.done()]
+        if not live:
+            return
+
+        try:
+            results = await self.process([item for item, _ in live])
+            if len(results) != len(live):
+                raise RuntimeError(f"Expected {len(live)} batch results, got {len(results)}")
+        except asyncio.CancelledError:
+            for _, future in live:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
+
+def _bucket(size: int) -> int:
+    for i, bound in enumerate(_SIZE_BUCKETS):
+        if size <= bound:
+            return i
+    return len(_SIZE_BUCKETS)
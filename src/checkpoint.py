@@ -0,0 +1,127 @@
+"""Write-ahead checkpoint log that lets an interrupted ingest resume."""
+import json
+import os
+import threading
+from typing import Dict, List, Set
+
+CHECKPOINT_NAME = "ingest_checkpoint.jsonl"
+
+class Checkpoint:
+    """
+    Append-only log of an ingest run's progress, kept alongside the store.
+
+    Each line is one JSON record:
+        {"op": "file", "path", "sha256"}  old chunks deleted, new ones being written
+        {"op": "batch", "path", "ids"}    these chunks of the file are in the collection
+        {"op": "done", "path", "sha256"}  every chunk written and the manifest saved
+
+    Records are flushed to disk before the writer moves on, so after a crash
+    the log describes a prefix of the work that was done. A run that
+    finishes deletes the log; finding one at startup means the previous run
+    was interrupted, and its finished files and written chunks can be
+    skipped. A torn last line from a crash mid-write is cut off.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        self.started: Dict[str, str] = {}
+        self.written: Dict[str, Set[str]] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._load()
+
+    @classmethod
+    def for_store(cls, persist_dir: str) -> "Checkpoint":
+        """Load the checkpoint log kept alongside a vector store."""
+        return cls(os.path.join(persist_dir, CHECKPOINT_NAME))
+
+    @property
+    def interrupted(self) -> bool:
+        """Whether the log holds progress from a run that did not finish."""
+        return bool(self.started or self.done)
+
+    def is_done(self, file_path: str, digest: str) -> bool:
+        """Whether the interrupted run finished this exact version of a file."""
+        return self.done.get(file_path) == digest
+
+    def resumes(self, file_path: str, digest: str) -> bool:
+        """Whether the interrupted run started writing this exact version of a file."""
+        return self.started.get(file_path) == digest and not self.is_done(file_path, digest)
+
+    def is_written(self, file_path: str, chunk_id: str) -> bool:
+        return chunk_id in self.written.get(file_path, ())
+
+    def begin_file(self, file_path: str, digest: str):
+        """Log that a file's previous chunks are gone and its new ones follow."""
+        self.started[file_path] = digest
+        self.written[file_path] = set()
+        self._append({"op": "file", "path": file_path, "sha256": digest})
+
+    def write_batch(self, file_path: str, ids: List[str]):
+        """Log chunk IDs of a file that were upserted into the collection."""
+        self.written.setdefault(file_path, set()).update(ids)
+        self._append({"op": "batch", "path": file_path, "ids": ids})
+
+    def finish_file(self, file_path: str, digest: str):
+        self.done[file_path] = digest
+        self._append({"op": "done", "path": file_path, "sha256": digest})
+
+    def close(self, completed: bool):
+        """Close the log, deleting it if the run completed."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if completed and os.path.exists(self.path):
+                os.remove(self.path)
+        if completed:
+            self.done.clear()
+            self.started.clear()
+            self.written.clear()
+
+    def discard(self):
+        """Forget an interrupted run, so every file is ingested afresh."""
+        self.close(completed=True)
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _load(self):
+        offset = 0
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    offset += len(line)
+                    op = record.get("op")
+                    if op == "file":
+                        self.started[record["path"]] = record["sha256"]
+                        self.written[record["path"]] = set()
+                    elif op == "batch":
+                        self.written.setdefault(record["path"], set()).update(record["ids"])
+                    elif op == "done":
+                        self.done[record["path"]] = record["sha256"]
+
+            # Drop a torn tail so records appended by this run stay readable
+            if offset < os.path.getsize(self.path):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(offset)
+        except OSError as e:
+            print(f"Warning: Ignoring unreadable checkpoint {self.path}: {e}")
@@ -1,16 +1,18 @@
 """Text chunking utilities with sentence-aware splitting."""
-import nltk
-from typing import List
+import functools
+import re
+from collections import deque
+from typing import Deque, List, Iterable, Iterator, Optional, Tuple
 
-# Try to download punkt tokenizer data if not available
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    try:
-        print("Downloading NLTK punkt tokenizer data...")
-        nltk.download('punkt', quiet=True)
-    except Exception as e:
-        print(f"Warning: Could not download NLTK data: {e}")
+from src.tokenizer import get_token_counter
+
+_WORD_RE = re.compile(r"\S+")
+
+# Drop consumed text from the streaming buffer once this much has piled up
+_TRIM_CHARS = 1 << 16
+
+# Punkt only considers a sentence boundary after one of these
+_SENT_END_RE = re.compile(r"[.?!]")
 
 def split_into_chunks(text: str, max_chars: int = 1100, overlap: int = 200) -> List[str]:
     """
@@ -27,45 +29,301 @@ def split_into_chunks(text: str, max_chars: int = 1100, overlap: int = 200) -> L
     if not text.strip():
         return []
     
-    chunks = []
+    return list(iter_chunks([text], max_chars, overlap))
+
+def iter_chunks(
+    pieces: Iterable[str],
+    max_chars: int = 1100,
+    overlap: int = 200,
+    offsets: bool = False
+) -> Iterator:
+    """
+    Chunk a stream of text pieces (pages, file blocks), yielding each chunk
+    as soon as it is complete.
+    
+    The chunks are exactly those split_into_chunks would produce for the
+    concatenated pieces, but only the unfinished sentences and the current
+    chunk are held in memory, and chunks are assembled from sentence offsets
+    rather than by growing strings.
+    
+    Args:
+        pieces: Consecutive pieces of the document text
+        max_chars: Maximum characters per chunk
+        overlap: Number of characters to overlap between chunks
+        offsets: Yield (chunk, start, end) with the character offsets in the
+            concatenated pieces that each chunk was taken from
     
+    Yields:
+        Text chunks
+    """
     try:
-        # Try sentence-aware splitting
-        sentences = nltk.sent_tokenize(text)
-        
-        current_chunk = ""
+        tokenizer = _get_sentence_tokenizer()
+    except LookupError:
+        # Fallback to raw character slicing if NLTK data not available
+        print("Warning: NLTK punkt tokenizer not available, using fallback slicing")
+        chunks = _iter_fallback_chunks(pieces, max_chars, overlap)
+    else:
+        chunks = _iter_sentence_chunks(pieces, tokenizer, max_chars, overlap)
+    
+    yield from chunks if offsets else (chunk for chunk, _, _ in chunks)
+
+def iter_token_chunks(
+    pieces: Iterable[str],
+    max_tokens: int = 512,
+    overlap: int = 64,
+    counter=None,
+    offsets: bool = False
+) -> Iterator:
+    """
+    Chunk a stream of text pieces to a token budget instead of a character one.
+    
+    Whole sentences are packed while their token counts fit in max_tokens,
+    and each chunk after the first starts with the trailing sentences of the
+    previous one that fit in `overlap` tokens. A sentence longer than the
+    budget is split between words.
+    
+    Args:
+        pieces: Consecutive pieces of the document text
+        max_tokens: Maximum tokens per chunk; keep it within the embedding
+            model's context so chunks are not truncated
+        overlap: Number of tokens of whole sentences to overlap between chunks
+        counter: Token counter from src.tokenizer (approximate by default)
+        offsets: Yield (chunk, start, end) as iter_chunks does
+    
+    Yields:
+        Text chunks
+    """
+    counter = counter or get_token_counter()
+    try:
+        tokenizer = _get_sentence_tokenizer()
+    except LookupError:
+        # Without trained data punkt still splits on sentence punctuation,
+        # which is all token packing needs
+        from nltk.tokenize.punkt import PunktSentenceTokenizer
+        tokenizer = PunktSentenceTokenizer()
+    
+    stream = _SentenceStream(pieces, tokenizer)
+    # (text, tokens, start, end) of the sentences in the current chunk
+    window: Deque[Tuple[str, int, int, int]] = deque()
+    total = 0
+    
+    def emit():
+        text = " ".join(part[0] for part in window)
+        return (text, window[0][2], window[-1][3]) if offsets else text
+    
+    for start, end in stream:
+        sentence = stream.text(start, end)
+        stream.release(end)
         
-        for sentence in sentences:
-            # If adding this sentence would exceed max_chars, save current chunk
-            if len(current_chunk) + len(sentence) > max_chars and current_chunk:
-                chunks.append(current_chunk.strip())
+        for part in _fit_sentence(sentence, start, counter, max_tokens):
+            tokens = part[1]
+            if total + tokens > max_tokens and window:
+                yield emit()
                 
-                # Start new chunk with overlap from previous chunk
-                if overlap > 0:
-                    current_chunk = current_chunk[-overlap:] + " " + sentence
-                else:
-                    current_chunk = sentence
-            else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
+                # Keep the trailing sentences that fit the overlap and leave room
+                while window and (total > overlap or total + tokens > max_tokens):
+                    total -= window.popleft()[1]
+            window.append(part)
+            total += tokens
+    
+    if window:
+        yield emit()
+
+def _fit_sentence(sentence: str, offset: int, counter, max_tokens: int) -> Iterator[Tuple[str, int, int, int]]:
+    """(text, tokens, start, end) pieces of a sentence, split between words if over budget."""
+    tokens = counter.count(sentence)
+    if tokens <= max_tokens:
+        yield sentence, tokens, offset, offset + len(sentence)
+        return
+    
+    words: List[str] = []
+    total = 0
+    first = 0
+    for match in _WORD_RE.finditer(sentence):
+        size = counter.count(match.group())
+        if total + size > max_tokens and words:
+            yield " ".join(words), total, offset + first, offset + last
+            words, total = [], 0
+        if not words:
+            first = match.start()
+        words.append(match.group())
+        last = match.end()
+        total += size
+    if words:
+        yield " ".join(words), total, offset + first, offset + last
+
+@functools.lru_cache(maxsize=None)
+def _get_sentence_tokenizer(language: str = "english"):
+    """The tokenizer nltk.sent_tokenize uses; raises LookupError without its data."""
+    # nltk takes a few hundred milliseconds to import, so only chunking pays for it
+    from nltk.tokenize.punkt import PunktTokenizer
+    _ensure_punkt()
+    return PunktTokenizer(language)
+
+@functools.lru_cache(maxsize=1)
+def _ensure_punkt():
+    """Try to download the punkt data if it is missing, once per process."""
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        try:
+            print("Downloading NLTK punkt tokenizer data...")
+            nltk.download('punkt', quiet=True)
+        except Exception as e:
+            print(f"Warning: Could not download NLTK data: {e}")
+
+class _SentenceStream:
+    """
+    Sentence spans over a stream of text pieces.
+    
+    A sentence boundary depends on the token after it, so the last two
+    sentences of the buffer stay pending until more text arrives. Spans are
+    offsets into the whole stream; text before the offset last passed to
+    release() may be dropped from the buffer.
+    
+    The pending text is only tokenized again when a piece may add a
+    boundary: one containing sentence-ending punctuation, or following a
+    piece that ended in it. Text without sentence breaks is otherwise
+    gathered and tokenized once, rather than again for every piece.
+    """
+    
+    def __init__(self, pieces: Iterable[str], tokenizer):
+        self.pieces = pieces
+        self.tokenizer = tokenizer
+        self.buffer = ""    # stream text from offset `base` onwards
+        self.base = 0
+        self.pending = 0    # offset of the first sentence not yet yielded
+        self.released = 0
+        self.unread: List[str] = []     # pieces not yet added to the buffer
+    
+    def text(self, start: int, end: int) -> str:
+        return self.buffer[start - self.base:end - self.base]
+    
+    def release(self, offset: int):
+        """Declare that the consumer no longer needs text before `offset`."""
+        self.released = offset
+    
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        ended = False
+        for piece in self.pieces:
+            if not piece:
+                continue
+            self.unread.append(piece)
+            
+            follows_end, ended = ended, piece[-1] in ".?!"
+            if not follows_end and not _SENT_END_RE.search(piece):
+                continue
+            self._read()
+            
+            spans = list(self.tokenizer.span_tokenize(self.buffer[self.pending - self.base:]))
+            if len(spans) > 2:
+                offset = self.pending
+                self.pending = offset + spans[-2][0]
+                for start, end in spans[:-2]:
+                    yield offset + start, offset + end
+            
+            # Forget text that neither the pending sentences nor the consumer still need
+            needed = min(self.pending, self.released)
+            if needed - self.base > _TRIM_CHARS:
+                self.buffer = self.buffer[needed - self.base:]
+                self.base = needed
         
-        # Add final chunk if it exists
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        self._read()
+        offset = self.pending
+        for start, end in self.tokenizer.span_tokenize(self.buffer[offset - self.base:]):
+            yield offset + start, offset + end
+    
+    def _read(self):
+        if self.unread:
+            self.buffer += "".join(self.unread)
+            self.unread.clear()
+
+def _iter_sentence_chunks(pieces: Iterable[str], tokenizer, max_chars: int, overlap: int) -> Iterator[str]:
+    """
+    Sentence-aware chunking over a stream, matching split_into_chunks.
+    
+    A chunk is a list of (start, end) offsets into the stream, with None
+    standing for the single space that joins sentences. Yields (chunk, start,
+    end) triples.
+    """
+    stream = _SentenceStream(pieces, tokenizer)
+    segments: List[Optional[Tuple[int, int]]] = []
+    length = 0
+    
+    def emit():
+        text = "".join(" " if part is None else stream.text(*part) for part in segments)
+        spans = [part for part in segments if part is not None]
+        return text.strip(), spans[0][0], spans[-1][1]
+    
+    for start, end in stream:
+        size = end - start
+        # If adding this sentence would exceed max_chars, emit the current chunk
+        if length + size > max_chars and length:
+            yield emit()
             
-    except LookupError:
-        # Fallback to raw character slicing if NLTK data not available
-        print("Warning: NLTK punkt tokenizer not available, using fallback slicing")
-        chunks = _fallback_chunk(text, max_chars, overlap)
+            # Start the next chunk with the overlap from this one
+            if overlap > 0:
+                segments = _tail(segments, overlap) + [None, (start, end)]
+                length = min(length, overlap) + 1 + size
+            else:
+                segments, length = [(start, end)], size
+        elif length:
+            segments += [None, (start, end)]
+            length += 1 + size
+        else:
+            segments, length = [(start, end)], size
+        
+        stream.release(next(part[0] for part in segments if part is not None))
     
-    return chunks
+    if segments:
+        final = emit()
+        if final[0]:
+            yield final
+
+def _tail(segments: List[Optional[Tuple[int, int]]], count: int) -> List[Optional[Tuple[int, int]]]:
+    """The segments covering the last `count` characters, like text[-count:]."""
+    tail = []
+    for part in reversed(segments):
+        if count <= 0:
+            break
+        size = 1 if part is None else part[1] - part[0]
+        if size <= count:
+            tail.append(part)
+        else:
+            tail.append((part[1] - count, part[1]))
+        count -= size
+    tail.reverse()
+    return tail
+
+def _iter_fallback_chunks(pieces: Iterable[str], max_chars: int, overlap: int) -> Iterator[str]:
+    """Streaming _fallback_chunk: a slice is final once text exists past its end."""
+    buffer = ""
+    base = 0
+    start = 0
+    
+    for piece in pieces:
+        buffer += piece
+        while start + max_chars < base + len(buffer):
+            end = start + max_chars
+            chunk = buffer[start - base:end - base]
+            if chunk.strip():
+                yield chunk.strip(), start, end
+            start = end - overlap
+        
+        if start - base > _TRIM_CHARS:
+            buffer = buffer[start - base:]
+            base = start
+    
+    # The remaining text reaches the end of the stream
+    yield from _iter_slices(buffer[start - base:], start, max_chars, overlap)
 
 def _fallback_chunk(text: str, max_chars: int, overlap: int) -> List[str]:
     """Fallback chunking using raw character slicing."""
-    chunks = []
+    return [chunk for chunk, _, _ in _iter_slices(text, 0, max_chars, overlap)]
+
+def _iter_slices(text: str, offset: int, max_chars: int, overlap: int) -> Iterator[Tuple[str, int, int]]:
+    """(chunk, start, end) character slices of `text`, which starts at `offset`."""
     start = 0
     
     while start < len(text):
@@ -73,12 +331,10 @@ def _fallback_chunk(text: str, max_chars: int, overlap: int) -> List[str]:
         chunk = text[start:end]
         
         if chunk.strip():
-            chunks.append(chunk.strip())
+            yield chunk.strip(), offset + start, offset + min(end, len(text))
         
         # Move start position with overlap consideration
         start = end - overlap if end < len(text) else len(text)
         
         if start >= len(text):
             break
-    
-    return chunks
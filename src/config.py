@@ -5,23 +5,147 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-# Ollama configuration
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
+def _urls(value: str) -> list:
+    return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+
+# Ollama configuration: OLLAMA_URL may list several servers, comma-separated;
+# requests go to the least busy healthy one. OLLAMA_EMBED_URL and
+# OLLAMA_CHAT_URL route embeddings and chat to their own servers instead.
+OLLAMA_URLS = _urls(os.getenv("OLLAMA_URL", "")) or ["http://127.0.0.1:11434"]
+OLLAMA_URL = OLLAMA_URLS[0]
+OLLAMA_EMBED_URLS = _urls(os.getenv("OLLAMA_EMBED_URL", "")) or OLLAMA_URLS
+OLLAMA_CHAT_URLS = _urls(os.getenv("OLLAMA_CHAT_URL", "")) or OLLAMA_URLS
+# Seconds between health checks of each server when there are several (0: off)
+OLLAMA_PROBE_INTERVAL = max(0.0, float(os.getenv("OLLAMA_PROBE_INTERVAL", "10")))
 
 # Model configuration
 EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
 CHAT_MODEL = os.getenv("CHAT_MODEL", "qwen2.5")
 
+# Ollama client: attempts per request, full-jitter backoff (seconds) and a
+# circuit breaker that fails fast after CIRCUIT_FAILURES consecutive errors
+OLLAMA_RETRIES = max(0, int(os.getenv("OLLAMA_RETRIES", "3")))
+OLLAMA_BACKOFF = max(0.0, float(os.getenv("OLLAMA_BACKOFF", "0.5")))
+OLLAMA_BACKOFF_MAX = max(0.0, float(os.getenv("OLLAMA_BACKOFF_MAX", "8")))
+CIRCUIT_FAILURES = max(1, int(os.getenv("CIRCUIT_FAILURES", "5")))
+CIRCUIT_RESET = max(0.0, float(os.getenv("CIRCUIT_RESET", "30")))
+# Seconds an embedding request may take in total, retries included, and that
+# a chat answer may take to start and to produce each next line
+EMBED_TIMEOUT = max(1.0, float(os.getenv("EMBED_TIMEOUT", "120")))
+CHAT_TIMEOUT = max(1.0, float(os.getenv("CHAT_TIMEOUT", "60")))
+
+# How long Ollama keeps the chat model (and its cached prompt) loaded after a
+# request: a duration such as "30m", seconds, or -1 for ever; empty leaves
+# Ollama's default of 5 minutes
+_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip()
+OLLAMA_KEEP_ALIVE = int(_keep_alive) if _keep_alive.lstrip("-").isdigit() else _keep_alive
+
+# Embedding client configuration
+EMBED_BATCH_SIZE = max(1, int(os.getenv("EMBED_BATCH_SIZE", "32")))
+EMBED_CONCURRENCY = max(1, int(os.getenv("EMBED_CONCURRENCY", "4")))
+# API server: question embeddings arriving within QUERY_BATCH_WAIT_MS of each
+# other are sent to Ollama as one request of up to QUERY_BATCH_MAX questions
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "1").lower() not in ("0", "false", "no")
+QUERY_BATCH_WAIT_MS = max(0.0, float(os.getenv("QUERY_BATCH_WAIT_MS", "5")))
+QUERY_BATCH_MAX = max(1, int(os.getenv("QUERY_BATCH_MAX", "32")))
+
+# Embedding cache configuration
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "1").lower() not in ("0", "false", "no")
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3"))
+EMBED_CACHE_MAX_MB = max(1, int(os.getenv("EMBED_CACHE_MAX_MB", "1024")))
+
+# PDF extraction: processes per large PDF and the extracted text cache
+PDF_WORKERS = max(1, int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1)))))
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE", "1").lower() not in ("0", "false", "no")
+PDF_CACHE_PATH = os.getenv("PDF_CACHE_PATH", os.path.join(".cache", "pdf_text.sqlite3"))
+PDF_CACHE_MAX_MB = max(1, int(os.getenv("PDF_CACHE_MAX_MB", "512")))
+
 # Storage configuration
 PERSIST_DIR = os.getenv("PERSIST_DIR", "vectorstore")
 
+# Vector store backend: "chroma", or "numpy" for the in-process memory-mapped store
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+if VECTOR_BACKEND not in ("chroma", "numpy"):
+    VECTOR_BACKEND = "chroma"
+# NumPy backend options: row precision, "flat" (exact) or "ivf" (approximate) search
+VECTOR_DTYPE = "float16" if os.getenv("VECTOR_DTYPE", "float32").lower() == "float16" else "float32"
+VECTOR_INDEX = "ivf" if os.getenv("VECTOR_INDEX", "flat").lower() == "ivf" else "flat"
+IVF_NLIST = max(0, int(os.getenv("IVF_NLIST", "0")))  # 0 sizes lists to sqrt(rows)
+IVF_NPROBE = max(1, int(os.getenv("IVF_NPROBE", "8")))
+# Compact codes searched in place of full vectors: "none", "int8" or "pq"
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+if VECTOR_QUANTIZATION not in ("none", "int8", "pq"):
+    VECTOR_QUANTIZATION = "none"
+PQ_SUBVECTORS = max(0, int(os.getenv("PQ_SUBVECTORS", "0")))  # 0 uses one per 8 dimensions
+RERANK_FACTOR = max(1, int(os.getenv("RERANK_FACTOR", "16")))  # exact re-rank of k * factor candidates
+
+# Sharding: with SHARDS > 1, files are spread over that many stores by a hash
+# of their path; SHARD_BY=folder gives each top-level folder its own store.
+# Queries go to every shard at once, on up to SHARD_THREADS threads.
+SHARDS = max(1, int(os.getenv("SHARDS", "1")))
+SHARD_BY = "folder" if os.getenv("SHARD_BY", "hash").lower() == "folder" else "hash"
+SHARD_THREADS = max(1, int(os.getenv("SHARD_THREADS", "8")))
+
+# Threads the API server uses for blocking vector store queries
+STORE_THREADS = max(1, int(os.getenv("STORE_THREADS", "4")))
+# Open the store and load its indexes while the API server starts, instead
+# of on the first request
+PREWARM = os.getenv("PREWARM", "1").lower() not in ("0", "false", "no")
+
+# Batch answering (query.py --file, /ask_batch): answers generated at once,
+# and the most questions one /ask_batch request may carry
+BATCH_CONCURRENCY = max(1, int(os.getenv("BATCH_CONCURRENCY", "4")))
+BATCH_MAX_QUESTIONS = max(1, int(os.getenv("BATCH_MAX_QUESTIONS", "100")))
+
+# Semantic answer cache used by the API server
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1").lower() not in ("0", "false", "no")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = max(1, int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")))
+
+# Chat sessions in the API server: most sessions kept, idle seconds before one
+# expires, and turns kept per session (older turns are dropped)
+SESSION_MAX = max(1, int(os.getenv("SESSION_MAX", "1000")))
+SESSION_TTL = max(1.0, float(os.getenv("SESSION_TTL", "1800")))
+SESSION_MAX_TURNS = max(1, int(os.getenv("SESSION_MAX_TURNS", "8")))
+
+# Admission control in the API server: questions answered at once (0: no
+# limit), questions queued beyond that before new ones get a 429, seconds a
+# queued question waits for its turn before a 503, and seconds a question
+# may take in total before it is abandoned
+GENERATION_CONCURRENCY = max(0, int(os.getenv("GENERATION_CONCURRENCY", "4")))
+ADMISSION_QUEUE = max(0, int(os.getenv("ADMISSION_QUEUE", "32")))
+ADMISSION_QUEUE_TIMEOUT = max(0.0, float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30")))
+REQUEST_TIMEOUT = max(1.0, float(os.getenv("REQUEST_TIMEOUT", "120")))
+
 # Retrieval configuration with security validation
 _top_k = int(os.getenv("TOP_K", "5"))
 TOP_K = max(1, min(10, _top_k))  # Limit TOP_K to 1-10 range
 
+# Retrieval mode: "dense" (embeddings), "lexical" (BM25) or "hybrid" (both, fused)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+if RETRIEVAL_MODE not in ("dense", "lexical", "hybrid"):
+    RETRIEVAL_MODE = "hybrid"
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX", "1").lower() not in ("0", "false", "no")
+RRF_K = max(1, int(os.getenv("RRF_K", "60")))
+# Seconds a hybrid query waits for the question embedding before answering
+# from the lexical index alone (0 waits indefinitely)
+DENSE_TIMEOUT = max(0.0, float(os.getenv("DENSE_TIMEOUT", "0")))
+# Context packing: chunks less similar to the question than MIN_SCORE (cosine,
+# 0 keeps all) are dropped, and the rest fill at most CONTEXT_TOKENS prompt
+# tokens (0 for no limit); with nothing left the LLM is not called
+MIN_SCORE = max(0.0, float(os.getenv("MIN_SCORE", "0.3")))
+CONTEXT_TOKENS = max(0, int(os.getenv("CONTEXT_TOKENS", "2000")))
+
 # Chunking configuration
 MAX_CHARS = int(os.getenv("MAX_CHARS", "1100"))
 OVERLAP = int(os.getenv("OVERLAP", "200"))
+# "chars" sizes chunks by MAX_CHARS/OVERLAP, "tokens" by MAX_TOKENS/TOKEN_OVERLAP
+CHUNK_MODE = "tokens" if os.getenv("CHUNK_MODE", "chars").lower() == "tokens" else "chars"
+MAX_TOKENS = max(1, int(os.getenv("MAX_TOKENS", "512")))
+TOKEN_OVERLAP = max(0, int(os.getenv("TOKEN_OVERLAP", "64")))
+# tokenizer.json of the embedding model; token counts are approximated without it
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", "")
 
 def get_safe_config_summary() -> dict:
     """Get configuration summary without sensitive values."""
@@ -0,0 +1,183 @@
+"""Persistent, content-addressed embedding cache backed by SQLite."""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Optional, Dict, Any
+
+from src.config import EMBED_CACHE_ENABLED, EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB
+
+_cache = None
+_cache_lock = threading.Lock()
+
+class EmbeddingCache:
+    """
+    Maps (model, sha256(text)) to a float32 vector blob.
+
+    Entries carry a last-used timestamp; once the stored vectors exceed
+    `max_bytes`, the least recently used entries are evicted, a tenth at a
+    time, until they take up no more than 90% of `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                digest BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, digest)
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+        row = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        self._entries, self._bytes = row
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for `texts`; missing entries come back as None."""
+        digests = [_digest(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(digests), 500):
+                part = digests[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings "
+                    f"WHERE model = ? AND digest IN ({placeholders})",
+                    [model, *part]
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND digest = ?",
+                    [(now, model, digest) for digest in found]
+                )
+                self._conn.commit()
+
+            results = []
+            for digest in digests:
+                blob = found.get(digest)
+                if blob is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(array('f', blob).tolist())
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store vectors for `texts`, evicting old entries if over budget."""
+        now = time.time()
+        rows = [
+            (model, _digest(text), array('f', vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            for model_name, digest, blob, _ in rows:
+                old = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE model = ? AND digest = ?",
+                    (model_name, digest)
+                ).fetchone()
+                if old is None:
+                    self._entries += 1
+                    self._bytes += len(blob)
+                else:
+                    self._bytes += len(blob) - old[0]
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": self._entries,
+                "size_mb": round(self._bytes / (1024 * 1024), 2)
+            }
+
+    def clear(self):
+        """Remove every cached vector."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._entries = self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        """Drop least recently used entries until at most 90% of the byte budget is used."""
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target and self._entries > 0:
+            batch = max(1, self._entries // 10)
+            rows = self._conn.execute(
+                "SELECT model, digest, LENGTH(vector) FROM embeddings "
+                "ORDER BY last_used LIMIT ?",
+                (batch,)
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND digest = ?",
+                [(model, digest) for model, digest, _ in rows]
+            )
+            self._entries -= len(rows)
+            self._bytes -= sum(size for _, _, size in rows)
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide cache, or None when caching is disabled."""
+    global _cache
+
+    if not EMBED_CACHE_ENABLED:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB * 1024 * 1024)
+                except sqlite3.Error as e:
+                    print(f"Warning: Embedding cache unavailable: {e}")
+                    return None
+
+    return _cache
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode('utf-8')).digest()
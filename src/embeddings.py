@@ -1,50 +1,144 @@
 """Embedding generation using Ollama."""
+import math
 import requests
-from typing import List
-from src.config import OLLAMA_URL, EMBED_MODEL
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from src.config import EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_CONCURRENCY, EMBED_TIMEOUT
+from src.embed_cache import get_embedding_cache
+from src.ollama_client import get_ollama_client
+from src.metrics import STAGE_SECONDS
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+# Set once the server answers /api/embed with a bare 404 (Ollama < 0.1.32)
+_legacy_endpoint = False
+
+@STAGE_SECONDS.time(stage="embed")
+def embed_texts(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> List[List[float]]:
     """
     Generate embeddings for a list of texts using Ollama.
-    
+
+    Texts already in the embedding cache are served from disk. The rest are
+    sent in batches to the multi-input /api/embed endpoint, with up to
+    `concurrency` batches in flight over the shared Ollama client, which
+    retries a failed batch on its own.
+
     Args:
         texts: List of text strings to embed
-    
+        batch_size: Texts per request (default: EMBED_BATCH_SIZE)
+        concurrency: Maximum parallel requests (default: EMBED_CONCURRENCY)
+
     Returns:
-        List of embedding vectors
+        List of embedding vectors, in the same order as `texts`
     """
     if not texts:
         return []
-    
-    url = f"{OLLAMA_URL}/api/embeddings"
-    embeddings = []
-    
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return _fetch_embeddings(texts, batch_size, concurrency)
+
+    vectors = cache.get_many(EMBED_MODEL, texts)
+
+    # Embed each distinct missing text once, even if it repeats in the input
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fetched = _fetch_embeddings(missing, batch_size, concurrency)
+        cache.put_many(EMBED_MODEL, missing, fetched)
+        by_text = dict(zip(missing, fetched))
+        vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+
+    return vectors
+
+def _fetch_embeddings(
+    texts: List[str],
+    batch_size: Optional[int],
+    concurrency: Optional[int]
+) -> List[List[float]]:
+    """Embed `texts` through Ollama, batched and in parallel."""
+    batch_size = max(1, batch_size or EMBED_BATCH_SIZE)
+    concurrency = max(1, concurrency or EMBED_CONCURRENCY)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
     try:
-        # Process each text individually for compatibility
-        for text in texts:
-            response = requests.post(
-                url,
-                json={
-                    "model": EMBED_MODEL,
-                    "prompt": text
-                },
-                timeout=120
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Handle both 'embedding' and 'embeddings' response formats
-            if 'embedding' in data and data['embedding']:
-                embeddings.append(data['embedding'])
-            elif 'embeddings' in data and data['embeddings']:
-                embeddings.append(data['embeddings'])
-            else:
-                raise ValueError(f"No embedding returned for text: {text[:50]}...")
-        
-        return embeddings
-            
+        if len(batches) == 1 or concurrency == 1:
+            results = [_embed_batch(batch) for batch in batches]
+        else:
+            # pool.map yields in submission order, so output order matches input
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+                results = list(pool.map(_embed_batch, batches))
+
+        return [vector for batch in results for vector in batch]
+
     except requests.RequestException as e:
         raise RuntimeError(f"Failed to generate embeddings: {e}")
     except (KeyError, ValueError) as e:
         raise RuntimeError(f"Invalid embedding response: {e}")
+
+def _embed_batch(batch: List[str]) -> List[List[float]]:
+    """Embed one batch, falling back to per-text calls on older servers."""
+    global _legacy_endpoint
+
+    if not _legacy_endpoint:
+        response = get_ollama_client().post(
+            "/api/embed",
+            json={
+                "model": EMBED_MODEL,
+                "input": batch
+            },
+            timeout=EMBED_TIMEOUT
+        )
+
+        if not _is_missing_endpoint(response):
+            response.raise_for_status()
+            embeddings = response.json().get('embeddings')
+
+            if not embeddings or len(embeddings) != len(batch):
+                raise ValueError(
+                    f"Expected {len(batch)} embeddings, got {len(embeddings or [])}"
+                )
+
+            return embeddings
+
+        print("Warning: /api/embed not available, falling back to /api/embeddings")
+        _legacy_endpoint = True
+
+    return [_embed_single(text) for text in batch]
+
+def _embed_single(text: str) -> List[float]:
+    """Embed one text with the legacy single-prompt endpoint."""
+    response = get_ollama_client().post(
+        "/api/embeddings",
+        json={
+            "model": EMBED_MODEL,
+            "prompt": text
+        },
+        timeout=EMBED_TIMEOUT
+    )
+    response.raise_for_status()
+
+    data = response.json()
+
+    # Handle both 'embedding' and 'embeddings' response formats
+    if 'embedding' in data and data['embedding']:
+        vector = data['embedding']
+    elif 'embeddings' in data and data['embeddings']:
+        vector = data['embeddings']
+    else:
+        raise ValueError(f"No embedding returned for text: {text[:50]}...")
+
+    # /api/embed returns unit-length vectors; match it so both paths are comparable
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+def _is_missing_endpoint(response: requests.Response) -> bool:
+    """Tell an unknown route apart from a JSON 404 such as 'model not found'."""
+    if response.status_code != 404:
+        return False
+
+    try:
+        return 'error' not in response.json()
+    except ValueError:
+        return True
@@ -0,0 +1,205 @@
+"""On-disk inverted index with BM25 scoring for lexical retrieval."""
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+
+# Identifiers such as "ERR-4012", "v2.3.1" or "part/7781-B" stay whole
+_TOKEN = re.compile(r"[0-9A-Za-z]+(?:[._\-/:][0-9A-Za-z]+)*")
+_PART = re.compile(r"[0-9A-Za-z]+")
+
+_indexes: Dict[str, "LexicalIndex"] = {}
+_indexes_lock = threading.Lock()
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens for indexing and querying.
+
+    A compound identifier is emitted whole and also as its parts, so
+    "ERR-4012" matches queries for "err-4012", "ERR 4012" and "4012".
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_PART.findall(token))
+    return tokens
+
+class LexicalIndex:
+    """
+    BM25 index stored in SQLite.
+
+    Postings are (term, doc, tf) rows in a WITHOUT ROWID table clustered by
+    term, so a query term is one contiguous range read. Documents themselves
+    are not duplicated here; only their chunk ID, file path and length.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS docs (
+                doc INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                file_path TEXT,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS docs_file_path ON docs (file_path);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats VALUES ('doc_count', 0), ('total_length', 0);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Index chunks, replacing any previous version of the same IDs."""
+        with self._lock:
+            self._delete_where("chunk_id IN (SELECT value FROM json_each(?))", (_json_list(ids),))
+
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                counts = Counter(tokenize(document))
+                length = sum(counts.values())
+                cursor = self._conn.execute(
+                    "INSERT INTO docs (chunk_id, file_path, length) VALUES (?, ?, ?)",
+                    (chunk_id, (metadata or {}).get("file_path"), length)
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in counts.items()]
+                )
+                self._bump_stats(1, length)
+
+            self._conn.commit()
+
+    def delete_file(self, file_path: str):
+        """Remove every chunk indexed from `file_path`."""
+        with self._lock:
+            self._delete_where("file_path = ?", (file_path,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("UPDATE stats SET value = 0")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._stat("doc_count")
+
+    def search(self, query_text: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Returns:
+            Up to k (chunk_id, score) pairs, best first
+        """
+        terms = set(tokenize(query_text))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count = self._stat("doc_count")
+            if doc_count == 0:
+                return []
+            avg_length = self._stat("total_length") / doc_count
+
+            scores: Dict[int, float] = {}
+            term_freqs = []
+            for term in terms:
+                postings = self._conn.execute(
+                    "SELECT doc, tf FROM postings WHERE term = ?", (term,)
+                ).fetchall()
+                if postings:
+                    df = len(postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    term_freqs.append((idf, postings))
+
+            if not term_freqs:
+                return []
+
+            candidates = {doc for _, postings in term_freqs for doc, _ in postings}
+            lengths = dict(self._conn.execute(
+                "SELECT doc, length FROM docs WHERE doc IN (SELECT value FROM json_each(?))",
+                (_json_list(list(candidates)),)
+            ).fetchall())
+
+            for idf, postings in term_freqs:
+                for doc, tf in postings:
+                    norm = self.k1 * (1 - self.b + self.b * lengths.get(doc, avg_length) / avg_length)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            chunk_ids = dict(self._conn.execute(
+                "SELECT doc, chunk_id FROM docs WHERE doc IN (SELECT value FROM json_each(?))",
+                (_json_list([doc for doc, _ in top]),)
+            ).fetchall())
+
+        return [(chunk_ids[doc], score) for doc, score in top if doc in chunk_ids]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _delete_where(self, condition: str, params: Tuple):
+        rows = self._conn.execute(
+            f"SELECT doc, length FROM docs WHERE {condition}", params
+        ).fetchall()
+        if not rows:
+            return
+        docs = _json_list([doc for doc, _ in rows])
+        self._conn.execute(
+            "DELETE FROM postings WHERE doc IN (SELECT value FROM json_each(?))", (docs,)
+        )
+        self._conn.execute(
+            "DELETE FROM docs WHERE doc IN (SELECT value FROM json_each(?))", (docs,)
+        )
+        self._bump_stats(-len(rows), -sum(length for _, length in rows))
+
+    def _bump_stats(self, docs: int, length: int):
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'doc_count'", (docs,))
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (length,))
+
+    def _stat(self, key: str) -> int:
+        return self._conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()[0]
+
+def get_lexical_index(persist_dir: str, collection_name: str) -> LexicalIndex:
+    """Get the shared lexical index for a collection, opening it on first use."""
+    path = os.path.join(persist_dir, f"lexical_{collection_name}.sqlite3")
+
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = LexicalIndex(path)
+        return index
+
+def _json_list(values: List) -> str:
+    """Bind a list as one parameter, expanded in SQL with json_each()."""
+    return json.dumps(values)
@@ -1,54 +1,83 @@
 """LLM interaction using Ollama chat API."""
+import json
+import time
 import requests
-from typing import List, Dict
-from src.config import OLLAMA_URL, CHAT_MODEL
+from typing import List, Dict, Iterator
+from src.config import CHAT_MODEL, CHAT_TIMEOUT, OLLAMA_KEEP_ALIVE
+from src.ollama_client import get_ollama_client
+from src.metrics import observe_generation
 
 def chat(messages: List[Dict[str, str]]) -> str:
     """
     Send chat messages to Ollama and get response.
-    
+
     Args:
         messages: List of message dictionaries with 'role' and 'content'
-    
+
     Returns:
         Response text from the model
     """
-    import json
-    
-    url = f"{OLLAMA_URL}/api/chat"
-    
+    try:
+        return ''.join(chat_stream(messages))
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Error processing chat response: {e}")
+
+def chat_stream(messages: List[Dict[str, str]]) -> Iterator[str]:
+    """
+    Send chat messages to Ollama and yield the response as it is generated.
+
+    Closing the generator early closes the HTTP response, which stops
+    Ollama from generating the rest of the answer. The shared Ollama client
+    retries the request until the answer starts streaming, never after.
+
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+
+    Yields:
+        Pieces of response text, in order
+    """
+    started = time.perf_counter()
+    first_token = final = None
     try:
         # Use streaming mode since non-streaming appears to hang
-        response = requests.post(
-            url,
+        with get_ollama_client().post(
+            "/api/chat",
             json={
                 "model": CHAT_MODEL,
                 "messages": messages,
-                "stream": True
+                "stream": True,
+                **({"keep_alive": OLLAMA_KEEP_ALIVE} if OLLAMA_KEEP_ALIVE != "" else {})
             },
-            timeout=60,
-            stream=True
-        )
-        response.raise_for_status()
-        
-        # Collect the streaming response
-        content_parts = []
-        for line in response.iter_lines():
-            if line:
+            timeout=CHAT_TIMEOUT,
+            stream=True,
+            read_timeout=CHAT_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+
+            # chunk_size=None hands lines over as they arrive instead of
+            # waiting for 512-byte reads to fill
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
                 try:
                     data = json.loads(line.decode())
-                    if isinstance(data, dict) and 'message' in data:
-                        if 'content' in data['message']:
-                            content_parts.append(data['message']['content'])
-                        if data.get('done', False):
-                            break
                 except json.JSONDecodeError:
                     # Skip lines that aren't valid JSON
                     continue
-        
-        return ''.join(content_parts)
-            
+
+                if isinstance(data, dict) and 'message' in data:
+                    content = data['message'].get('content')
+                    if content:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        yield content
+                    if data.get('done', False):
+                        final = data
+                        break
+
     except requests.RequestException as e:
         raise RuntimeError(f"Failed to get chat response: {e}")
-    except Exception as e:
-        raise RuntimeError(f"Error processing chat response: {e}")
+    finally:
+        observe_generation(started, first_token, final)
@@ -0,0 +1,95 @@
+"""Ingestion manifest for incremental re-ingestion."""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+MANIFEST_NAME = "ingest_manifest.json"
+
+class Manifest:
+    """
+    Records (size, mtime, sha256, chunk count) for every ingested file.
+
+    A file whose size and mtime are unchanged is trusted without reading it;
+    otherwise its content hash decides whether it really changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring unreadable manifest {path}: {e}")
+
+    @classmethod
+    def for_store(cls, persist_dir: str) -> "Manifest":
+        """Load the manifest kept alongside a vector store."""
+        return cls(os.path.join(persist_dir, MANIFEST_NAME))
+
+    def changed(self, file_path: str) -> Optional[str]:
+        """
+        Check whether a file differs from its recorded state.
+
+        Returns:
+            The file's sha256 if it is new or modified, otherwise None
+        """
+        entry = self.files.get(file_path)
+        stat = os.stat(file_path)
+
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return None
+
+        digest = file_sha256(file_path)
+        if entry and entry["sha256"] == digest:
+            # Touched but identical: refresh the stat so the next run skips hashing
+            entry["size"] = stat.st_size
+            entry["mtime"] = stat.st_mtime
+            return None
+
+        return digest
+
+    def record(self, file_path: str, digest: str, chunks: int):
+        """Record a file as ingested with the given content hash."""
+        stat = os.stat(file_path)
+        self.files[file_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": digest,
+            "chunks": chunks
+        }
+
+    def forget(self, file_path: str):
+        self.files.pop(file_path, None)
+
+    def missing_under(self, folder: str, present: List[str]) -> List[str]:
+        """Recorded files below `folder` that are no longer in `present`."""
+        root = Path(folder).resolve()
+        present = set(present)
+        return [
+            path for path in self.files
+            if path not in present and root in Path(path).resolve().parents
+        ]
+
+    def save(self):
+        """Write the manifest atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+def file_sha256(file_path: str) -> str:
+    """Hash a file's contents in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
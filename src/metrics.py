@@ -0,0 +1,254 @@
+"""In-process latency histograms and counters, rendered in Prometheus text format."""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bucket upper bounds in seconds, from a cached prompt to a long generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonically increasing total."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [f"{self.name}{self._labels(key)} {_number(v)}" for key, v in values]
+
+class Gauge(Counter):
+    """Value that goes up and down, such as a queue depth."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets.
+
+    Observations are counted into the first bucket whose upper bound they do
+    not exceed; Prometheus reports buckets cumulatively, which render() does.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts (the last is +Inf), then count and sum
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0, 0.0]
+            series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the seconds spent in a `with` block or decorated function."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-2] if series else 0
+
+    def sum(self, **labels) -> float:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-1] if series else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, list(series)) for key, series in self._series.items())
+
+        lines = super().render()
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, bucket)} {cumulative}")
+            lines.append(f"{self.name}_count{self._labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(series[-1])}")
+        return lines
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Time spent in each stage of answering a question.",
+    labelnames=("stage",)
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "rag_ingest_stage_seconds",
+    "Time spent in each stage of ingesting a file.",
+    labelnames=("stage",)
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "rag_llm_time_to_first_token_seconds",
+    "Time from sending a chat request to receiving the first answer token."
+)
+TOKENS_PER_SECOND = Histogram(
+    "rag_llm_tokens_per_second",
+    "Generation speed reported by Ollama (eval_count / eval_duration).",
+    buckets=RATE_BUCKETS
+)
+GENERATED_TOKENS = Counter(
+    "rag_llm_generated_tokens_total",
+    "Answer tokens generated, as reported by Ollama's eval_count."
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "rag_http_request_seconds",
+    "API request latency, until the response (or its stream) started.",
+    labelnames=("path", "status")
+)
+BATCH_SIZE = Histogram(
+    "rag_batch_size",
+    "Items per micro-batch sent to Ollama.",
+    labelnames=("batcher",),
+    buckets=SIZE_BUCKETS
+)
+BATCH_WAIT_SECONDS = Histogram(
+    "rag_batch_wait_seconds",
+    "Time an item waited for its micro-batch to be sent.",
+    labelnames=("batcher",)
+)
+BATCH_QUEUE_DEPTH = Gauge(
+    "rag_batch_queue_depth",
+    "Items waiting for their micro-batch to be sent.",
+    labelnames=("batcher",)
+)
+
+OLLAMA_REQUEST_SECONDS = Histogram(
+    "rag_ollama_request_seconds",
+    "Ollama request latency per server (streams: until the answer ends).",
+    labelnames=("endpoint", "role")
+)
+OLLAMA_OUTSTANDING = Gauge(
+    "rag_ollama_outstanding_requests",
+    "Requests in flight per Ollama server.",
+    labelnames=("endpoint",)
+)
+OLLAMA_FAILURES = Counter(
+    "rag_ollama_failures_total",
+    "Failed Ollama requests (connection errors, timeouts, 5xx) per server.",
+    labelnames=("endpoint",)
+)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "rag_admission_queue_wait_seconds",
+    "Time an admitted API request waited for a generation slot."
+)
+REJECTED_REQUESTS = Counter(
+    "rag_admission_rejected_total",
+    "API requests turned away: 429 with the queue full, 503 after waiting too long.",
+    labelnames=("status",)
+)
+ABANDONED_REQUESTS = Counter(
+    "rag_abandoned_requests_total",
+    "Admitted API requests stopped early, by reason (disconnect, deadline).",
+    labelnames=("reason",)
+)
+
+def observe_generation(started: float, first_token: Optional[float], final: Optional[Dict[str, Any]]):
+    """
+    Record one chat generation.
+
+    Args:
+        started: perf_counter() when the request was sent
+        first_token: perf_counter() when the first answer piece arrived, if any
+        final: Ollama's closing `done` message, carrying eval_count and
+            eval_duration (nanoseconds), if the answer finished
+    """
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="generate")
+    if first_token is not None:
+        TIME_TO_FIRST_TOKEN.observe(first_token - started)
+
+    if not final:
+        return
+    tokens = final.get("eval_count")
+    duration = final.get("eval_duration")
+    if isinstance(tokens, (int, float)) and tokens > 0:
+        GENERATED_TOKENS.inc(tokens)
+        if isinstance(duration, (int, float)) and duration > 0:
+            TOKENS_PER_SECOND.observe(tokens / (duration / 1e9))
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -0,0 +1,589 @@
+"""In-process vector store backed by a memory-mapped NumPy matrix."""
+import json
+import math
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.quantization import make_quantizer
+
+# Rows scored per matrix product, bounding the temporary float32 copy
+BLOCK_ROWS = 65536
+# Below this many rows a flat scan beats probing an IVF index
+IVF_MIN_ROWS = 20000
+# Rows needed before product quantization codebooks are trained
+PQ_MIN_ROWS = 4096
+
+_collections: Dict[str, "NumpyCollection"] = {}
+_collections_lock = threading.Lock()
+
+class NumpyClient:
+    """
+    Stand-in for chromadb.PersistentClient that opens NumpyCollections.
+
+    Collections live in `numpy_<name>/` under `path`, next to the version
+    file and lexical index the store keeps for every backend.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dtype: str = "float32",
+        index: str = "flat",
+        nlist: int = 0,
+        nprobe: int = 8,
+        quantization: str = "none",
+        subvectors: int = 0,
+        rerank: int = 16
+    ):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.options = {
+            "dtype": dtype,
+            "index": index,
+            "nlist": nlist,
+            "nprobe": nprobe,
+            "quantization": quantization,
+            "subvectors": subvectors,
+            "rerank": rerank
+        }
+
+    def get_or_create_collection(self, name: str) -> "NumpyCollection":
+        """Open a collection, sharing one instance per directory in this process."""
+        directory = os.path.abspath(os.path.join(self.path, f"numpy_{name}"))
+
+        with _collections_lock:
+            collection = _collections.get(directory)
+            if collection is None:
+                collection = _collections[directory] = NumpyCollection(
+                    name, directory, persist_directory=self.path, **self.options
+                )
+            return collection
+
+class NumpyCollection:
+    """
+    Vector collection implementing the part of the Chroma Collection API the
+    store uses: upsert, delete, get, query and count.
+
+    Vectors are L2-normalized on insert and kept in a (capacity, dim) float32
+    or float16 matrix memory-mapped from `vectors.bin`, so a query is a
+    blocked matrix product followed by argpartition. Row i holds the record
+    whose `slot` is i in `records.sqlite3`, which also stores documents and
+    metadata. Deletes move the last row into the gap to keep rows dense.
+
+    With index="ivf", rows are also assigned to k-means lists once the
+    collection reaches IVF_MIN_ROWS, and a query scans only the `nprobe`
+    lists closest to it. Distances are cosine distances (1 - similarity).
+
+    With quantization="int8" or "pq", every row also has a compact code in
+    `codes.bin`. Queries score the codes, then re-rank the best
+    `k * rerank` candidates with exact rows read from `vectors.bin`, so only
+    the codes need to stay in memory. Product quantization starts once the
+    collection reaches PQ_MIN_ROWS; smaller collections are searched exactly.
+
+    Training and encoding only happen on the write path: rows stored under
+    another setting are searched exactly until the next upsert() or
+    build_index() codes them, so reads never wait on a rebuild.
+    """
+
+    # Chroma reports the distance function in the collection metadata
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(
+        self,
+        name: str,
+        directory: str,
+        dtype: str = "float32",
+        index: str = "flat",
+        nlist: int = 0,
+        nprobe: int = 8,
+        quantization: str = "none",
+        subvectors: int = 0,
+        rerank: int = 16,
+        persist_directory: Optional[str] = None
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"Unsupported vector index: {index}")
+        if quantization not in ("none", "int8", "pq"):
+            raise ValueError(f"Unsupported vector quantization: {quantization}")
+
+        os.makedirs(directory, exist_ok=True)
+        self.name = name
+        self.directory = directory
+        self.persist_directory = persist_directory or os.path.dirname(directory)
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.quantization = quantization
+        self.subvectors = subvectors
+        self.rerank = max(1, rerank)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, "records.sqlite3"), check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS records (
+                slot INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                document TEXT,
+                metadata TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('dtype', ?)", (dtype,))
+        self._conn.commit()
+
+        # An existing collection keeps the precision it was created with
+        self.dtype = np.dtype(self._meta("dtype"))
+        self._vectors = self._lists = self._codes = self._scales = self._vector_file = None
+        self._generation = None
+        self._refresh()
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def build_index(self):
+        """Train and encode whatever the configured index and codes need but the stored rows lack."""
+        with self._lock:
+            self._refresh()
+            self._build_index()
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ):
+        """Insert records, replacing any with the same IDs."""
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one embedding per ID")
+
+        with self._lock:
+            self._refresh()
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._set_meta("dim", self._dim)
+                self._load_quantizer()
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self._dim}")
+            else:
+                self._build_index()
+
+            slots = dict(self._conn.execute(
+                "SELECT id, slot FROM records WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(ids),)
+            ).fetchall())
+            rows = []
+            for chunk_id in ids:
+                if chunk_id not in slots:
+                    slots[chunk_id] = self._count
+                    self._count += 1
+                rows.append(slots[chunk_id])
+
+            self._reserve(self._count)
+            self._vectors[rows] = vectors.astype(self.dtype)
+            if self._centroids is not None:
+                self._lists[rows] = _nearest(vectors, self._centroids)
+            if self._codes_ready():
+                self._store_codes(rows, vectors)
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (slot, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (slot, chunk_id, document, json.dumps(metadata or {}))
+                    for slot, chunk_id, document, metadata in zip(rows, ids, documents, metadatas)
+                ]
+            )
+            self._commit()
+
+            if self.index == "ivf" and self._count >= max(IVF_MIN_ROWS, 2 * self._trained_rows):
+                self._train()
+            if self.quantization == "pq" and self._count >= max(PQ_MIN_ROWS, 2 * self._pq_rows):
+                self._train_codes()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Delete records by ID and/or metadata equality filter."""
+        condition, params = _filter_sql(ids, where)
+
+        with self._lock:
+            self._refresh()
+            slots = [slot for slot, in self._conn.execute(
+                f"SELECT slot FROM records WHERE {condition}", params
+            ).fetchall()]
+
+            # Highest first, so the row moved into each gap is never one still to delete
+            for slot in sorted(slots, reverse=True):
+                last = self._count - 1
+                self._conn.execute("DELETE FROM records WHERE slot = ?", (slot,))
+                if slot != last:
+                    self._vectors[slot] = self._vectors[last]
+                    self._lists[slot] = self._lists[last]
+                    if self._codes is not None:
+                        self._codes[slot] = self._codes[last]
+                    if self._scales is not None:
+                        self._scales[slot] = self._scales[last]
+                    self._conn.execute("UPDATE records SET slot = ? WHERE slot = ?", (slot, last))
+                self._count -= 1
+
+            if slots:
+                self._commit()
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Fetch records by ID and/or metadata equality filter, in slot order."""
+        include = include if include is not None else ["documents", "metadatas"]
+        condition, params = _filter_sql(ids, where)
+        sql = f"SELECT slot, id, document, metadata FROM records WHERE {condition} ORDER BY slot"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + (-1 if limit is None else limit, offset or 0)
+
+        with self._lock:
+            self._refresh()
+            rows = self._conn.execute(sql, params).fetchall()
+            vectors = self._vectors[[row[0] for row in rows]] if "embeddings" in include and rows else None
+
+        return {
+            "ids": [row[1] for row in rows],
+            "documents": [row[2] for row in rows] if "documents" in include else None,
+            "metadatas": [json.loads(row[3]) for row in rows] if "metadatas" in include else None,
+            "embeddings": vectors.astype(np.float32).tolist() if vectors is not None else None
+        }
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """Nearest records for each query embedding, most similar first."""
+        queries = _normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        with self._lock:
+            self._refresh()
+            if self._count == 0:
+                for key in results:
+                    results[key] = [[] for _ in queries]
+                return results
+
+            if self._dim is not None and queries.shape[1] != self._dim:
+                raise ValueError(f"Query dimension {queries.shape[1]} does not match collection dimension {self._dim}")
+
+            k = max(1, min(n_results, self._count))
+            if self._centroids is not None:
+                hits = [self._search_ivf(query, k) for query in queries]
+            else:
+                hits = self._search_flat(queries, k)
+
+            wanted = sorted({slot for slots, _ in hits for slot in slots})
+            records = {
+                slot: (chunk_id, document, metadata)
+                for slot, chunk_id, document, metadata in self._conn.execute(
+                    "SELECT slot, id, document, metadata FROM records "
+                    "WHERE slot IN (SELECT value FROM json_each(?))",
+                    (json.dumps(wanted),)
+                ).fetchall()
+            }
+
+        for slots, scores in hits:
+            results["ids"].append([records[slot][0] for slot in slots])
+            results["documents"].append([records[slot][1] for slot in slots])
+            results["metadatas"].append([json.loads(records[slot][2]) for slot in slots])
+            results["distances"].append([float(1.0 - score) for score in scores])
+        return results
+
+    def close(self):
+        with self._lock:
+            self._close_maps()
+            self._conn.close()
+
+    def _search_flat(self, queries: np.ndarray, k: int) -> List[Tuple[List[int], np.ndarray]]:
+        """Top-k over every row, for a batch of queries."""
+        if self._codes_ready():
+            rows = np.arange(self._count)
+            return [self._rerank(query, rows, self._code_scores(query, slice(0, self._count)), k) for query in queries]
+
+        scores = np.empty((len(queries), self._count), dtype=np.float32)
+        for start in range(0, self._count, BLOCK_ROWS):
+            block = np.asarray(self._vectors[start:min(start + BLOCK_ROWS, self._count)], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return [_top_k(np.arange(self._count), row, k) for row in scores]
+
+    def _search_ivf(self, query: np.ndarray, k: int) -> Tuple[List[int], np.ndarray]:
+        """Approximate top-k over the rows of the lists nearest the query."""
+        order, bounds = self._inverted_lists()
+        nprobe = min(self.nprobe, len(self._centroids))
+        probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+
+        candidates = np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes])
+        if len(candidates) < k:
+            # Sparse lists: fall back to an exact scan rather than return too few
+            return self._search_flat(query[None, :], k)[0]
+
+        candidates.sort()  # sequential reads from the memory map
+        if self._codes_ready():
+            return self._rerank(query, candidates, self._code_scores(query, candidates), k)
+        scores = np.asarray(self._vectors[candidates], dtype=np.float32) @ query
+        return _top_k(candidates, scores, k)
+
+    def _code_scores(self, query: np.ndarray, rows) -> np.ndarray:
+        """Approximate scores of `rows` (a slice or row numbers) from their codes."""
+        scales = self._scales[rows] if self._scales is not None else None
+        return self._quantizer.scores(self._quantizer.prepare(query), self._codes[rows], scales)
+
+    def _rerank(self, query: np.ndarray, rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[List[int], np.ndarray]:
+        """Re-score the best approximate candidates with exact vectors from disk."""
+        shortlist, _ = _top_k(rows, scores, min(len(rows), k * self.rerank))
+        shortlist = np.sort(shortlist)
+        return _top_k(shortlist, self._read_rows(shortlist) @ query, k)
+
+    def _read_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Read exact rows with plain file reads.
+
+        Touching scattered rows through the memory map would fault in their
+        neighbouring pages too, leaving far more than the codes resident.
+        """
+        rows_out = np.empty((len(rows), self._dim), dtype=self.dtype)
+        row_bytes = self._dim * self.dtype.itemsize
+        for i, row in enumerate(rows):
+            self._vector_file.seek(int(row) * row_bytes)
+            self._vector_file.readinto(rows_out[i])
+        return rows_out.astype(np.float32)
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers grouped by IVF list, with the start offset of each list."""
+        if self._inverted is None:
+            lists = np.asarray(self._lists[:self._count])
+            order = np.argsort(lists, kind="stable")
+            bounds = np.searchsorted(lists[order], np.arange(len(self._centroids) + 1))
+            self._inverted = (order, bounds)
+        return self._inverted
+
+    def _train(self):
+        """Fit IVF centroids with spherical k-means and assign every row."""
+        nlist = self.nlist or max(1, int(math.sqrt(self._count)))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(self._count, min(self._count, nlist * 64), replace=False))
+        sample = np.asarray(self._vectors[sample_rows], dtype=np.float32)
+
+        centroids = _kmeans(sample, min(nlist, len(sample)), rng)
+        for start in range(0, self._count, BLOCK_ROWS):
+            block = np.asarray(self._vectors[start:min(start + BLOCK_ROWS, self._count)], dtype=np.float32)
+            self._lists[start:start + len(block)] = _nearest(block, centroids)
+
+        np.save(os.path.join(self.directory, "centroids.npy"), centroids)
+        self._centroids = centroids
+        self._trained_rows = self._count
+        self._set_meta("trained_rows", self._count)
+        self._commit()
+
+    def _train_codes(self):
+        """Fit product quantization codebooks and encode every row."""
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(self._count, min(self._count, 40 * 256), replace=False))
+        self._quantizer.train(np.asarray(self._vectors[sample_rows], dtype=np.float32), rng)
+        np.save(self._path("codebooks.npy"), self._quantizer.codebooks)
+
+        self._encode_all()
+        self._pq_rows = self._count
+        self._set_meta("pq_rows", self._count)
+        self._commit()
+
+    def _build_index(self):
+        if self.index == "ivf" and not self._trained_rows and self._count >= IVF_MIN_ROWS:
+            self._train()
+        # Rows stored under another setting get codes before any more are added
+        if self._quantizer is not None and self._count:
+            if not self._quantizer.trained:
+                if self._count >= PQ_MIN_ROWS:
+                    self._train_codes()
+            elif not self._codes_current:
+                self._encode_all()
+                self._commit()
+
+    def _encode_all(self):
+        """Rewrite the code of every row with the current quantizer."""
+        for start in range(0, self._count, BLOCK_ROWS):
+            rows = np.arange(start, min(start + BLOCK_ROWS, self._count))
+            self._store_codes(rows, np.asarray(self._vectors[rows], dtype=np.float32))
+        self._codes_current = True
+
+    def _store_codes(self, rows, vectors: np.ndarray):
+        codes, scales = self._quantizer.encode(vectors)
+        self._codes[rows] = codes
+        if scales is not None:
+            self._scales[rows] = scales
+        self._set_meta("codes", self.quantization)
+
+    def _codes_ready(self) -> bool:
+        return self._codes_current and self._quantizer.trained and self._codes is not None
+
+    def _load_quantizer(self):
+        """Set up the quantizer, loading trained codebooks if the codes match."""
+        self._quantizer = None
+        self._codes_current = False
+        if self.quantization == "none" or self._dim is None:
+            return
+
+        quantizer = make_quantizer(self.quantization, self._dim, self.subvectors)
+        codes_match = self._meta("codes") == self.quantization
+        # A new collection has no rows to code yet
+        self._codes_current = codes_match or not self._count
+        if self.quantization == "pq" and codes_match and os.path.exists(self._path("codebooks.npy")):
+            codebooks = np.load(self._path("codebooks.npy"))
+            if codebooks.shape[0] == quantizer.code_size:
+                quantizer.codebooks = codebooks
+        self._quantizer = quantizer
+        if not quantizer.trained:
+            self._pq_rows = 0
+
+    def _reserve(self, rows: int):
+        """Grow the memory-mapped files to hold at least `rows` rows."""
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        self._close_maps()
+        _resize(self._path("vectors.bin"), capacity * self._dim * self.dtype.itemsize)
+        _resize(self._path("lists.bin"), capacity * 4)
+        self._set_meta("capacity", capacity)
+        self._open_maps(capacity)
+
+    def _open_maps(self, capacity: int):
+        self._close_maps()
+        self._capacity = capacity
+        if capacity == 0:
+            return
+        self._vectors = np.memmap(self._path("vectors.bin"), dtype=self.dtype, mode="r+", shape=(capacity, self._dim))
+        self._lists = np.memmap(self._path("lists.bin"), dtype=np.int32, mode="r+", shape=(capacity,))
+
+        if self._quantizer is not None:
+            code_dtype = np.dtype(self._quantizer.code_dtype)
+            _resize(self._path("codes.bin"), capacity * self._quantizer.code_size * code_dtype.itemsize)
+            self._codes = np.memmap(
+                self._path("codes.bin"), dtype=code_dtype, mode="r+", shape=(capacity, self._quantizer.code_size)
+            )
+            if self.quantization == "int8":
+                _resize(self._path("scales.bin"), capacity * 4)
+                self._scales = np.memmap(self._path("scales.bin"), dtype=np.float32, mode="r+", shape=(capacity,))
+            self._vector_file = open(self._path("vectors.bin"), "rb", buffering=0)
+
+    def _close_maps(self):
+        if self._vector_file is not None:
+            self._vector_file.close()
+        self._vectors = self._lists = self._codes = self._scales = self._vector_file = None
+
+    def _commit(self):
+        """Flush rows to disk, then publish the new state to other processes."""
+        for mapped in (self._vectors, self._lists, self._codes, self._scales):
+            if mapped is not None:
+                mapped.flush()
+        self._generation = int(self._meta("generation") or 0) + 1
+        self._set_meta("count", self._count)
+        self._set_meta("generation", self._generation)
+        self._conn.commit()
+        self._inverted = None
+
+    def _refresh(self):
+        """Reload sizes and maps if another process changed the collection."""
+        generation = int(self._meta("generation") or 0)
+        if generation == self._generation:
+            return
+
+        self._generation = generation
+        self._count = int(self._meta("count") or 0)
+        dim = self._meta("dim")
+        self._dim = int(dim) if dim else None
+        self._trained_rows = int(self._meta("trained_rows") or 0)
+        self._centroids = None
+        self._inverted = None
+        if self.index == "ivf" and self._trained_rows:
+            self._centroids = np.load(self._path("centroids.npy"))
+        self._pq_rows = int(self._meta("pq_rows") or 0)
+        self._load_quantizer()
+        self._open_maps(int(self._meta("capacity") or 0))
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[List[int], np.ndarray]:
+    """The k best (rows, scores), best first."""
+    if k < len(scores):
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(scores))
+    best = best[np.argsort(-scores[best], kind="stable")]
+    return rows[best].tolist(), scores[best]
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+def _kmeans(sample: np.ndarray, nlist: int, rng, iterations: int = 10) -> np.ndarray:
+    """Spherical k-means: centroids are unit vectors maximizing cosine similarity."""
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        filled = counts > 0
+        sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+        centroids[filled] = _normalize(sums)
+        # Re-seed empty lists so every centroid stays useful
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+
+    return centroids
+
+def _filter_sql(ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> Tuple[str, Tuple]:
+    """SQL condition for an ID list and Chroma-style metadata equality filter."""
+    clauses, params = [], []
+    if ids is not None:
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(ids))
+    for key, value in (where or {}).items():
+        if key.startswith("$") or isinstance(value, dict):
+            raise ValueError(f"Only metadata equality filters are supported, got {key!r}")
+        clauses.append("json_extract(metadata, ?) = ?")
+        params.extend([f'$."{key}"', value])
+    return " AND ".join(clauses) or "1", tuple(params)
+
+def _resize(path: str, size: int):
+    with open(path, "ab") as f:
+        f.truncate(size)
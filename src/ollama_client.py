@@ -0,0 +1,167 @@
+"""Shared Ollama HTTP client: pooled keep-alive session, retries and per-server circuit breakers."""
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import OLLAMA_URLS, EMBED_CONCURRENCY, OLLAMA_RETRIES, OLLAMA_BACKOFF, OLLAMA_BACKOFF_MAX
+from src.router import CircuitBreaker, CircuitOpenError, Endpoint, EndpointRouter, get_router, role_of
+
+# Seconds allowed for establishing a connection, within the request budget
+CONNECT_TIMEOUT = 5.0
+
+_client = None
+_client_lock = threading.Lock()
+
+class OllamaClient:
+    """
+    Keep-alive session shared by the embedding and chat modules.
+
+    Each post() is one logical request with a total time budget, sent to
+    the server the router picks. Attempts that fail with a connection
+    error, a timeout, a 5xx or a 429 are retried on their own, on another
+    server straight away if there is one, otherwise after a random delay of
+    up to backoff * 2**attempt seconds ("full jitter"), for as long as
+    retries and the budget last. Every attempt feeds its server's circuit
+    breaker, so while Ollama is down calls fail immediately instead of each
+    waiting out its timeout.
+    """
+
+    def __init__(
+        self,
+        base_url: Union[str, List[str], None] = None,
+        pool_size: int = EMBED_CONCURRENCY + 4,
+        retries: int = OLLAMA_RETRIES,
+        backoff: float = OLLAMA_BACKOFF,
+        backoff_max: float = OLLAMA_BACKOFF_MAX,
+        breaker: Optional[CircuitBreaker] = None,
+        session: Optional[requests.Session] = None,
+        router: Optional[EndpointRouter] = None
+    ):
+        if router is None and base_url is None and breaker is None:
+            # The configured servers, shared with the async client
+            router = get_router()
+        elif router is None:
+            router = EndpointRouter([base_url] if isinstance(base_url, str) else list(base_url or OLLAMA_URLS))
+            if breaker is not None:
+                router.endpoints[0].breaker = breaker
+        self.router = router
+        self.base_url = router.endpoints[0].url
+        # The first server's breaker; each server has its own
+        self.breaker = router.endpoints[0].breaker
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=len(router.endpoints), pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def post(
+        self,
+        path: str,
+        json: Dict[str, Any],
+        timeout: float,
+        stream: bool = False,
+        read_timeout: Optional[float] = None
+    ) -> requests.Response:
+        """
+        POST to an Ollama endpoint, retrying transient failures.
+
+        Args:
+            path: Endpoint path such as "/api/embed"
+            json: Request body
+            timeout: Seconds the request may take in total, retries included
+                (for a streamed request, until the response starts)
+            stream: Return as soon as the response headers arrive
+            read_timeout: Longest wait for data once the response started
+                (default: whatever remains of `timeout`)
+
+        Returns:
+            The response; a 5xx or 429 is returned as-is once retries run out.
+            A streamed response holds its server's slot until it is closed.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker of every server is open
+            requests.RequestException: If the last attempt failed to connect or timed out
+        """
+        role = role_of(path)
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        tried: Set[str] = set()
+
+        while True:
+            endpoint = self.router.acquire(role, exclude=tried)
+
+            remaining = max(0.001, deadline - time.monotonic())
+            started = time.perf_counter()
+            error = response = None
+            try:
+                response = self.session.post(
+                    f"{endpoint.url}{path}",
+                    json=json,
+                    timeout=(min(CONNECT_TIMEOUT, remaining), read_timeout or remaining),
+                    stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                self.router.release(endpoint, role, started, ok=False)
+            else:
+                ok = response.status_code < 500
+                if ok and response.status_code != 429:
+                    if stream:
+                        self._release_on_close(response, endpoint, role, started)
+                    else:
+                        self.router.release(endpoint, role, started, ok=True)
+                    return response
+                self.router.release(endpoint, role, started, ok=ok)
+
+            tried.add(endpoint.url)
+            if self.router.has_untried(role, tried):
+                delay = 0.0
+            else:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+            attempt += 1
+            if attempt > self.retries or time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def _release_on_close(self, response: requests.Response, endpoint: Endpoint, role: str, started: float):
+        """Keep the server reserved until a streamed response is closed."""
+        close = response.close
+        released = []
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self.router.release(endpoint, role, started, ok=True)
+
+        response.close = close_and_release
+
+    def close(self):
+        self.session.close()
+
+def get_ollama_client() -> OllamaClient:
+    """Get the process-wide client."""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+
+    return _client
@@ -0,0 +1,143 @@
+"""Context packing: fit retrieved chunks into the prompt's token budget."""
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import CONTEXT_TOKENS, MIN_SCORE, TOKENIZER_PATH
+from src.metrics import STAGE_SECONDS
+from src.tokenizer import get_token_counter
+
+# Shortest overlap stripped between neighbouring chunks; shorter matches
+# (a repeated word or heading) are more likely coincidence than overlap
+MIN_OVERLAP_CHARS = 16
+
+Context = Tuple[str, Dict[str, Any]]
+
+@STAGE_SECONDS.time(stage="pack")
+def pack_contexts(
+    contexts: List[Context],
+    token_budget: int = CONTEXT_TOKENS,
+    min_score: float = MIN_SCORE,
+    counter=None
+) -> List[Context]:
+    """
+    Prepare retrieved chunks for the prompt.
+
+    1. Chunks whose similarity "score" is below `min_score` are dropped.
+       Chunks without one (found by BM25 alone) are kept.
+    2. Repeated chunks are dropped, and consecutive chunks of the same file
+       are merged into one passage with their shared overlap removed.
+    3. Passages are taken best first while they fit in `token_budget`; the
+       best one is truncated if it alone does not fit.
+
+    Args:
+        contexts: (text, metadata) pairs, best first
+        token_budget: Most context tokens to keep (0 for no limit)
+        min_score: Lowest cosine similarity kept (0 keeps everything)
+        counter: Token counter (default: the chunker's)
+
+    Returns:
+        The packed (text, metadata) pairs, best first. A merged passage keeps
+        the first chunk's metadata, with "last_chunk" set to the last chunk
+        it covers and "score" to the best score among them.
+    """
+    kept = [
+        (rank, text, metadata or {})
+        for rank, (text, metadata) in enumerate(contexts)
+        if not _below(metadata or {}, min_score)
+    ]
+    passages = _merge_neighbours(kept)
+
+    if token_budget <= 0:
+        return passages
+
+    counter = counter or get_token_counter(TOKENIZER_PATH or None)
+    packed = []
+    remaining = token_budget
+    for text, metadata in passages:
+        tokens = counter.count(text)
+        if tokens <= remaining:
+            packed.append((text, metadata))
+            remaining -= tokens
+        elif not packed:
+            packed.append((_truncate(text, tokens, remaining), metadata))
+            break
+    return packed
+
+def _below(metadata: Dict[str, Any], min_score: float) -> bool:
+    score = metadata.get("score")
+    return min_score > 0 and isinstance(score, (int, float)) and score < min_score
+
+def _merge_neighbours(ranked: List[Tuple[int, str, Dict[str, Any]]]) -> List[Context]:
+    """Merge runs of consecutive chunks from one file, keeping the best rank of each run."""
+    by_source: Dict[Any, List[Tuple[int, str, Dict[str, Any]]]] = {}
+    seen = set()
+    for rank, text, metadata in ranked:
+        if text in seen:
+            continue
+        seen.add(text)
+        source = metadata.get("file_path") or metadata.get("source")
+        by_source.setdefault(source, []).append((rank, text, metadata))
+
+    passages = []
+    for source, chunks in by_source.items():
+        numbered = source is not None and all(isinstance(m.get("chunk"), int) for _, _, m in chunks)
+        if not numbered:
+            passages.extend((rank, text, metadata) for rank, text, metadata in chunks)
+            continue
+
+        chunks.sort(key=lambda item: item[2]["chunk"])
+        run = list(chunks[0])
+        for rank, text, metadata in chunks[1:]:
+            last = run[2].get("last_chunk", run[2]["chunk"])
+            if metadata["chunk"] == last + 1 and _same_page(run[2], metadata):
+                run[0] = min(run[0], rank)
+                run[1] = _join(run[1], text)
+                run[2] = {
+                    **run[2],
+                    "last_chunk": metadata["chunk"],
+                    **_best_score(run[2], metadata)
+                }
+            else:
+                passages.append(tuple(run))
+                run = [rank, text, metadata]
+        passages.append(tuple(run))
+
+    passages.sort(key=lambda item: item[0])
+    return [(text, metadata) for _, text, metadata in passages]
+
+def _same_page(first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+    # Page citations stay right only if a passage does not span pages
+    return first.get("page") == second.get("page")
+
+def _best_score(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    scores = [m["score"] for m in (first, second) if isinstance(m.get("score"), (int, float))]
+    return {"score": max(scores)} if scores else {}
+
+def _join(first: str, second: str) -> str:
+    """Concatenate two consecutive chunks, dropping the text they share."""
+    overlap = _overlap(first, second)
+    if overlap:
+        return first + second[overlap:]
+    return first.rstrip() + " " + second.lstrip()
+
+def _overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second`."""
+    limit = min(len(first), len(second))
+    if limit < MIN_OVERLAP_CHARS:
+        return 0
+
+    # Candidate starts are where the start of `second` occurs near the end of `first`
+    probe = second[:MIN_OVERLAP_CHARS]
+    start = first.find(probe, len(first) - limit)
+    while start != -1:
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start = first.find(probe, start + 1)
+    return 0
+
+def _truncate(text: str, tokens: int, budget: int) -> str:
+    """Cut `text` to about `budget` tokens, at a word boundary."""
+    if budget <= 0:
+        return ""
+    cut = text[:max(1, len(text) * budget // tokens)]
+    space = cut.rfind(" ")
+    return cut[:space] if space > len(cut) // 2 else cut
@@ -0,0 +1,279 @@
+"""PDF text extraction: page-parallel, streamed in page order, cached by file hash."""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from src.config import PDF_WORKERS, PDF_CACHE_ENABLED, PDF_CACHE_PATH, PDF_CACHE_MAX_MB
+from src.manifest import file_sha256
+
+# Pages each pool task extracts; small ranges let the first pages reach the
+# chunker early, large ones parse the file's cross-reference table less often
+PAGES_PER_TASK = 8
+# Pages read from the cache per query
+_READ_PAGES = 64
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+class PdfTextCache:
+    """
+    Extracted page text of PDFs, keyed by the sha256 of the file bytes.
+
+    Pages are stored as they are extracted, but a document is only served
+    once all of its pages were stored. Once the cached text, including the
+    pages of unfinished extractions, exceeds `max_bytes`, the least recently
+    used documents and unfinished extractions are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Extraction processes share the file, so wait out each other's writes
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                digest TEXT PRIMARY KEY,
+                pages INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        # Pages stored for documents not yet complete, so eviction can find them
+        has_partial = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partial'"
+        ).fetchone()
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS partial (
+                digest TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                digest TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (digest, page)
+            ) WITHOUT ROWID"""
+        )
+        if not has_partial:
+            # Caches from before the partial table may hold untracked leftovers
+            self._conn.execute("DELETE FROM pages WHERE digest NOT IN (SELECT digest FROM documents)")
+        self._conn.commit()
+
+    def page_count(self, digest: str) -> Optional[int]:
+        """Pages of a fully cached document, or None if it is not cached."""
+        with self._lock:
+            row = self._conn.execute("SELECT pages FROM documents WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE documents SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            self._conn.commit()
+            return row[0]
+
+    def iter_pages(self, digest: str, pages: int) -> Iterator[str]:
+        """Stream the text of a cached document's pages, a batch at a time."""
+        for start in range(0, pages, _READ_PAGES):
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT text FROM pages WHERE digest = ? AND page >= ? AND page < ? ORDER BY page",
+                    (digest, start, start + _READ_PAGES)
+                ).fetchall()
+            for (text,) in rows:
+                yield text
+
+    def put_pages(self, digest: str, first: int, texts: List[str]):
+        """Store consecutive pages starting at page index `first`."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (digest, page, text) VALUES (?, ?, ?)",
+                [(digest, first + i, text) for i, text in enumerate(texts)]
+            )
+            self._conn.execute(
+                "INSERT INTO partial (digest, bytes, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT (digest) DO UPDATE SET bytes = bytes + excluded.bytes, last_used = excluded.last_used",
+                (digest, sum(len(text) for text in texts), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def complete(self, digest: str, pages: int):
+        """Mark a document whose `pages` pages are all stored as servable."""
+        with self._lock:
+            stored, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM pages WHERE digest = ?", (digest,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM partial WHERE digest = ?", (digest,))
+            if stored == pages:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (digest, pages, bytes, last_used) VALUES (?, ?, ?, ?)",
+                    (digest, pages, size, time.time())
+                )
+            else:
+                # Some pages were evicted while the rest were extracted
+                self._conn.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+            self._evict()
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus current cache size."""
+        with self._lock:
+            documents, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM documents"
+            ).fetchone()
+            size += self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM partial").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "documents": documents,
+                "size_mb": round(size / (1024 * 1024), 2)
+            }
+
+    def clear(self):
+        """Remove every cached document."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM partial")
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        """Drop least recently used documents and unfinished extractions until at most 90% of the byte budget is used."""
+        total = self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(bytes), 0) FROM documents) + (SELECT COALESCE(SUM(bytes), 0) FROM partial)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for digest, size in self._conn.execute(
+            "SELECT digest, bytes FROM (SELECT digest, bytes, last_used FROM documents "
+            "UNION ALL SELECT digest, bytes, last_used FROM partial) ORDER BY last_used"
+        ).fetchall():
+            if total <= target:
+                break
+            evicted.append((digest,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM documents WHERE digest = ?", evicted)
+        self._conn.executemany("DELETE FROM partial WHERE digest = ?", evicted)
+        self._conn.executemany("DELETE FROM pages WHERE digest = ?", evicted)
+
+def get_pdf_cache() -> Optional[PdfTextCache]:
+    """Get this process's cache, or None when caching is disabled."""
+    global _cache, _cache_pid
+
+    if not PDF_CACHE_ENABLED:
+        return None
+
+    # A connection inherited from a forked parent must not be reused
+    if _cache is None or _cache_pid != os.getpid():
+        with _cache_lock:
+            if _cache is None or _cache_pid != os.getpid():
+                try:
+                    _cache = PdfTextCache(PDF_CACHE_PATH, PDF_CACHE_MAX_MB * 1024 * 1024)
+                    _cache_pid = os.getpid()
+                except sqlite3.Error as e:
+                    print(f"Warning: PDF text cache unavailable: {e}")
+                    return None
+
+    return _cache
+
+def iter_pdf_pages(file_path: str, workers: int = PDF_WORKERS, digest: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF, in page order.
+
+    A file extracted before is read back from the text cache without parsing
+    it. Otherwise page ranges are extracted by up to `workers` processes,
+    and each page is cached as it streams past.
+
+    Args:
+        file_path: Path to the PDF
+        workers: Extraction processes (1 extracts in the calling process)
+        digest: sha256 of the file, if the caller already has it
+    """
+    cache = get_pdf_cache()
+    if cache is not None:
+        digest = digest or file_sha256(file_path)
+        pages = cache.page_count(digest)
+        if pages is not None:
+            yield from cache.iter_pages(digest, pages)
+            return
+
+    pages = 0
+    for first, texts in _extract_ranges(file_path, workers):
+        if cache is not None:
+            cache.put_pages(digest, first, texts)
+        pages += len(texts)
+        yield from texts
+
+    if cache is not None:
+        cache.complete(digest, pages)
+
+def _extract_ranges(file_path: str, workers: int) -> Iterator[Tuple[int, List[str]]]:
+    """Yield (first page index, page texts) for consecutive page ranges."""
+    import pypdf
+
+    with open(file_path, 'rb') as file:
+        reader = pypdf.PdfReader(file)
+        total = len(reader.pages)
+
+        if workers <= 1 or total <= PAGES_PER_TASK:
+            for i, page in enumerate(reader.pages):
+                yield i, [page.extract_text() or ""]
+            return
+
+    ranges = iter(range(0, total, PAGES_PER_TASK))
+    pool = ProcessPoolExecutor(max_workers=min(workers, -(-total // PAGES_PER_TASK)))
+    in_flight = deque()
+
+    def submit(first: int):
+        stop = min(first + PAGES_PER_TASK, total)
+        in_flight.append((first, pool.submit(_extract_range, file_path, first, stop)))
+
+    try:
+        # Keep a couple of ranges queued per worker, collected in page order
+        for first in islice(ranges, 2 * workers):
+            submit(first)
+
+        while in_flight:
+            first, future = in_flight.popleft()
+            texts = future.result()
+            following = next(ranges, None)
+            if following is not None:
+                submit(following)
+            yield first, texts
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _extract_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Process-pool task: extract the text of pages [start, stop)."""
+    import pypdf
+
+    with open(file_path, 'rb') as file:
+        reader = pypdf.PdfReader(file)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
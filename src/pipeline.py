@@ -0,0 +1,379 @@
+"""Pipelined, multi-process ingestion engine."""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import groupby
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.checkpoint import Checkpoint, CHECKPOINT_NAME
+from src.config import MAX_CHARS, OVERLAP, PDF_WORKERS
+from src.manifest import Manifest
+from src.rag import load_document, build_chunk_records, remove_deleted_files, embed_with_retry
+from src.store import add_texts, delete_file
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.txt', '.md']
+
+# Queue sentinel telling a stage that no more work is coming
+_DONE = object()
+
+class StageStats:
+    """Work done by one pipeline stage, summed over its workers."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.files = 0
+        self.chunks = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, files: int, chunks: int, seconds: float):
+        with self._lock:
+            self.files += files
+            self.chunks += chunks
+            self.busy_seconds += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "chunks_per_second": round(self.chunks / self.busy_seconds, 1) if self.busy_seconds else 0.0
+        }
+
+def discover_files(folder: str, extensions: List[str] = SUPPORTED_EXTENSIONS) -> List[str]:
+    """
+    Find supported files below `folder`, each exactly once.
+
+    Paths are de-duplicated on their resolved location, so symlinks or
+    overlapping patterns never feed the same file twice.
+    """
+    seen = set()
+    files = []
+
+    for path in sorted(Path(folder).rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in extensions:
+            continue
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            files.append(str(path))
+
+    return files
+
+def run_pipeline(
+    file_paths: List[str],
+    collection,
+    manifest: Manifest,
+    folder: str,
+    incremental: bool = True,
+    workers: int = 1,
+    embed_workers: int = 2,
+    write_batch_size: int = 256,
+    max_chars: int = MAX_CHARS,
+    overlap: int = OVERLAP,
+    resume: bool = True
+) -> Dict[str, Any]:
+    """
+    Ingest files through extract -> embed -> write stages running concurrently.
+
+    Extraction and chunking run in a pool of `workers` processes, embedding in
+    `embed_workers` threads, and a single writer thread upserts chunks in
+    batches of `write_batch_size` across files. Bounded queues between the
+    stages hold back extraction when embedding falls behind.
+
+    Progress is logged to a checkpoint next to the manifest as batches land.
+    If a run is interrupted, the next one skips the files it finished and
+    embeds only the chunks it had not yet written.
+
+    Args:
+        file_paths: Files found in `folder`
+        collection: ChromaDB collection
+        manifest: Manifest of previously ingested files
+        folder: Folder that was scanned
+        incremental: Skip files that are unchanged since the last run
+        workers: Extraction processes (1 extracts in the calling thread)
+        embed_workers: Files embedded concurrently
+        write_batch_size: Chunks per collection write
+        max_chars: Maximum characters per chunk
+        overlap: Overlap between chunks
+        resume: Continue an interrupted run instead of discarding its checkpoint
+
+    Returns:
+        File and chunk counts plus per-stage throughput under "stages"
+
+    Raises:
+        Exception: The first unexpected error of a stage (such as the
+            manifest or checkpoint failing to save), once every stage has
+            stopped; files that fail to load, embed or store only count
+            as failed
+    """
+    started = time.perf_counter()
+    stats = {"ingested": 0, "unchanged": 0, "resumed": 0, "removed": 0, "failed": 0, "chunks": 0}
+    stages = {name: StageStats(name) for name in ("extract", "embed", "write")}
+    stats["removed"] = remove_deleted_files(collection, manifest, folder, file_paths)
+
+    checkpoint = Checkpoint(os.path.join(os.path.dirname(manifest.path), CHECKPOINT_NAME))
+    if not resume:
+        checkpoint.discard()
+    elif checkpoint.interrupted:
+        written = sum(len(ids) for ids in checkpoint.written.values())
+        print(f"↩️ Resuming interrupted ingest: {len(checkpoint.done)} files and {written} chunks already written")
+
+    pending = []
+    for file_path in file_paths:
+        digest = manifest.changed(file_path)
+        if digest is None and incremental:
+            stats["unchanged"] += 1
+            continue
+        digest = digest or manifest.files[file_path]["sha256"]
+        if checkpoint.is_done(file_path, digest):
+            stats["resumed"] += 1
+        else:
+            pending.append((file_path, digest))
+
+    queue_size = max(2, workers * 2)
+    embed_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stats_lock = threading.Lock()
+    # Unexpected errors in the stage threads, the first raised once they stop
+    errors: List[Exception] = []
+
+    def fail(file_path: str, error):
+        print(f"  ❌ {Path(file_path).name}: {error}")
+        with stats_lock:
+            stats["failed"] += 1
+
+    def embed_file(file_path: str, digest: str, chunks: List[str], extras: List[Dict[str, Any]]):
+        ids, metadatas = build_chunk_records(Path(file_path), chunks, extras)
+
+        # Chunks an interrupted run already wrote are neither embedded nor written again
+        resumed = checkpoint.resumes(file_path, digest)
+        todo = [i for i, chunk_id in enumerate(ids) if not (resumed and checkpoint.is_written(file_path, chunk_id))]
+        records = ([ids[i] for i in todo], [chunks[i] for i in todo], [metadatas[i] for i in todo])
+        if not todo:
+            write_queue.put((file_path, digest, len(chunks), resumed, *records, []))
+            return
+
+        start = time.perf_counter()
+        try:
+            embeddings = embed_with_retry(records[1])
+        except Exception as e:
+            fail(file_path, e)
+            return
+        stages["embed"].add(1, len(todo), time.perf_counter() - start)
+        if embeddings:
+            write_queue.put((file_path, digest, len(chunks), resumed, *records, embeddings))
+        else:
+            fail(file_path, "failed to generate embeddings")
+
+    def embed_stage():
+        while True:
+            item = embed_queue.get()
+            if item is _DONE:
+                return
+            try:
+                embed_file(*item)
+            except Exception as e:
+                fail(item[0], e)
+                errors.append(e)
+
+    writer = _BatchWriter(collection, manifest, checkpoint, write_batch_size, stages["write"], fail)
+
+    def write_stage():
+        while True:
+            try:
+                item = write_queue.get(timeout=1.0)
+            except queue.Empty:
+                item = None
+            try:
+                if item is None:
+                    # Make progress durable while upstream stages are busy
+                    writer.flush()
+                elif item is _DONE:
+                    writer.flush()
+                else:
+                    writer.put(*item)
+            except Exception as e:
+                # The writer marked its files failed; keep draining so the
+                # other stages never block on a full queue
+                errors.append(e)
+            if item is _DONE:
+                return
+
+    embedders = [threading.Thread(target=embed_stage, daemon=True) for _ in range(max(1, embed_workers))]
+    write_thread = threading.Thread(target=write_stage, daemon=True)
+    for thread in embedders + [write_thread]:
+        thread.start()
+
+    try:
+        for file_path, digest, chunks, extras, seconds in _extract_all(pending, workers, queue_size, max_chars, overlap, fail):
+            stages["extract"].add(1, len(chunks), seconds)
+            embed_queue.put((file_path, digest, chunks, extras))
+    finally:
+        for _ in embedders:
+            embed_queue.put(_DONE)
+        for thread in embedders:
+            thread.join()
+        write_queue.put(_DONE)
+        write_thread.join()
+
+    if errors:
+        # Keep the checkpoint so the next run resumes
+        checkpoint.close(completed=False)
+        raise errors[0]
+    checkpoint.close(completed=True)
+    stats["ingested"] = writer.files
+    stats["chunks"] = writer.chunks
+    stats["stages"] = {name: stage.summary() for name, stage in stages.items()}
+    stats["wall_seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+def _extract_all(pending, workers, window, max_chars, overlap, fail):
+    """Yield (path, digest, chunks, extras, seconds), keeping at most `window` files in flight."""
+    if workers <= 1:
+        for file_path, digest in pending:
+            try:
+                chunks, extras, seconds = _extract(file_path, digest, max_chars, overlap, PDF_WORKERS)
+                yield file_path, digest, chunks, extras, seconds
+            except Exception as e:
+                fail(file_path, e)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        items = iter(pending)
+
+        while True:
+            for file_path, digest in items:
+                # Files are already extracted in parallel, so PDFs are not split by page
+                future = pool.submit(_extract, file_path, digest, max_chars, overlap, 1)
+                in_flight[future] = (file_path, digest)
+                if len(in_flight) >= window:
+                    break
+
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, digest = in_flight.pop(future)
+                try:
+                    chunks, extras, seconds = future.result()
+                    yield file_path, digest, chunks, extras, seconds
+                except Exception as e:
+                    fail(file_path, e)
+
+def _extract(
+    file_path: str,
+    digest: Optional[str],
+    max_chars: int,
+    overlap: int,
+    pdf_workers: int
+) -> Tuple[List[str], List[Dict[str, Any]], float]:
+    """Process-pool task: read and chunk one file."""
+    start = time.perf_counter()
+    chunks, extras = load_document(file_path, max_chars, overlap, pdf_workers, digest)
+    return chunks, extras, time.perf_counter() - start
+
+class _BatchWriter:
+    """
+    Single writer that groups chunks from many files into batched upserts.
+
+    A file's previous chunks are deleted when it arrives, unless an
+    interrupted run already started writing this version of it. Each
+    upserted batch and each finished file is logged to the checkpoint.
+    """
+
+    def __init__(
+        self,
+        collection,
+        manifest: Manifest,
+        checkpoint: Checkpoint,
+        batch_size: int,
+        stage: StageStats,
+        fail
+    ):
+        self.collection = collection
+        self.manifest = manifest
+        self.checkpoint = checkpoint
+        self.batch_size = max(1, batch_size)
+        self.stage = stage
+        self.fail = fail
+        self.files = 0
+        self.chunks = 0
+        # Columns: owning file, ids, documents, metadatas, embeddings
+        self._records = ([], [], [], [], [])
+        self._files: List[Tuple[str, str, int]] = []
+
+    def put(
+        self,
+        file_path: str,
+        digest: str,
+        total: int,
+        resumed: bool,
+        ids: List[str],
+        chunks: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ):
+        start = time.perf_counter()
+        if not resumed:
+            try:
+                # Drop the previous version of the file before its new chunks land
+                delete_file(self.collection, file_path)
+            except Exception as e:
+                self.fail(file_path, e)
+                return
+            try:
+                self.checkpoint.begin_file(file_path, digest)
+            except Exception as e:
+                self.fail(file_path, e)
+                raise
+
+        for column, values in zip(self._records, ([file_path] * len(ids), ids, chunks, metadatas, embeddings)):
+            column.extend(values)
+        self._files.append((file_path, digest, total))
+        self.stage.add(0, 0, time.perf_counter() - start)
+
+        if len(self._records[0]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._files:
+            return
+
+        start = time.perf_counter()
+        owners, ids, documents, metadatas, embeddings = self._records
+        files, self._files = self._files, []
+        self._records = ([], [], [], [], [])
+
+        try:
+            for i in range(0, len(ids), self.batch_size):
+                end = i + self.batch_size
+                add_texts(self.collection, ids[i:end], documents[i:end], metadatas[i:end], embeddings[i:end])
+                for file_path, group in groupby(range(i, min(end, len(ids))), key=owners.__getitem__):
+                    self.checkpoint.write_batch(file_path, [ids[j] for j in group])
+        except Exception as e:
+            for file_path, _, _ in files:
+                self.fail(file_path, f"failed to add chunks to store: {e}")
+            return
+
+        try:
+            for file_path, digest, count in files:
+                self.manifest.record(file_path, digest, count)
+            self.manifest.save()
+            for file_path, digest, _ in files:
+                self.checkpoint.finish_file(file_path, digest)
+        except Exception as e:
+            for file_path, _, _ in files:
+                self.fail(file_path, f"failed to record ingestion: {e}")
+            raise
+
+        for file_path, _, count in files:
+            self.files += 1
+            self.chunks += count
+            print(f"  ✅ {Path(file_path).name}: {count} chunks")
+        self.stage.add(len(files), len(ids), time.perf_counter() - start)
@@ -1,5 +1,6 @@
 """Prompt building utilities."""
 from typing import List, Tuple, Dict
+from src.metrics import STAGE_SECONDS
 
 def build_system_prompt() -> str:
     """Build system prompt with safety and grounding instructions."""
@@ -8,24 +9,32 @@ Always cite your sources using the numbered references provided in the context.
 If you cannot answer the question based on the given context, say so clearly.
 Do not make up information that is not present in the context."""
 
-def build_user_prompt(question: str, contexts: List[Tuple[str, Dict]]) -> str:
+@STAGE_SECONDS.time(stage="prompt")
+def build_user_prompt(question: str, contexts: List[Tuple[str, Dict]], start: int = 1) -> str:
     """
     Build user prompt with question and numbered context citations.
     
     Args:
         question: User's question
         contexts: List of (text, metadata) tuples from retrieval
+        start: Number of the first context, so that follow-ups in a chat
+            session continue the numbering of earlier turns
     
     Returns:
         Formatted prompt string
     """
+    if not contexts and start > 1:
+        return f"Question: {question}\n\nNo new context; use the context given earlier in this conversation."
+    
     prompt_parts = [f"Question: {question}", "", "Context:"]
     
-    for i, (text, metadata) in enumerate(contexts, 1):
+    for i, (text, metadata) in enumerate(contexts, start):
         source = metadata.get('source', 'Unknown')
         chunk_num = metadata.get('chunk', 'N/A')
+        page = f"page {metadata['page']}, " if 'page' in metadata else ""
+        chunks = f"chunks {chunk_num}-{metadata['last_chunk']}" if 'last_chunk' in metadata else f"chunk {chunk_num}"
         
-        prompt_parts.append(f"[{i}] From: {source} (chunk {chunk_num})")
+        prompt_parts.append(f"[{i}] From: {source} ({page}{chunks})")
         prompt_parts.append(f"    {text}")
         prompt_parts.append("")
     
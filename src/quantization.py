@@ -0,0 +1,142 @@
+"""Compact vector codes for approximate scoring in the NumPy store."""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Codes scored per block, bounding temporary float32 copies
+BLOCK_ROWS = 4096
+PQ_CENTROIDS = 256
+
+class Int8Quantizer:
+    """
+    Symmetric per-row int8 scalar quantization.
+
+    Each vector is stored as round(x * 127 / max|x|) plus its float32 scale,
+    so a 768-dim row takes 772 bytes instead of 3072.
+    """
+
+    name = "int8"
+    code_dtype = np.int8
+    trained = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_size = dim
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (codes, scales) for float32 rows."""
+        peaks = np.abs(vectors).max(axis=1)
+        scales = np.where(peaks == 0, 1.0, peaks / 127.0).astype(np.float32)
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        return query
+
+    def scores(self, query: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Approximate inner products of `query` with coded rows."""
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = slice(start, start + BLOCK_ROWS)
+            out[block] = np.asarray(codes[block], dtype=np.float32) @ query
+        return out * scales
+
+class ProductQuantizer:
+    """
+    Product quantization with 256 centroids per subspace.
+
+    Vectors are zero-padded to `subvectors` equal-width pieces, and each
+    piece is stored as the one-byte index of its nearest codebook centroid.
+    Scores are looked up per subspace from a table of query-centroid inner
+    products (asymmetric distance computation), so 768-dim rows with the
+    default 96 subvectors take 96 bytes.
+    """
+
+    name = "pq"
+    code_dtype = np.uint8
+
+    def __init__(self, dim: int, subvectors: int = 0, codebooks: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.code_size = min(dim, subvectors or max(1, dim // 8))
+        self.width = math.ceil(dim / self.code_size)
+        self.codebooks = codebooks
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def train(self, sample: np.ndarray, rng, iterations: int = 10):
+        """Fit one k-means codebook per subspace on a sample of rows."""
+        pieces = self._split(sample)
+        centroids = min(PQ_CENTROIDS, len(sample))
+        codebooks = np.zeros((self.code_size, PQ_CENTROIDS, self.width), dtype=np.float32)
+
+        for j in range(self.code_size):
+            codebooks[j, :centroids] = _kmeans(pieces[:, j], centroids, rng, iterations)
+        self.codebooks = codebooks
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, None]:
+        """Return (codes, None) for float32 rows."""
+        codes = np.empty((len(vectors), self.code_size), dtype=np.uint8)
+        norms = (self.codebooks ** 2).sum(axis=2)
+
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            pieces = self._split(vectors[start:start + BLOCK_ROWS])
+            for j in range(self.code_size):
+                # argmin ||x - c||^2 == argmin ||c||^2 - 2 x.c
+                distances = norms[j] - 2 * pieces[:, j] @ self.codebooks[j].T
+                codes[start:start + len(pieces), j] = np.argmin(distances, axis=1)
+        return codes, None
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        """Inner products of each query piece with its subspace's centroids."""
+        return np.einsum("mkw,mw->mk", self.codebooks, self._split(query[None, :])[0])
+
+    def scores(self, table: np.ndarray, codes: np.ndarray, scales=None) -> np.ndarray:
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            # One contiguous column per subspace makes each lookup a fast gather
+            columns = np.ascontiguousarray(np.asarray(codes[start:start + BLOCK_ROWS]).T)
+            block = np.zeros(columns.shape[1], dtype=np.float32)
+            for j in range(self.code_size):
+                block += table[j][columns[j]]
+            out[start:start + len(block)] = block
+        return out
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """Reshape rows to (n, subvectors, width), zero-padding the tail."""
+        padded = np.zeros((len(vectors), self.code_size * self.width), dtype=np.float32)
+        padded[:, :self.dim] = vectors
+        return padded.reshape(len(vectors), self.code_size, self.width)
+
+def make_quantizer(name: str, dim: int, subvectors: int = 0):
+    """Quantizer for a VECTOR_QUANTIZATION setting, or None for exact vectors."""
+    if name == "int8":
+        return Int8Quantizer(dim)
+    if name == "pq":
+        return ProductQuantizer(dim, subvectors)
+    if name == "none":
+        return None
+    raise ValueError(f"Unsupported vector quantization: {name}")
+
+def _kmeans(points: np.ndarray, k: int, rng, iterations: int) -> np.ndarray:
+    """Euclidean k-means returning k centroids."""
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        distances = (centroids ** 2).sum(axis=1) - 2 * points @ centroids.T
+        assignments = np.argmin(distances, axis=1)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.stack(
+            [np.bincount(assignments, weights=points[:, d], minlength=k) for d in range(points.shape[1])],
+            axis=1
+        )
+
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = points[rng.choice(len(points), len(empty), replace=False)]
+
+    return centroids
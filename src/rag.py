@@ -1,17 +1,40 @@
 """High-level RAG orchestration."""
-import os
-import uuid
-import time
+import asyncio
+import hashlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import aclosing
 from pathlib import Path
-from typing import List, Tuple, Dict, Any
-import pypdf
+from typing import List, Tuple, Dict, Any, Iterator, AsyncIterator, Optional, TYPE_CHECKING
 
-from src.chunking import split_into_chunks
+from src.chunking import iter_chunks, iter_token_chunks
 from src.embeddings import embed_texts
-from src.store import add_texts
-from src.llm import chat
+from src.pdf import iter_pdf_pages
+from src.tokenizer import get_token_counter
+from src.store import (
+    add_texts, delete_file, query_with_ids, query_many, lexical_query_with_ids, fuse_results
+)
+from src.answer_cache import AnswerCache
+from src.manifest import Manifest
+from src.llm import chat, chat_stream
 from src.prompt import build_system_prompt, build_user_prompt, render_messages
-from src.config import MAX_CHARS, OVERLAP
+from src.packing import pack_contexts
+from src.sessions import Session
+from src.metrics import STAGE_SECONDS, INGEST_STAGE_SECONDS
+from src.config import (
+    MAX_CHARS, OVERLAP, CHUNK_MODE, MAX_TOKENS, TOKEN_OVERLAP, TOKENIZER_PATH, PDF_WORKERS,
+    STORE_THREADS, CHAT_MODEL, BATCH_CONCURRENCY,
+    RETRIEVAL_MODE, LEXICAL_INDEX_ENABLED, DENSE_TIMEOUT
+)
+
+if TYPE_CHECKING:
+    # httpx is only needed by the API server
+    from src.async_ollama import AsyncOllamaClient
+
+NO_ANSWER = "No relevant information found in the knowledge base."
+
+# Chroma's client is synchronous; async callers run their queries here
+_store_pool = ThreadPoolExecutor(max_workers=STORE_THREADS, thread_name_prefix="chroma")
 
 def ingest_path(
     file_path: str,
@@ -21,70 +44,149 @@ def ingest_path(
 ) -> int:
     """
     Ingest a single file (PDF, TXT, MD) into the vector store.
-    
+
+    Chunk IDs are derived from the file path, chunk position and chunk text,
+    so re-ingesting a file replaces its previous chunks instead of adding
+    duplicates.
+
     Args:
         file_path: Path to the file to ingest
         collection: ChromaDB collection
         max_chars: Maximum characters per chunk
         overlap: Overlap between chunks
-    
+
     Returns:
-        Number of chunks added
+        Number of chunks added (0 for empty or unsupported files)
+
+    Raises:
+        RuntimeError: If embedding or storing the chunks fails
     """
     path = Path(file_path)
-    
-    # Read file content based on extension
-    if path.suffix.lower() == '.pdf':
-        text = _read_pdf(file_path)
-    elif path.suffix.lower() in ['.txt', '.md']:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-    else:
-        print(f"Skipping unsupported file type: {file_path}")
-        return 0
-    
-    if not text.strip():
-        print(f"No text content found in: {file_path}")
-        return 0
-    
-    # Split into chunks
-    chunks = split_into_chunks(text, max_chars, overlap)
+    with INGEST_STAGE_SECONDS.time(stage="load"):
+        chunks, extras = load_document(file_path, max_chars, overlap)
     
     if not chunks:
-        print(f"No chunks generated from: {file_path}")
+        delete_file(collection, str(path))
         return 0
     
     # Generate embeddings with retry
     print(f"Generating embeddings for {len(chunks)} chunks from {path.name}")
-    embeddings = _embed_with_retry(chunks, max_retries=3)
+    with INGEST_STAGE_SECONDS.time(stage="embed"):
+        embeddings = embed_with_retry(chunks)
     
     if not embeddings:
-        print(f"Failed to generate embeddings for: {file_path}")
-        return 0
+        raise RuntimeError(f"Failed to generate embeddings for: {file_path}")
+    
+    ids, metadatas = build_chunk_records(path, chunks, extras)
+    
+    # Replace whatever an earlier version of this file left behind
+    try:
+        with INGEST_STAGE_SECONDS.time(stage="store"):
+            delete_file(collection, str(path))
+            add_texts(collection, ids, chunks, metadatas, embeddings)
+        return len(chunks)
+    except Exception as e:
+        raise RuntimeError(f"Failed to add chunks to store: {e}")
+
+def load_document(
+    file_path: str,
+    max_chars: int = MAX_CHARS,
+    overlap: int = OVERLAP,
+    pdf_workers: int = PDF_WORKERS,
+    digest: Optional[str] = None
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Read a file (PDF, TXT, MD) and split it into chunks, along with metadata
+    for each chunk.
+
+    max_chars and overlap apply in the "chars" CHUNK_MODE; the "tokens" mode
+    packs chunks to MAX_TOKENS with TOKEN_OVERLAP instead.
+
+    PDF pages are extracted by up to `pdf_workers` processes (or read from
+    the PDF text cache) and each chunk's metadata records the first and last
+    page it was taken from, as "page" and "page_end".
+
+    Args:
+        file_path: Path to the file
+        max_chars: Maximum characters per chunk
+        overlap: Overlap between chunks
+        pdf_workers: Processes extracting the pages of a large PDF
+        digest: sha256 of the file, if the caller already has it
+
+    Returns:
+        (chunks, metadata) lists, empty for unsupported or empty files
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+    chunks = []
+    extras = []
+    
+    # Stream file content based on extension
+    if suffix == '.pdf':
+        page_starts = []
+        pages = _iter_pdf_text(file_path, pdf_workers, digest, page_starts)
+        try:
+            for chunk, start, end in _chunk(pages, max_chars, overlap, offsets=True):
+                chunks.append(chunk)
+                extras.append({
+                    "page": bisect_right(page_starts, start),
+                    "page_end": bisect_right(page_starts, max(start, end - 1))
+                })
+        except Exception as e:
+            print(f"Error reading PDF {file_path}: {e}")
+            return [], []
+    elif suffix in ['.txt', '.md']:
+        chunks = list(_chunk(_iter_file_text(file_path), max_chars, overlap))
+        extras = [{} for _ in chunks]
+    else:
+        print(f"Skipping unsupported file type: {file_path}")
+        return [], []
     
-    # Generate stable IDs based on content
+    if not chunks:
+        print(f"No text content found in: {file_path}")
+    
+    return chunks, extras
+
+def build_chunk_records(
+    path: Path,
+    chunks: List[str],
+    extras: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Build deterministic IDs and metadata for a file's chunks, merging in per-chunk `extras`."""
     ids = []
     metadatas = []
-    
+
     for i, chunk in enumerate(chunks):
-        # Create stable ID based on file and chunk content hash
-        chunk_hash = str(hash(chunk))[-8:]
-        chunk_id = f"{path.stem}_{i:03d}_{chunk_hash}"
-        ids.append(chunk_id)
+        # sha256 is stable across processes, unlike the salted built-in hash()
+        chunk_hash = hashlib.sha256(f"{path}\0{i}\0{chunk}".encode('utf-8')).hexdigest()[:16]
+        ids.append(f"{path.stem}_{i:03d}_{chunk_hash}")
         metadatas.append({
             "source": path.name,
             "chunk": i + 1,
             "total_chunks": len(chunks),
-            "file_path": str(path)
+            "file_path": str(path),
+            **(extras[i] if extras else {})
         })
-    
-    # Add to vector store
-    try:
-        add_texts(collection, ids, chunks, metadatas, embeddings)
-        return len(chunks)
-    except Exception as e:
-        print(f"Failed to add chunks to store: {e}")
-        return 0
+
+    return ids, metadatas
+
+def remove_deleted_files(
+    collection,
+    manifest: Manifest,
+    folder: str,
+    present: List[str]
+) -> int:
+    """Remove chunks of files ingested from `folder` that no longer exist."""
+    removed = 0
+
+    for file_path in manifest.missing_under(folder, present):
+        print(f"🗑️ Removing chunks of deleted file: {file_path}")
+        delete_file(collection, file_path)
+        manifest.forget(file_path)
+        removed += 1
+
+    manifest.save()
+    return removed
 
 def retrieve_and_answer(
     question: str,
@@ -104,55 +206,514 @@ def retrieve_and_answer(
     """
     from src.store import query
     
-    # Retrieve relevant chunks
-    contexts = query(collection, question, k)
+    # Retrieve relevant chunks; nothing similar enough means no LLM call
+    contexts = pack_contexts(query(collection, question, k))
     
     if not contexts:
-        return "No relevant information found in the knowledge base.", []
-    
-    # Build prompts
-    system_prompt = build_system_prompt()
-    user_prompt = build_user_prompt(question, contexts)
-    messages = render_messages(system_prompt, user_prompt)
+        return NO_ANSWER, []
     
     # Generate answer
-    answer = chat(messages)
+    answer = chat(_build_messages(question, contexts))
     
-    # Prepare sources for return
+    return answer, _format_sources(contexts)
+
+def retrieve_and_answer_stream(
+    question: str,
+    collection,
+    k: int = 5
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Retrieve relevant chunks and stream the generated answer.
+
+    Sources are known as soon as retrieval finishes, so they are emitted
+    before the first token.
+
+    Args:
+        question: User's question
+        collection: ChromaDB collection
+        k: Number of chunks to retrieve
+
+    Yields:
+        ("sources", sources) once, then ("token", text) for each piece of the answer
+    """
+    from src.store import query
+
+    contexts = pack_contexts(query(collection, question, k))
+
+    if not contexts:
+        yield "sources", []
+        yield "token", NO_ANSWER
+        return
+
+    yield "sources", _format_sources(contexts)
+
+    for token in chat_stream(_build_messages(question, contexts)):
+        yield "token", token
+
+async def retrieve_and_answer_async(
+    question: str,
+    collection,
+    client: "AsyncOllamaClient",
+    k: int = 5,
+    answer_cache: Optional[AnswerCache] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Async version of retrieve_and_answer for the API server.
+
+    Embedding and generation go through the shared async client, and the
+    blocking Chroma query runs on a small thread pool, so one slow request
+    never stalls the event loop.
+
+    Args:
+        question: User's question
+        collection: ChromaDB collection
+        client: Async Ollama client
+        k: Number of chunks to retrieve
+        answer_cache: Optional cache consulted before generating
+
+    Returns:
+        Tuple of (answer, sources)
+    """
+    with STAGE_SECONDS.time(stage="retrieve"):
+        query_embedding, chunk_ids, contexts = await _retrieve_async(question, collection, client, k)
+    contexts = pack_contexts(contexts)
+
+    if not contexts:
+        return NO_ANSWER, []
+
+    # Lexical-only retrieval has no question embedding to match on
+    use_cache = answer_cache is not None and bool(query_embedding)
+
+    if use_cache:
+        cached = answer_cache.lookup(query_embedding, chunk_ids, CHAT_MODEL)
+        if cached is not None:
+            return cached
+
+    answer = await client.chat(_build_messages(question, contexts))
+    sources = _format_sources(contexts)
+
+    if use_cache:
+        answer_cache.store(query_embedding, chunk_ids, CHAT_MODEL, answer, sources)
+
+    return answer, sources
+
+async def retrieve_and_answer_stream_async(
+    question: str,
+    collection,
+    client: "AsyncOllamaClient",
+    k: int = 5,
+    answer_cache: Optional[AnswerCache] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Async version of retrieve_and_answer_stream.
+
+    A cached answer is emitted as a single token. A fresh answer is only
+    cached once it has been streamed to completion.
+
+    Yields:
+        ("sources", sources) once, then ("token", text) for each piece of the answer
+    """
+    with STAGE_SECONDS.time(stage="retrieve"):
+        query_embedding, chunk_ids, contexts = await _retrieve_async(question, collection, client, k)
+    contexts = pack_contexts(contexts)
+
+    if not contexts:
+        yield "sources", []
+        yield "token", NO_ANSWER
+        return
+
+    # Lexical-only retrieval has no question embedding to match on
+    use_cache = answer_cache is not None and bool(query_embedding)
+
+    if use_cache:
+        cached = answer_cache.lookup(query_embedding, chunk_ids, CHAT_MODEL)
+        if cached is not None:
+            answer, sources = cached
+            yield "sources", sources
+            yield "token", answer
+            return
+
+    sources = _format_sources(contexts)
+    yield "sources", sources
+
+    pieces = []
+    # Closed as soon as this stream is, so Ollama stops generating too
+    async with aclosing(client.chat_stream(_build_messages(question, contexts))) as tokens:
+        async for token in tokens:
+            pieces.append(token)
+            yield "token", token
+
+    if use_cache:
+        answer_cache.store(query_embedding, chunk_ids, CHAT_MODEL, ''.join(pieces), sources)
+
+async def answer_in_session_async(
+    question: str,
+    session: Session,
+    collection,
+    client: "AsyncOllamaClient",
+    k: int = 5
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Answer a question as the next turn of a chat session.
+
+    Returns:
+        Tuple of (answer, sources of the context this turn added)
+    """
+    sources: List[Dict[str, Any]] = []
+    pieces = []
+    async for kind, payload in answer_in_session_stream_async(question, session, collection, client, k):
+        if kind == "sources":
+            sources = payload
+        else:
+            pieces.append(payload)
+    return ''.join(pieces), sources
+
+async def answer_in_session_stream_async(
+    question: str,
+    session: Session,
+    collection,
+    client: "AsyncOllamaClient",
+    k: int = 5
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream the answer to the next turn of a chat session.
+
+    The messages sent are the system prompt, the session's earlier turns
+    unchanged, then the new question with only the retrieved chunks that
+    are not already in the conversation, numbered on from earlier turns.
+    That keeps the prompt of every follow-up an extension of the previous
+    one, so Ollama reuses the prefix it already evaluated. The turn is
+    recorded once its answer has streamed to completion. Answers depend on
+    the conversation, so the answer cache is not used.
+
+    Yields:
+        ("sources", sources of the new context) once, then ("token", text)
+        for each piece of the answer
+    """
+    async with session.lock:
+        with STAGE_SECONDS.time(stage="retrieve"):
+            _, chunk_ids, contexts = await _retrieve_async(question, collection, client, k)
+
+        known = session.chunk_ids
+        fresh = [(chunk_id, context) for chunk_id, context in zip(chunk_ids, contexts) if chunk_id not in known]
+        packed = pack_contexts([context for _, context in fresh])
+
+        if not packed and not session.citations:
+            yield "sources", []
+            yield "token", NO_ANSWER
+            return
+
+        # Merged passages contain their chunks whole; truncated ones do not count
+        added = [chunk_id for chunk_id, (text, _) in fresh if any(text in passage for passage, _ in packed)]
+        prompt = build_user_prompt(question, packed, start=session.citations + 1)
+        messages = [{"role": "system", "content": build_system_prompt()}]
+        messages += session.messages()
+        messages.append({"role": "user", "content": prompt})
+
+        yield "sources", _format_sources(packed)
+
+        pieces = []
+        async with aclosing(client.chat_stream(messages)) as tokens:
+            async for token in tokens:
+                pieces.append(token)
+                yield "token", token
+
+        session.add_turn(prompt, ''.join(pieces), added, len(packed))
+
+def answer_many(
+    questions: List[str],
+    collection,
+    k: int = 5,
+    concurrency: int = BATCH_CONCURRENCY
+) -> Iterator[Dict[str, Any]]:
+    """
+    Answer a batch of questions, yielding each result as soon as it is ready.
+
+    Retrieval for the whole batch is one round of batched embedding requests
+    and a single multi-vector query; answers are then generated by up to
+    `concurrency` threads.
+
+    Args:
+        questions: Questions to answer
+        collection: ChromaDB collection
+        k: Number of chunks to retrieve per question
+        concurrency: Answers generated at once
+
+    Yields:
+        {"index", "question", "answer", "sources"} per question, in completion
+        order, or {"index", "question", "error"} for a question that failed
+    """
+    try:
+        retrieved = query_many(collection, questions, k)
+    except Exception as e:
+        print(f"Query error: {e}")
+        for index, question in enumerate(questions):
+            yield _batch_error(index, question, e)
+        return
+
+    pending = []
+    for index, (question, (_, contexts)) in enumerate(zip(questions, retrieved)):
+        contexts = pack_contexts(contexts)
+        if contexts:
+            pending.append((index, question, contexts))
+        else:
+            yield _batch_result(index, question, NO_ANSWER, [])
+
+    if not pending:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=min(concurrency, len(pending)), thread_name_prefix="answer")
+    try:
+        futures = {
+            pool.submit(chat, _build_messages(question, contexts)): (index, question, contexts)
+            for index, question, contexts in pending
+        }
+        for future in as_completed(futures):
+            index, question, contexts = futures[future]
+            try:
+                yield _batch_result(index, question, future.result(), _format_sources(contexts))
+            except Exception as e:
+                yield _batch_error(index, question, e)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def answer_many_async(
+    questions: List[str],
+    collection,
+    client: "AsyncOllamaClient",
+    k: int = 5,
+    concurrency: int = BATCH_CONCURRENCY,
+    answer_cache: Optional[AnswerCache] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async version of answer_many for the API server.
+
+    Cached answers are returned without generating, and fresh ones are
+    cached, as in retrieve_and_answer_async.
+
+    Yields:
+        {"index", "question", "answer", "sources"} per question, in completion
+        order, or {"index", "question", "error"} for a question that failed
+    """
+    try:
+        embeddings, retrieved = await _retrieve_many_async(questions, collection, client, k)
+    except Exception as e:
+        print(f"Query error: {e}")
+        for index, question in enumerate(questions):
+            yield _batch_error(index, question, e)
+        return
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def answer(index: int) -> Dict[str, Any]:
+        question = questions[index]
+        chunk_ids, contexts = retrieved[index]
+        contexts = pack_contexts(contexts)
+        if not contexts:
+            return _batch_result(index, question, NO_ANSWER, [])
+
+        query_embedding = embeddings[index]
+        use_cache = answer_cache is not None and bool(query_embedding)
+        if use_cache:
+            cached = answer_cache.lookup(query_embedding, chunk_ids, CHAT_MODEL)
+            if cached is not None:
+                return _batch_result(index, question, *cached)
+
+        try:
+            async with slots:
+                text = await client.chat(_build_messages(question, contexts))
+        except Exception as e:
+            return _batch_error(index, question, e)
+
+        sources = _format_sources(contexts)
+        if use_cache:
+            answer_cache.store(query_embedding, chunk_ids, CHAT_MODEL, text, sources)
+        return _batch_result(index, question, text, sources)
+
+    tasks = [asyncio.ensure_future(answer(index)) for index in range(len(questions))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _retrieve_many_async(
+    questions: List[str],
+    collection,
+    client: "AsyncOllamaClient",
+    k: int
+) -> Tuple[List[List[float]], List[Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]]]:
+    """
+    Embed a batch of questions asynchronously and run one store query for all.
+
+    Returns:
+        Tuple of (query embeddings, (chunk_ids, contexts) per question); an
+        embedding is empty when only lexical retrieval was used for it
+    """
+    loop = asyncio.get_running_loop()
+    embeddings = [[] for _ in questions]
+    wanted = [i for i, question in enumerate(questions) if question.strip()]
+    mode = RETRIEVAL_MODE
+    use_lexical = LEXICAL_INDEX_ENABLED and mode in ("hybrid", "lexical")
+
+    vectors = None
+    if wanted and not (use_lexical and mode == "lexical"):
+        try:
+            embedding = client.embed([questions[i] for i in wanted])
+            if use_lexical and DENSE_TIMEOUT:
+                embedding = asyncio.wait_for(embedding, DENSE_TIMEOUT)
+            vectors = await embedding
+        except Exception as e:
+            if not use_lexical:
+                raise
+            print(f"Dense retrieval failed, using lexical results only: {e!r}")
+            mode = "lexical"
+        else:
+            for i, vector in zip(wanted, vectors):
+                embeddings[i] = vector
+
+    retrieved = await loop.run_in_executor(
+        _store_pool, query_many, collection, questions, k, mode, vectors
+    )
+    return embeddings, retrieved
+
+def _batch_result(index: int, question: str, answer: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"index": index, "question": question, "answer": answer, "sources": sources}
+
+def _batch_error(index: int, question: str, error: Exception) -> Dict[str, Any]:
+    return {"index": index, "question": question, "error": str(error)}
+
+async def _retrieve_async(
+    question: str,
+    collection,
+    client: "AsyncOllamaClient",
+    k: int,
+    mode: Optional[str] = None
+) -> Tuple[List[float], List[str], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Embed the question asynchronously and query the store off the event loop.
+
+    In hybrid mode the BM25 lookup runs alongside the embedding call and the
+    two rankings are fused. When the embedding fails or takes longer than
+    DENSE_TIMEOUT, the lexical results are used on their own.
+
+    Returns:
+        Tuple of (query_embedding, chunk_ids, contexts); the embedding is
+        empty when only lexical retrieval was used, everything on failure
+    """
+    if not question.strip():
+        return [], [], []
+
+    k = max(1, min(20, k))
+    mode = mode or RETRIEVAL_MODE
+    loop = asyncio.get_running_loop()
+    use_lexical = LEXICAL_INDEX_ENABLED and mode in ("hybrid", "lexical")
+
+    if use_lexical and mode == "lexical":
+        try:
+            chunk_ids, contexts = await loop.run_in_executor(
+                _store_pool, lexical_query_with_ids, collection, question, k
+            )
+            return [], chunk_ids, contexts
+        except Exception as e:
+            print(f"Query error: {e}")
+            return [], [], []
+
+    fetch_k = min(20, k * 2) if use_lexical else k
+    lexical = None
+    if use_lexical:
+        lexical = loop.run_in_executor(
+            _store_pool, lexical_query_with_ids, collection, question, fetch_k
+        )
+
+    try:
+        embedding = client.embed_query(question)
+        if lexical is not None and DENSE_TIMEOUT:
+            embedding = asyncio.wait_for(embedding, DENSE_TIMEOUT)
+        query_embedding = await embedding
+        dense = await loop.run_in_executor(
+            _store_pool, query_with_ids, collection, query_embedding, fetch_k
+        )
+    except Exception as e:
+        if lexical is None:
+            print(f"Query error: {e}")
+            return [], [], []
+        print(f"Dense retrieval failed, using lexical results only: {e!r}")
+        query_embedding, dense = [], ([], [])
+
+    if lexical is None:
+        return query_embedding, dense[0], dense[1]
+
+    try:
+        chunk_ids, contexts = fuse_results([dense, await lexical], k)
+    except Exception as e:
+        print(f"Lexical retrieval failed: {e}")
+        chunk_ids, contexts = dense[0][:k], dense[1][:k]
+
+    return query_embedding, chunk_ids, contexts
+
+def _build_messages(question: str, contexts: List[Tuple[str, Dict]]) -> List[Dict[str, str]]:
+    """Render the grounded chat prompt for a question and its contexts."""
+    system_prompt = build_system_prompt()
+    user_prompt = build_user_prompt(question, contexts)
+    return render_messages(system_prompt, user_prompt)
+
+def _format_sources(contexts: List[Tuple[str, Dict]]) -> List[Dict[str, Any]]:
+    """Prepare retrieved contexts for return to the caller."""
     sources = []
     for i, (text, metadata) in enumerate(contexts, 1):
         sources.append({
             "source": metadata.get('source', 'Unknown'),
             "chunk": metadata.get('chunk', i),
+            **({"last_chunk": metadata["last_chunk"]} if "last_chunk" in metadata else {}),
+            **({"page": metadata["page"]} if "page" in metadata else {}),
+            **({"score": metadata["score"]} if "score" in metadata else {}),
             "text": text[:200] + "..." if len(text) > 200 else text
         })
-    
-    return answer, sources
+    return sources
 
-def _embed_with_retry(chunks: List[str], max_retries: int = 3) -> List[List[float]]:
-    """Generate embeddings with retry logic."""
-    for attempt in range(max_retries):
-        try:
-            return embed_texts(chunks)
-        except Exception as e:
-            print(f"Embedding attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                print(f"Failed to generate embeddings after {max_retries} attempts")
-                return []
-
-def _read_pdf(file_path: str) -> str:
-    """Read text content from a PDF file."""
+def embed_with_retry(chunks: List[str]) -> List[List[float]]:
+    """
+    Generate embeddings, or return [] if they could not be generated.
+
+    The shared Ollama client retries each failed batch request on its own,
+    so one failure no longer re-embeds every chunk of the file.
+    """
     try:
-        with open(file_path, 'rb') as file:
-            reader = pypdf.PdfReader(file)
-            text_parts = []
-            
-            for page in reader.pages:
-                text_parts.append(page.extract_text())
-            
-            return "\n".join(text_parts)
+        return embed_texts(chunks)
     except Exception as e:
-        print(f"Error reading PDF {file_path}: {e}")
-        return ""
+        print(f"Failed to generate embeddings: {e}")
+        return []
+
+def _iter_file_text(file_path: str, block_chars: int = 1 << 20) -> Iterator[str]:
+    """Read a text file in blocks."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                return
+            yield block
+
+def _iter_pdf_text(
+    file_path: str,
+    workers: int,
+    digest: Optional[str],
+    page_starts: List[int]
+) -> Iterator[str]:
+    """Yield the text of each PDF page, newline-separated, appending each page's start offset to `page_starts`."""
+    offset = 0
+    for i, text in enumerate(iter_pdf_pages(file_path, workers, digest)):
+        if i:
+            yield "\n"
+            offset += 1
+        page_starts.append(offset)
+        yield text
+        offset += len(text)
+
+def _chunk(pieces: Iterator[str], max_chars: int, overlap: int, offsets: bool = False) -> Iterator:
+    """Chunk streamed text with the configured CHUNK_MODE."""
+    if CHUNK_MODE == "tokens":
+        counter = get_token_counter(TOKENIZER_PATH or None)
+        return iter_token_chunks(pieces, MAX_TOKENS, TOKEN_OVERLAP, counter, offsets=offsets)
+    return iter_chunks(pieces, max_chars, overlap, offsets=offsets)
@@ -0,0 +1,258 @@
+"""Routing Ollama requests across one or more servers, with per-server circuit breakers."""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from src.config import (
+    OLLAMA_EMBED_URLS, OLLAMA_CHAT_URLS, OLLAMA_PROBE_INTERVAL, CIRCUIT_FAILURES, CIRCUIT_RESET
+)
+from src.metrics import OLLAMA_FAILURES, OLLAMA_OUTSTANDING, OLLAMA_REQUEST_SECONDS
+
+ROLES = ("embed", "chat")
+
+# Seconds a health probe may take before the server counts as down
+PROBE_TIMEOUT = 2.0
+
+_router = None
+_router_lock = threading.Lock()
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without contacting Ollama while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the server is down.
+
+    After `failure_threshold` consecutive failed attempts the circuit opens
+    and calls are refused for `reset_after` seconds. Then a single trial
+    call is let through (half-open): success closes the circuit, failure
+    opens it for another `reset_after` seconds.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURES, reset_after: float = CIRCUIT_RESET, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or self._clock() - self._opened_at >= self.reset_after:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self._clock() - self._opened_at < self.reset_after:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._trial = False
+
+    def trip(self):
+        """Open the circuit now, whatever the failure count (a failed health probe)."""
+        with self._lock:
+            self._failures = max(self._failures, self.failure_threshold)
+            self._opened_at = self._clock()
+            self._trial = False
+
+class Endpoint:
+    """One Ollama server, the request roles it takes and its running totals."""
+
+    def __init__(self, url: str, roles: Iterable[str]):
+        self.url = url.rstrip("/")
+        self.roles = set(roles)
+        self.breaker = CircuitBreaker()
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.ejections = 0
+
+def role_of(path: str) -> str:
+    """Request role of an Ollama API path: "chat" for generation, else "embed"."""
+    return "chat" if path in ("/api/chat", "/api/generate") else "embed"
+
+class EndpointRouter:
+    """
+    Picks the Ollama server for each request.
+
+    A request goes to the healthy server for its role (see `embed_urls` and
+    `chat_urls`) with the fewest requests in flight, ties taken in turn.
+    Each server has its own circuit breaker: one that keeps failing is left
+    out until its breaker lets a trial request through, and only when every
+    server for the role is out does acquire() fail fast. With
+    `probe_interval` set, a background thread also checks each server's
+    /api/version, ejecting servers that stop answering and re-admitting them
+    as soon as they answer again, without waiting for real traffic.
+    """
+
+    def __init__(self, embed_urls: List[str], chat_urls: Optional[List[str]] = None, probe_interval: float = 0.0):
+        roles: Dict[str, List[str]] = {}
+        for role, urls in (("embed", embed_urls), ("chat", chat_urls or embed_urls)):
+            for url in urls:
+                roles.setdefault(url.rstrip("/"), []).append(role)
+        if not roles:
+            raise ValueError("The router needs at least one Ollama URL")
+
+        self.endpoints = [Endpoint(url, url_roles) for url, url_roles in roles.items()]
+        self.probe_interval = probe_interval
+        self._turn = 0
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def acquire(self, role: str, exclude: Iterable[str] = ()) -> Endpoint:
+        """
+        Reserve a server for one request; hand it back with release().
+
+        Args:
+            role: "embed" or "chat"
+            exclude: URLs to avoid if another server can take the request
+                (those a retry already tried)
+
+        Raises:
+            CircuitOpenError: If every server for `role` is out
+        """
+        with self._lock:
+            candidates = [e for e in self.endpoints if role in e.roles]
+            if not candidates:
+                raise ValueError(f"No Ollama URL is configured for {role} requests")
+
+            excluded = set(exclude)
+            preferred = [e for e in candidates if e.url not in excluded] or candidates
+            # Rotate the start so equally loaded servers take turns
+            self._turn += 1
+            start = self._turn % len(preferred)
+            preferred = preferred[start:] + preferred[:start]
+
+            healthy = [e for e in preferred if e.breaker.state == "closed"]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: e.outstanding)
+            else:
+                endpoint = next((e for e in sorted(preferred, key=lambda e: e.outstanding) if e.breaker.allow()), None)
+                if endpoint is None:
+                    urls = ", ".join(e.url for e in candidates)
+                    raise CircuitOpenError(f"Ollama at {urls} is unavailable (circuit open)")
+
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+        OLLAMA_OUTSTANDING.inc(endpoint=endpoint.url)
+        return endpoint
+
+    def release(self, endpoint: Endpoint, role: str, started: float, ok: bool):
+        """
+        Hand back a server reserved with acquire(), recording the outcome.
+
+        Args:
+            endpoint: The reserved server
+            role: Role it was reserved for
+            started: perf_counter() when the request was sent
+            ok: False for a connection error, a timeout or a 5xx
+        """
+        seconds = time.perf_counter() - started
+        if ok:
+            endpoint.breaker.record_success()
+        else:
+            endpoint.breaker.record_failure()
+            OLLAMA_FAILURES.inc(endpoint=endpoint.url)
+
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.seconds += seconds
+            endpoint.failures += not ok
+
+        OLLAMA_OUTSTANDING.dec(endpoint=endpoint.url)
+        OLLAMA_REQUEST_SECONDS.observe(seconds, endpoint=endpoint.url, role=role)
+
+    def has_untried(self, role: str, tried: Iterable[str]) -> bool:
+        """Whether a server for `role` outside `tried` could take a request now."""
+        tried = set(tried)
+        return any(
+            role in e.roles and e.url not in tried and e.breaker.state != "open"
+            for e in self.endpoints
+        )
+
+    def probe(self):
+        """Check every server once: eject those that fail, re-admit those that answer."""
+        for endpoint in self.endpoints:
+            try:
+                requests.get(f"{endpoint.url}/api/version", timeout=PROBE_TIMEOUT).raise_for_status()
+            except requests.RequestException:
+                if endpoint.breaker.state == "closed":
+                    endpoint.ejections += 1
+                    print(f"Warning: Ollama at {endpoint.url} failed its health check, routing around it")
+                endpoint.breaker.trip()
+            else:
+                endpoint.breaker.record_success()
+
+    def start_probing(self):
+        """Probe every `probe_interval` seconds on a daemon thread."""
+        if self._prober is not None or self.probe_interval <= 0:
+            return
+
+        def run():
+            while not self._stop.wait(self.probe_interval):
+                self.probe()
+
+        self._prober = threading.Thread(target=run, name="ollama-probe", daemon=True)
+        self._prober.start()
+
+    def stop_probing(self):
+        self._stop.set()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-server state, load and latency for monitoring."""
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "roles": sorted(e.roles),
+                    "state": e.breaker.state,
+                    "outstanding": e.outstanding,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                    "ejections": e.ejections,
+                    "mean_ms": round(e.seconds / (e.requests - e.outstanding) * 1000, 2)
+                    if e.requests > e.outstanding else None
+                }
+                for e in self.endpoints
+            ]
+
+def get_router() -> EndpointRouter:
+    """Get the process-wide router over the configured OLLAMA_URL servers."""
+    global _router
+
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = EndpointRouter(OLLAMA_EMBED_URLS, OLLAMA_CHAT_URLS, OLLAMA_PROBE_INTERVAL)
+                # A single server has nowhere else to send requests
+                if len(_router.endpoints) > 1:
+                    _router.start_probing()
+
+    return _router
@@ -0,0 +1,130 @@
+"""Multi-turn chat sessions kept in memory by the API server."""
+import asyncio
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+class Session:
+    """
+    One conversation: its earlier turns and the chunks they put in the prompt.
+
+    Turns are only ever appended, so the messages sent for a follow-up start
+    with exactly the messages sent for the turn before it. Ollama keeps the
+    evaluated prompt of a loaded model cached, so a follow-up only pays
+    prefill for its new question and context.
+    """
+
+    def __init__(self, session_id: str, max_turns: int):
+        self.id = session_id
+        self.max_turns = max_turns
+        self.turns: List[Dict[str, Any]] = []
+        self.created = self.last_used = time.time()
+        # Turns of one session run one at a time, in order
+        self.lock = asyncio.Lock()
+
+    @property
+    def chunk_ids(self) -> Set[str]:
+        """IDs of chunks already in the conversation."""
+        return {chunk_id for turn in self.turns for chunk_id in turn["chunk_ids"]}
+
+    @property
+    def citations(self) -> int:
+        """Numbered contexts in the conversation; the next one is citations + 1."""
+        return self.turns[-1]["citations"] if self.turns else 0
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Earlier turns as chat messages, oldest first."""
+        history = []
+        for turn in self.turns:
+            history.append({"role": "user", "content": turn["prompt"]})
+            history.append({"role": "assistant", "content": turn["answer"]})
+        return history
+
+    def add_turn(self, prompt: str, answer: str, chunk_ids: List[str], contexts: int):
+        """
+        Record a completed turn.
+
+        Args:
+            prompt: The user message sent, context included
+            answer: The full generated answer
+            chunk_ids: IDs of the chunks `prompt` added to the conversation
+            contexts: Numbered contexts `prompt` added
+        """
+        self.turns.append({
+            "prompt": prompt,
+            "answer": answer,
+            "chunk_ids": list(chunk_ids),
+            "citations": self.citations + contexts
+        })
+        # Dropping the oldest turn changes the prefix once; later turns
+        # reuse the new one. Its chunks may be retrieved again.
+        if len(self.turns) > self.max_turns:
+            del self.turns[0]
+        self.last_used = time.time()
+
+class SessionStore:
+    """
+    Bounded in-memory store of chat sessions.
+
+    The least recently used session is evicted beyond `max_sessions`, and a
+    session expires after `ttl_seconds` without a turn.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800.0, max_turns: int = 8):
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max(1, max_turns)
+        self.created = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def create(self) -> Session:
+        """Start a new session."""
+        session = Session(secrets.token_hex(16), self.max_turns)
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """The live session with this ID, or None if unknown or expired."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.time()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Session counts for monitoring."""
+        with self._lock:
+            self._expire()
+            return {
+                "active": len(self._sessions),
+                "created": self.created,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def _expire(self):
+        """Drop sessions idle for longer than the TTL, oldest first."""
+        cutoff = time.time() - self.ttl_seconds
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expirations += 1
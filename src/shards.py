@@ -0,0 +1,164 @@
+"""Sharded stores: documents split across independent collections, queried together."""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import PERSIST_DIR, SHARDS, SHARD_BY, SHARD_THREADS
+
+SHARDS_DIR = "shards"
+ROOT_SHARD = "_root"
+
+# Shard queries run here; callers may already be on the store's own pool
+_shard_pool = ThreadPoolExecutor(max_workers=SHARD_THREADS, thread_name_prefix="shard")
+
+def sharding_enabled() -> bool:
+    """Whether ingestion writes to shards (configured with SHARDS / SHARD_BY)."""
+    return SHARDS > 1 or SHARD_BY == "folder"
+
+def shard_of(file_path: str, folder: str, shards: int = SHARDS, by: str = SHARD_BY) -> str:
+    """
+    Name of the shard a file is stored in.
+
+    Args:
+        file_path: The document
+        folder: Folder the document was found in
+        shards: Number of hash shards
+        by: "hash" spreads files evenly over `shards` shards by their path
+            relative to `folder`; "folder" puts each top-level folder of
+            `folder` in a shard of its own, and loose files in "_root"
+
+    Returns:
+        Shard name, also the name of its directory
+    """
+    relative = Path(os.path.relpath(file_path, folder)).as_posix()
+    if by == "folder":
+        parts = relative.split("/")
+        return parts[0] if len(parts) > 1 else ROOT_SHARD
+
+    digest = hashlib.sha256(relative.encode("utf-8")).digest()
+    return f"shard_{int.from_bytes(digest[:8], 'big') % max(1, shards):02d}"
+
+def shard_dir(name: str, persist_dir: str = None) -> str:
+    """Directory holding one shard's store, manifest and indexes."""
+    return os.path.join(persist_dir or PERSIST_DIR, SHARDS_DIR, name)
+
+def list_shards(persist_dir: str = None) -> List[str]:
+    """Names of the shards present in a store, sorted; empty if it is not sharded."""
+    root = os.path.join(persist_dir or PERSIST_DIR, SHARDS_DIR)
+    try:
+        return sorted(entry.name for entry in os.scandir(root) if entry.is_dir())
+    except OSError:
+        return []
+
+class ShardedCollection:
+    """
+    Read-only view over the collections of every shard.
+
+    Implements the read side of the Collection API the store uses (query,
+    get, count) by sending each call to all shards at once and merging the
+    answers: query results by distance, so the top k are the best k across
+    shards. A shard that fails (for example while it is being rebuilt) is
+    left out with a warning, and the others keep answering. Writes go to a
+    shard's own collection, never through this view.
+    """
+
+    def __init__(self, shards: Dict[str, Any], persist_directory: str, name: str = "rag_docs"):
+        if not shards:
+            raise ValueError("A sharded collection needs at least one shard")
+        self.shards = dict(shards)
+        self.persist_directory = persist_directory
+        self.name = name
+        self.metadata = getattr(next(iter(self.shards.values())), "metadata", None)
+
+    def gather(self, call: Callable, *args, **kwargs) -> List[Tuple[str, Any]]:
+        """
+        Run `call(shard_collection, *args, **kwargs)` on every shard concurrently.
+
+        Returns:
+            (shard name, result) for each shard that answered
+        """
+        futures = {
+            name: _shard_pool.submit(call, collection, *args, **kwargs)
+            for name, collection in self.shards.items()
+        }
+        results = []
+        errors = []
+        for name, future in futures.items():
+            try:
+                results.append((name, future.result()))
+            except Exception as e:
+                print(f"Warning: Shard {name} failed, answering without it: {e}")
+                errors.append(e)
+        if errors and not results:
+            raise RuntimeError(f"All {len(errors)} shards failed: {errors[0]}")
+        return results
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """Nearest chunks across all shards for each query embedding, closest first."""
+        def one(collection):
+            options = {"include": include} if include is not None else {}
+            return collection.query(query_embeddings=query_embeddings, n_results=n_results, **options)
+
+        answers = [answer for _, answer in self.gather(one)]
+        merged = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+
+        for row in range(len(query_embeddings)):
+            hits = []
+            for answer in answers:
+                ids = _row(answer, "ids", row)
+                distances = _row(answer, "distances", row)
+                documents = _row(answer, "documents", row)
+                metadatas = _row(answer, "metadatas", row)
+                embeddings = _row(answer, "embeddings", row)
+                for i, chunk_id in enumerate(ids):
+                    hits.append((
+                        distances[i] if i < len(distances) else float("inf"),
+                        chunk_id,
+                        documents[i] if i < len(documents) else None,
+                        metadatas[i] if i < len(metadatas) else None,
+                        embeddings[i] if i < len(embeddings) else None
+                    ))
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:n_results]
+            merged["distances"].append([hit[0] for hit in hits])
+            merged["ids"].append([hit[1] for hit in hits])
+            merged["documents"].append([hit[2] for hit in hits])
+            merged["metadatas"].append([hit[3] for hit in hits])
+            merged["embeddings"].append([hit[4] for hit in hits])
+
+        return merged
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None, **kwargs) -> Dict[str, List[Any]]:
+        """Chunks by ID from whichever shards hold them (or each shard's first `limit`)."""
+        def one(collection):
+            options = {key: value for key, value in (("ids", ids), ("include", include)) if value is not None}
+            return collection.get(**options, **kwargs)
+
+        merged: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        for _, answer in self.gather(one):
+            found = list(answer.get("ids") or [])
+            merged["ids"].extend(found)
+            for key in ("documents", "metadatas", "embeddings"):
+                values = answer.get(key)
+                merged[key].extend(list(values) if values is not None else [None] * len(found))
+        return merged
+
+    def count(self) -> int:
+        return sum(count for _, count in self.gather(lambda collection: collection.count()))
+
+    def upsert(self, *args, **kwargs):
+        raise RuntimeError("Sharded collections are read-only; write to the shard's collection")
+
+    def delete(self, *args, **kwargs):
+        raise RuntimeError("Sharded collections are read-only; write to the shard's collection")
+
+def _row(answer: Dict[str, Any], key: str, row: int) -> List[Any]:
+    rows = answer.get(key) or []
+    return list(rows[row]) if row < len(rows) and rows[row] is not None else []
@@ -1,20 +1,87 @@
-"""ChromaDB vector store operations."""
-import chromadb
-from typing import List, Tuple, Dict, Any
-from src.config import PERSIST_DIR
+"""Vector store operations (ChromaDB or the in-process NumPy backend)."""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+from src.config import (
+    PERSIST_DIR, RETRIEVAL_MODE, LEXICAL_INDEX_ENABLED, RRF_K,
+    VECTOR_BACKEND, VECTOR_DTYPE, VECTOR_INDEX, IVF_NLIST, IVF_NPROBE,
+    VECTOR_QUANTIZATION, PQ_SUBVECTORS, RERANK_FACTOR
+)
 from src.embeddings import embed_texts
+from src.lexical import get_lexical_index, LexicalIndex
+from src.metrics import STAGE_SECONDS
+from src.shards import ShardedCollection, list_shards, shard_dir
+
+VERSION_FILE = "collection_version"
+
+# Runs the lexical half of a hybrid query while the dense half embeds
+_lexical_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lexical")
+
+_collections: Dict[Tuple[str, str], Any] = {}
+_collections_lock = threading.Lock()
 
-def get_client(persist_dir: str = None) -> chromadb.PersistentClient:
-    """Get ChromaDB persistent client."""
+def get_client(persist_dir: str = None, backend: str = None):
+    """Get a persistent client for the configured vector store backend."""
     if persist_dir is None:
         persist_dir = PERSIST_DIR
     
+    # Both backends are slow to import, so load only the one in use
+    if (backend or VECTOR_BACKEND) == "numpy":
+        from src.numpy_store import NumpyClient
+        return NumpyClient(
+            persist_dir,
+            dtype=VECTOR_DTYPE,
+            index=VECTOR_INDEX,
+            nlist=IVF_NLIST,
+            nprobe=IVF_NPROBE,
+            quantization=VECTOR_QUANTIZATION,
+            subvectors=PQ_SUBVECTORS,
+            rerank=RERANK_FACTOR
+        )
+    
+    import chromadb
     return chromadb.PersistentClient(path=persist_dir)
 
-def get_or_create_collection(client: chromadb.PersistentClient, name: str = "rag_docs"):
-    """Get or create a collection in ChromaDB."""
+def get_or_create_collection(client, name: str = "rag_docs"):
+    """Get or create a collection in the client's vector store."""
     return client.get_or_create_collection(name=name)
 
+def get_collection(persist_dir: str = None, name: str = "rag_docs"):
+    """
+    Open a collection on first use and return the same object afterwards.
+    
+    Long-running processes use this instead of opening the store at import,
+    so importing them stays fast and the store is opened exactly once.
+    A sharded store (one with a shards/ directory) opens as a
+    ShardedCollection over the shards present at that time.
+    """
+    key = (persist_dir or PERSIST_DIR, name)
+    collection = _collections.get(key)
+    if collection is None:
+        with _collections_lock:
+            collection = _collections.get(key)
+            if collection is None:
+                collection = _collections[key] = open_collection(key[0], name)
+    return collection
+
+def open_collection(persist_dir: str = None, name: str = "rag_docs"):
+    """Open the collection of a store, or a ShardedCollection if the store is sharded."""
+    persist_dir = persist_dir or PERSIST_DIR
+    shards = list_shards(persist_dir)
+    if not shards:
+        return get_or_create_collection(get_client(persist_dir), name)
+    return ShardedCollection(
+        {shard: get_or_create_collection(get_client(shard_dir(shard, persist_dir)), name) for shard in shards},
+        persist_dir,
+        name
+    )
+
 def add_texts(
     collection,
     ids: List[str],
@@ -22,7 +89,12 @@ def add_texts(
     metadatas: List[Dict[str, Any]],
     embeddings: List[List[float]]
 ):
-    """Add texts with embeddings to the collection with validation."""
+    """
+    Add texts with embeddings to the collection with validation.
+
+    Uses upsert semantics, so re-adding a chunk ID replaces it instead of
+    duplicating it.
+    """
     # Validate inputs
     if not all(len(arr) == len(ids) for arr in [documents, metadatas, embeddings]):
         raise ValueError("All input arrays must have the same length")
@@ -30,13 +102,109 @@ def add_texts(
     if not ids:
         raise ValueError("No documents to add")
     
-    collection.add(
+    collection.upsert(
         ids=ids,
         documents=documents,
         metadatas=metadatas,
         embeddings=embeddings
     )
+    _update_lexical(collection, lambda index: index.add(ids, documents, metadatas))
+    mark_collection_changed(collection)
+
+def delete_file(collection, file_path: str):
+    """Remove every chunk that was ingested from `file_path`."""
+    collection.delete(where={"file_path": file_path})
+    _update_lexical(collection, lambda index: index.delete_file(file_path))
+    mark_collection_changed(collection)
+
+def clear_collection(collection, batch_size: int = 1000) -> int:
+    """
+    Delete every chunk from a collection and its lexical index, keeping the
+    collection itself so that processes holding it open stay valid.
+    
+    Returns:
+        Number of chunks deleted
+    """
+    deleted = 0
+    while True:
+        ids = collection.get(include=[], limit=batch_size)["ids"]
+        if not ids:
+            break
+        collection.delete(ids=list(ids))
+        deleted += len(ids)
+    _update_lexical(collection, lambda index: index.clear())
+    mark_collection_changed(collection)
+    return deleted
+
+def warm_up(collection) -> Dict[str, float]:
+    """
+    Load what the first query would otherwise load: the vector index (via a
+    one-result query with a stored embedding) and the lexical index.
+    
+    Returns:
+        Seconds spent per step
+    """
+    if isinstance(collection, ShardedCollection):
+        timings: Dict[str, float] = {}
+        for _, shard_timings in collection.gather(warm_up):
+            for step, seconds in shard_timings.items():
+                timings[step] = max(timings.get(step, 0.0), seconds)
+        return timings
+    
+    timings = {}
+    
+    start = time.perf_counter()
+    sample = collection.get(limit=1, include=["embeddings"])
+    embeddings = sample.get("embeddings")
+    if sample.get("ids") and embeddings is not None and len(embeddings):
+        collection.query(query_embeddings=[list(embeddings[0])], n_results=1)
+    timings["vector_index"] = time.perf_counter() - start
+    
+    if LEXICAL_INDEX_ENABLED and RETRIEVAL_MODE != "dense":
+        start = time.perf_counter()
+        lexical_index_of(collection).count()
+        timings["lexical_index"] = time.perf_counter() - start
+    
+    return timings
+
+def persist_dir_of(collection) -> str:
+    """Directory a collection is persisted in (PERSIST_DIR if unknown)."""
+    directory = getattr(collection, "persist_directory", None)
+    if not isinstance(directory, str):
+        try:
+            directory = collection._client.get_settings().persist_directory
+        except AttributeError:
+            directory = None
+    return directory if isinstance(directory, str) and directory else PERSIST_DIR
+
+def mark_collection_changed(collection):
+    """
+    Record that the collection's contents changed.
 
+    Other processes (the API server) compare collection_version() to notice
+    re-ingestion without querying Chroma.
+    """
+    path = os.path.join(persist_dir_of(collection), VERSION_FILE)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(str(time.time_ns()))
+    except OSError as e:
+        print(f"Warning: Could not update {path}: {e}")
+
+def collection_version(persist_dir: str = None) -> str:
+    """Opaque token that changes whenever ingestion modifies the store or any of its shards."""
+    persist_dir = persist_dir or PERSIST_DIR
+    directories = [persist_dir] + [shard_dir(shard, persist_dir) for shard in list_shards(persist_dir)]
+    versions = []
+    for directory in directories:
+        try:
+            with open(os.path.join(directory, VERSION_FILE), 'r', encoding='utf-8') as f:
+                versions.append(f.read())
+        except OSError:
+            versions.append("")
+    return "/".join(versions) if len(versions) > 1 else versions[0]
+
+@STAGE_SECONDS.time(stage="retrieve")
 def query(collection, query_text: str, k: int = 5) -> List[Tuple[str, Dict[str, Any]]]:
     """
     Query the collection for similar documents.
@@ -52,24 +220,331 @@ def query(collection, query_text: str, k: int = 5) -> List[Tuple[str, Dict[str,
     if not query_text.strip():
         return []
     
+    try:
+        return search(collection, query_text, k)[1]
+    
+    except Exception as e:
+        print(f"Query error: {e}")
+        return []
+
+def search(
+    collection,
+    query_text: str,
+    k: int = 5,
+    mode: Optional[str] = None
+) -> Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Retrieve chunks with dense, lexical or hybrid retrieval.
+    
+    In hybrid mode the BM25 lookup runs while the question is embedded, and
+    the two rankings are merged with reciprocal rank fusion. If embedding
+    fails, the lexical results are returned on their own.
+    
+    Args:
+        collection: ChromaDB collection
+        query_text: Query string
+        k: Number of results to return
+        mode: "dense", "lexical" or "hybrid" (default: RETRIEVAL_MODE)
+    
+    Returns:
+        Tuple of (chunk_ids, [(document_text, metadata), ...])
+    """
     # Limit k to reasonable range
     k = max(1, min(20, k))
+    mode = mode or RETRIEVAL_MODE
     
+    if mode == "lexical" and LEXICAL_INDEX_ENABLED:
+        return lexical_query_with_ids(collection, query_text, k)
+    
+    if mode != "hybrid" or not LEXICAL_INDEX_ENABLED:
+        query_embedding = embed_texts([query_text])[0]
+        return query_with_ids(collection, query_embedding, k)
+    
+    fetch_k = min(20, k * 2)
+    lexical = _lexical_pool.submit(lexical_query_with_ids, collection, query_text, fetch_k)
     try:
-        # Generate embedding for query
         query_embedding = embed_texts([query_text])[0]
-        
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k
-        )
-        
-        # Extract documents and metadatas
-        documents = results['documents'][0] if results['documents'] else []
-        metadatas = results['metadatas'][0] if results['metadatas'] else []
-        
-        return list(zip(documents, metadatas))
+        dense = query_with_ids(collection, query_embedding, fetch_k)
+    except Exception as e:
+        print(f"Dense retrieval failed, using lexical results only: {e}")
+        ids, contexts = lexical.result()
+        return ids[:k], contexts[:k]
     
+    try:
+        return fuse_results([dense, lexical.result()], k)
     except Exception as e:
-        print(f"Query error: {e}")
+        print(f"Lexical retrieval failed: {e}")
+        return dense[0][:k], dense[1][:k]
+
+def query_many(
+    collection,
+    questions: List[str],
+    k: int = 5,
+    mode: Optional[str] = None,
+    query_embeddings: Optional[List[List[float]]] = None
+) -> List[Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]]:
+    """
+    Retrieve chunks for many questions at once.
+    
+    All questions are embedded together (embed_texts splits them into
+    EMBED_BATCH_SIZE requests) and looked up with a single multi-vector
+    collection query, instead of one embedding request and one query per
+    question. In hybrid mode the BM25 lookups run while the questions
+    embed; if embedding fails, the lexical results are returned on their own.
+    
+    Args:
+        collection: ChromaDB collection
+        questions: Query strings
+        k: Number of results per question
+        mode: "dense", "lexical" or "hybrid" (default: RETRIEVAL_MODE)
+        query_embeddings: Embeddings of the non-blank questions, in order,
+            if the caller already computed them
+    
+    Returns:
+        One (chunk_ids, [(document_text, metadata), ...]) per question, in
+        question order; blank questions get empty results
+    """
+    k = max(1, min(20, k))
+    mode = mode or RETRIEVAL_MODE
+    results = [([], []) for _ in questions]
+    wanted = [i for i, question in enumerate(questions) if question.strip()]
+    if not wanted:
+        return results
+    
+    if mode == "lexical" and LEXICAL_INDEX_ENABLED:
+        for i in wanted:
+            results[i] = lexical_query_with_ids(collection, questions[i], k)
+        return results
+    
+    use_lexical = mode == "hybrid" and LEXICAL_INDEX_ENABLED
+    fetch_k = min(20, k * 2) if use_lexical else k
+    lexical = {}
+    if use_lexical:
+        lexical = {
+            i: _lexical_pool.submit(lexical_query_with_ids, collection, questions[i], fetch_k)
+            for i in wanted
+        }
+    
+    try:
+        if query_embeddings is None:
+            query_embeddings = embed_texts([questions[i] for i in wanted])
+        dense = query_many_with_ids(collection, query_embeddings, fetch_k)
+    except Exception as e:
+        if not use_lexical:
+            raise
+        print(f"Dense retrieval failed, using lexical results only: {e}")
+        for i in wanted:
+            ids, contexts = lexical[i].result()
+            results[i] = (ids[:k], contexts[:k])
+        return results
+    
+    for i, hits in zip(wanted, dense):
+        if not use_lexical:
+            results[i] = hits
+            continue
+        try:
+            results[i] = fuse_results([hits, lexical[i].result()], k)
+        except Exception as e:
+            print(f"Lexical retrieval failed: {e}")
+            results[i] = (hits[0][:k], hits[1][:k])
+    
+    return results
+
+def query_with_ids(
+    collection,
+    query_embedding: List[float],
+    k: int = 5
+) -> Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Query the collection with an already computed query embedding.
+    
+    Returns:
+        Tuple of (chunk_ids, [(document_text, metadata), ...])
+    """
+    return query_many_with_ids(collection, [query_embedding], k)[0]
+
+@STAGE_SECONDS.time(stage="search")
+def query_many_with_ids(
+    collection,
+    query_embeddings: List[List[float]],
+    k: int = 5
+) -> List[Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]]:
+    """
+    Run several embedding queries as one multi-vector collection query.
+    
+    Each chunk's metadata carries its cosine similarity to the query as
+    "score" (see similarity()).
+    
+    Returns:
+        One (chunk_ids, [(document_text, metadata), ...]) per query embedding
+    """
+    if not query_embeddings:
         return []
+    
+    k = max(1, min(20, k))
+    
+    # l2 distances only give a similarity with the stored vectors at hand
+    options = {"include": ["documents", "metadatas", "distances", "embeddings"]} if _space(collection) == "l2" else {}
+    results = collection.query(
+        query_embeddings=list(query_embeddings),
+        n_results=k,
+        **options
+    )
+    
+    ids = results.get('ids') or []
+    documents = results.get('documents') or []
+    metadatas = results.get('metadatas') or []
+    distances = results.get('distances') or []
+    vectors = results.get('embeddings')
+    if vectors is None:
+        vectors = []
+    
+    hits = []
+    for i in range(len(query_embeddings)):
+        row_metadatas = metadatas[i] if i < len(metadatas) else []
+        if i < len(distances) and len(distances[i]):
+            row_vectors = vectors[i] if i < len(vectors) and vectors[i] is not None else []
+            row_metadatas = [
+                _with_score(metadata, similarity(
+                    collection, distance, query_embeddings[i],
+                    row_vectors[j] if j < len(row_vectors) else None
+                ))
+                for j, (metadata, distance) in enumerate(zip(row_metadatas, distances[i]))
+            ]
+        hits.append((
+            ids[i] if i < len(ids) else [],
+            list(zip(documents[i] if i < len(documents) else [], row_metadatas))
+        ))
+    return hits
+
+def similarity(collection, distance: float, query=None, vector=None) -> Optional[float]:
+    """
+    Cosine similarity of a query to a chunk, or None if it cannot be known.
+    
+    A "cosine" space reports 1 - cosine similarity as the distance. Chroma's
+    default "l2" space reports squared Euclidean distance, which says nothing
+    about the angle unless both vectors are unit-length, and stores embedded
+    before vectors were normalized hold raw ones. There the similarity is
+    computed from the query and the stored `vector` instead.
+    """
+    if _space(collection) != "l2":
+        return round(1.0 - float(distance), 4)
+    if query is None or vector is None:
+        return None
+    query = np.asarray(query, dtype=np.float32)
+    vector = np.asarray(vector, dtype=np.float32)
+    norms = float(np.linalg.norm(query) * np.linalg.norm(vector))
+    return round(float(np.dot(query, vector)) / norms, 4) if norms else None
+
+def _space(collection) -> str:
+    metadata = getattr(collection, "metadata", None)
+    return metadata.get("hnsw:space", "l2") if isinstance(metadata, dict) else "l2"
+
+def _with_score(metadata: Optional[Dict[str, Any]], score: Optional[float]) -> Dict[str, Any]:
+    metadata = dict(metadata or {})
+    if score is not None:
+        metadata["score"] = score
+    return metadata
+
+@STAGE_SECONDS.time(stage="lexical_search")
+def lexical_query_with_ids(
+    collection,
+    query_text: str,
+    k: int = 5
+) -> Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Retrieve chunks by BM25 score from the collection's lexical index.
+    
+    Each chunk's metadata carries its "bm25" score. A sharded collection is
+    searched shard by shard, concurrently, and the hits merged by score.
+    
+    Returns:
+        Tuple of (chunk_ids, [(document_text, metadata), ...]), best first
+    """
+    if isinstance(collection, ShardedCollection):
+        hits = [
+            (context[1]["bm25"], chunk_id, context)
+            for _, (ids, contexts) in collection.gather(lexical_query_with_ids, query_text, k)
+            for chunk_id, context in zip(ids, contexts)
+        ]
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        hits = hits[:max(1, min(20, k))]
+        return [chunk_id for _, chunk_id, _ in hits], [context for _, _, context in hits]
+    
+    hits = lexical_index_of(collection).search(query_text, max(1, min(20, k)))
+    if not hits:
+        return [], []
+    
+    ids = [chunk_id for chunk_id, _ in hits]
+    stored = collection.get(ids=ids, include=["documents", "metadatas"])
+    by_id = {
+        chunk_id: (document, metadata)
+        for chunk_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+    }
+    
+    # The index can briefly run ahead of or behind Chroma; keep what both know
+    bm25 = dict(hits)
+    ids = [chunk_id for chunk_id in ids if chunk_id in by_id]
+    return ids, [
+        (by_id[chunk_id][0], {**(by_id[chunk_id][1] or {}), "bm25": round(bm25[chunk_id], 4)})
+        for chunk_id in ids
+    ]
+
+def fuse_results(
+    results: List[Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]],
+    k: int,
+    rrf_k: int = RRF_K
+) -> Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+    
+    Each chunk scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    
+    Returns:
+        The top k as (chunk_ids, [(document_text, metadata), ...])
+    """
+    scores: Dict[str, float] = {}
+    contexts: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    
+    for ids, items in results:
+        for rank, (chunk_id, item) in enumerate(zip(ids, items), 1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+            if chunk_id in contexts:
+                # Keep the scores every list found the chunk with
+                text, metadata = contexts[chunk_id]
+                contexts[chunk_id] = (text, {**(item[1] or {}), **(metadata or {})})
+            else:
+                contexts[chunk_id] = item
+    
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return ranked, [contexts[chunk_id] for chunk_id in ranked]
+
+def lexical_index_of(collection) -> LexicalIndex:
+    """The BM25 index kept next to a collection."""
+    return get_lexical_index(persist_dir_of(collection), collection.name)
+
+def rebuild_lexical_index(collection, batch_size: int = 1000) -> int:
+    """
+    Rebuild a collection's lexical index from the documents stored in Chroma.
+    
+    Returns:
+        Number of chunks indexed
+    """
+    index = lexical_index_of(collection)
+    index.clear()
+    total = collection.count()
+    
+    for offset in range(0, total, batch_size):
+        batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        index.add(batch['ids'], batch['documents'], batch['metadatas'])
+    
+    return index.count()
+
+def _update_lexical(collection, update):
+    """Apply a write to the lexical index without failing the Chroma write."""
+    if not LEXICAL_INDEX_ENABLED:
+        return
+    try:
+        update(lexical_index_of(collection))
+    except sqlite3.Error as e:
+        print(f"Warning: Lexical index update failed (rebuild with ingest.py --reindex-lexical): {e}")
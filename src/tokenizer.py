@@ -0,0 +1,66 @@
+"""Token counting for token-budget chunking."""
+import functools
+import math
+import re
+from typing import Optional
+
+# Words, single punctuation marks and single CJK characters: the pieces a
+# BERT-style pre-tokenizer (nomic-embed-text's) splits text into
+_PIECE_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]|[^\W_]+|[^\w\s]|_")
+
+class RegexTokenCounter:
+    """
+    Vocabulary-free approximation of WordPiece token counts.
+
+    Text is split the way the BERT pre-tokenizer splits it; each piece then
+    counts as one token if short and as one per ~4 characters (3 for digits)
+    if long, since rare and long words break into several subwords. It
+    over-counts common long words slightly, which keeps chunks under budget.
+    """
+
+    name = "approximate"
+
+    def count(self, text: str) -> int:
+        return sum(_piece_tokens(piece) for piece in _PIECE_RE.findall(text))
+
+class HFTokenCounter:
+    """Exact counts from a Hugging Face `tokenizers` tokenizer.json file."""
+
+    name = "tokenizers"
+
+    def __init__(self, path: str):
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(path)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+@functools.lru_cache(maxsize=1 << 16)
+def _piece_tokens(piece: str) -> int:
+    if piece.isdigit():
+        return math.ceil(len(piece) / 3)
+    if len(piece) <= 7:
+        return 1
+    return math.ceil(len(piece) / 4)
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(path: Optional[str] = None):
+    """
+    Token counter for chunking.
+
+    Args:
+        path: tokenizer.json of the embedding model; without one (or without
+            the `tokenizers` package) counts are approximated
+
+    Returns:
+        An object with a count(text) -> int method
+    """
+    if path:
+        try:
+            return HFTokenCounter(path)
+        except ImportError:
+            print("Warning: the tokenizers package is not installed, approximating token counts")
+        except Exception as e:
+            print(f"Warning: could not load tokenizer {path}: {e}, approximating token counts")
+    return RegexTokenCounter()
@@ -0,0 +1,155 @@
+"""Tests for admission control in the API server."""
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+from app import app as api
+from src.admission import AdmissionController, Rejected
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_queue_order_by_priority(self):
+        """Test that freed slots go to waiting requests by priority, then arrival."""
+        order = []
+
+        async def main():
+            controller = AdmissionController(max_active=1, max_queue=8)
+            first = await controller.acquire()
+
+            async def request(name, priority):
+                ticket = await controller.acquire(priority)
+                order.append(name)
+                ticket.release()
+
+            tasks = [asyncio.ensure_future(request(name, priority)) for name, priority in
+                     (("low", "low"), ("normal 1", "normal"), ("high", "high"), ("normal 2", "normal"))]
+            await _settle()
+            self.assertEqual(controller.stats()["queued"], 4)
+            first.release()
+            await asyncio.gather(*tasks)
+            return controller.stats()
+
+        stats = asyncio.run(main())
+
+        self.assertEqual(order, ["high", "normal 1", "normal 2", "low"])
+        self.assertEqual((stats["active"], stats["queued"], stats["admitted"]), (0, 0, 5))
+
+    def test_full_queue_rejects_with_retry_after(self):
+        """Test that a request beyond the queue is turned away at once with a 429."""
+        async def main():
+            controller = AdmissionController(max_active=1, max_queue=1)
+            await controller.acquire()
+            waiting = asyncio.ensure_future(controller.acquire())
+            await _settle()
+            try:
+                await controller.acquire()
+            finally:
+                waiting.cancel()
+
+        with self.assertRaises(Rejected) as caught:
+            asyncio.run(main())
+
+        self.assertEqual(caught.exception.status_code, 429)
+        self.assertGreaterEqual(caught.exception.retry_after, 1)
+
+    def test_wait_is_bounded(self):
+        """Test that a queued request gives up with a 503 at the queue timeout or its deadline."""
+        async def main():
+            controller = AdmissionController(max_active=1, max_queue=4, queue_timeout=0.05)
+            await controller.acquire()
+            results = []
+            for deadline in (None, time.monotonic() + 0.01):
+                started = time.monotonic()
+                try:
+                    await controller.acquire(deadline=deadline)
+                except Rejected as e:
+                    results.append((e.status_code, time.monotonic() - started))
+            return results, controller.stats()
+
+        results, stats = asyncio.run(main())
+
+        self.assertEqual([status for status, _ in results], [503, 503])
+        self.assertLess(results[1][1], 0.04)
+        self.assertEqual((stats["queued"], stats["timed_out"]), (0, 2))
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        """Test that a request cancelled while queued neither holds a place nor a slot."""
+        async def main():
+            controller = AdmissionController(max_active=1, max_queue=4)
+            first = await controller.acquire()
+            gone = asyncio.ensure_future(controller.acquire())
+            await _settle()
+            gone.cancel()
+            await _settle()
+            self.assertEqual(controller.stats()["queued"], 0)
+            first.release()
+            return controller.stats()
+
+        self.assertEqual(asyncio.run(main())["active"], 0)
+
+    def test_slot_granted_at_timeout_is_passed_on(self):
+        """Test that a slot handed over just as the wait times out is not leaked."""
+        async def main():
+            controller = AdmissionController(max_active=1, max_queue=4)
+            first = await controller.acquire()
+
+            async def wait_for(granted, timeout):
+                # The slot is freed in the same loop iteration the timeout fires
+                first.release()
+                self.assertTrue(granted.done())
+                raise asyncio.TimeoutError
+
+            with patch("src.admission.asyncio.wait_for", wait_for):
+                with self.assertRaises(Rejected) as caught:
+                    await controller.acquire()
+            self.assertEqual(caught.exception.status_code, 503)
+            return controller.stats()
+
+        stats = asyncio.run(main())
+
+        self.assertEqual((stats["active"], stats["queued"], stats["timed_out"]), (0, 0, 1))
+
+class TestUntilDone(unittest.TestCase):
+
+    def _run(self, receive, deadline):
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def main():
+            return await api._until_done(work(), receive, deadline)
+
+        with self.assertRaises(HTTPException) as caught:
+            asyncio.run(main())
+        self.assertEqual(cancelled, [True])
+        return caught.exception.status_code
+
+    def test_disconnect_cancels_work(self):
+        """Test that work stops as soon as the client disconnects."""
+        async def receive():
+            await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        self.assertEqual(self._run(receive, time.monotonic() + 5), 499)
+
+    def test_deadline_cancels_work(self):
+        """Test that work stops at the deadline."""
+        async def receive():
+            await asyncio.sleep(10)
+
+        self.assertEqual(self._run(receive, time.monotonic() + 0.02), 504)
+
+if __name__ == "__main__":
+    unittest.main()
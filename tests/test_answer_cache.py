@@ -0,0 +1,99 @@
+"""Tests for the semantic answer cache."""
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src import rag
+from src.answer_cache import AnswerCache
+
+SOURCES = [{"source": "a.txt", "chunk": 1, "text": "ctx"}]
+
+class TestAnswerCache(unittest.TestCase):
+
+    def test_similar_question_hits(self):
+        """Test that a near-duplicate question with the same chunks is a hit."""
+        cache = AnswerCache(threshold=0.9)
+        cache.store([1.0, 0.0], ["c1", "c2"], "m", "answer", SOURCES)
+
+        self.assertEqual(cache.lookup([0.99, 0.05], ["c1", "c2"], "m"), ("answer", SOURCES))
+        self.assertIsNone(cache.lookup([0.0, 1.0], ["c1", "c2"], "m"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_chunks_and_model_must_match(self):
+        """Test that different retrieved chunks or chat model miss."""
+        cache = AnswerCache()
+        cache.store([1.0, 0.0], ["c1", "c2"], "m", "answer", SOURCES)
+
+        self.assertIsNone(cache.lookup([1.0, 0.0], ["c2", "c1"], "m"))
+        self.assertIsNone(cache.lookup([1.0, 0.0], ["c1", "c2"], "other"))
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are not served."""
+        cache = AnswerCache(ttl_seconds=10)
+        with patch("src.answer_cache.time.time", return_value=1000.0):
+            cache.store([1.0], ["c1"], "m", "answer", SOURCES)
+        with patch("src.answer_cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.lookup([1.0], ["c1"], "m"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = AnswerCache(max_entries=2)
+        cache.store([1.0], ["a"], "m", "A", SOURCES)
+        cache.store([1.0], ["b"], "m", "B", SOURCES)
+        cache.lookup([1.0], ["a"], "m")
+
+        cache.store([1.0], ["c"], "m", "C", SOURCES)
+
+        self.assertIsNotNone(cache.lookup([1.0], ["a"], "m"))
+        self.assertIsNone(cache.lookup([1.0], ["b"], "m"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_invalidated_when_collection_changes(self):
+        """Test that a new collection version empties the cache."""
+        version = ["v1"]
+        cache = AnswerCache(version_source=lambda: version[0])
+        cache.store([1.0], ["c1"], "m", "answer", SOURCES)
+
+        version[0] = "v2"
+
+        self.assertIsNone(cache.lookup([1.0], ["c1"], "m"))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+class TestCachedRetrieveAndAnswer(unittest.TestCase):
+
+    @patch.object(rag, "RETRIEVAL_MODE", "dense")
+    def test_repeat_question_skips_generation(self):
+        """Test that the second identical question is answered from the cache."""
+        collection = MagicMock()
+        collection.query.return_value = {
+            "ids": [["c1"]],
+            "documents": [["ctx"]],
+            "metadatas": [[{"source": "a.txt", "chunk": 1}]]
+        }
+        client = MagicMock()
+
+        async def embed_query(text):
+            return [0.6, 0.8]
+
+        async def chat(messages):
+            return "generated"
+
+        client.embed_query.side_effect = embed_query
+        client.chat.side_effect = chat
+        cache = AnswerCache()
+
+        async def ask_twice():
+            first = await rag.retrieve_and_answer_async("Q?", collection, client, 5, cache)
+            second = await rag.retrieve_and_answer_async("Q?", collection, client, 5, cache)
+            return first, second
+
+        first, second = asyncio.run(ask_twice())
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.chat.call_count, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""Tests for the async Ollama client and async RAG path."""
+import asyncio
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from src import async_ollama, rag
+from src.async_ollama import AsyncOllamaClient
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if request.url.path == "/api/embed":
+        return httpx.Response(200, json={"embeddings": [[float(len(t))] for t in body["input"]]})
+    if request.url.path == "/api/chat":
+        lines = [{"message": {"content": piece}, "done": False} for piece in ("Hi", " there")]
+        lines.append({"message": {"content": ""}, "done": True})
+        return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines))
+    return httpx.Response(404, text="404 page not found")
+
+class TestAsyncOllamaClient(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(async_ollama, "get_embedding_cache", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, coro_factory, handler=_handler, **options):
+        async def main():
+            client = AsyncOllamaClient(base_url="http://ollama", transport=httpx.MockTransport(handler), **options)
+            try:
+                return await coro_factory(client)
+            finally:
+                await client.aclose()
+        return asyncio.run(main())
+
+    def test_embed_preserves_order_across_batches(self):
+        """Test that batched embeddings come back in input order."""
+        texts = ["a" * i for i in range(1, 80)]
+
+        vectors = self._run(lambda client: client.embed(texts))
+
+        self.assertEqual(vectors, [[float(i)] for i in range(1, 80)])
+
+    def test_embed_falls_back_to_legacy_endpoint(self):
+        """Test per-text fallback when /api/embed does not exist."""
+        def legacy(request):
+            if request.url.path == "/api/embeddings":
+                return httpx.Response(200, json={"embedding": [0.0, 2.0]})
+            return httpx.Response(404, text="404 page not found")
+
+        vectors = self._run(lambda client: client.embed(["x", "y"]), legacy)
+
+        self.assertEqual(vectors, [[0.0, 1.0], [0.0, 1.0]])
+
+    def test_concurrent_questions_share_an_embedding_request(self):
+        """Test that questions embedded at the same time go to Ollama together."""
+        requests = []
+
+        def handler(request):
+            if request.url.path == "/api/embed":
+                requests.append(json.loads(request.content)["input"])
+            return _handler(request)
+
+        async def embed_all(client):
+            return await asyncio.gather(*(client.embed_query("q" * i) for i in range(1, 4)))
+
+        vectors = self._run(embed_all, handler)
+
+        self.assertEqual(vectors, [[1.0], [2.0], [3.0]])
+        self.assertEqual(requests, [["q", "qq", "qqq"]])
+
+    def test_chat_stream(self):
+        """Test that chat_stream yields content pieces and chat joins them."""
+        async def collect(client):
+            return [piece async for piece in client.chat_stream([])], await client.chat([])
+
+        pieces, answer = self._run(collect)
+
+        self.assertEqual(pieces, ["Hi", " there"])
+        self.assertEqual(answer, "Hi there")
+
+    def test_transient_failures_are_retried(self):
+        """Test that 5xx, 429 and connection errors are retried until Ollama answers."""
+        failures = {"/api/embed": [503, 429], "/api/chat": ["connect"]}
+        calls = []
+
+        def flaky(request):
+            calls.append(request.url.path)
+            pending = failures[request.url.path]
+            if pending:
+                failure = pending.pop(0)
+                if failure == "connect":
+                    raise httpx.ConnectError("refused", request=request)
+                return httpx.Response(failure, json={"error": "busy"})
+            return _handler(request)
+
+        async def ask(client):
+            return await client.embed(["ab"]), await client.chat([])
+
+        vectors, answer = self._run(ask, flaky, backoff=0)
+
+        self.assertEqual((vectors, answer), ([[2.0]], "Hi there"))
+        self.assertEqual(calls, ["/api/embed"] * 3 + ["/api/chat"] * 2)
+
+    def test_retries_are_bounded(self):
+        """Test that a server that keeps failing is given up on after the retries."""
+        calls = []
+
+        def down(request):
+            calls.append(request.url.path)
+            return httpx.Response(503, json={"error": "unavailable"})
+
+        with self.assertRaises(RuntimeError):
+            self._run(lambda client: client.embed(["ab"]), down, retries=2, backoff=0)
+        self.assertEqual(len(calls), 3)
+
+    @patch.object(rag, "RETRIEVAL_MODE", "dense")
+    def test_retrieve_and_answer_async(self):
+        """Test the async RAG path end to end with a stub collection."""
+        collection = MagicMock(metadata={"hnsw:space": "cosine"})
+        collection.query.return_value = {
+            "documents": [["Context text."]],
+            "metadatas": [[{"source": "a.txt", "chunk": 2}]]
+        }
+
+        answer, sources = self._run(
+            lambda client: rag.retrieve_and_answer_async("Question?", collection, client, k=3)
+        )
+
+        self.assertEqual(answer, "Hi there")
+        self.assertEqual(sources, [{"source": "a.txt", "chunk": 2, "text": "Context text."}])
+        collection.query.assert_called_once_with(query_embeddings=[[9.0]], n_results=3)
+
+    @patch.object(rag, "RETRIEVAL_MODE", "dense")
+    def test_answer_many_async(self):
+        """Test that a batch is retrieved with one query and every question is answered."""
+        collection = MagicMock(metadata={"hnsw:space": "cosine"})
+        collection.query.return_value = {
+            "ids": [["x"], ["y"]],
+            "documents": [["X."], ["Y."]],
+            "metadatas": [[{"source": "x.txt", "chunk": 0}], [{"source": "y.txt", "chunk": 0}]]
+        }
+
+        async def collect(client):
+            return [result async for result in rag.answer_many_async(["A?", "Bee?"], collection, client, k=2)]
+
+        results = sorted(self._run(collect), key=lambda result: result["index"])
+
+        collection.query.assert_called_once_with(query_embeddings=[[2.0], [4.0]], n_results=2)
+        self.assertEqual([result["answer"] for result in results], ["Hi there", "Hi there"])
+        self.assertEqual(results[1]["sources"], [{"source": "y.txt", "chunk": 0, "text": "Y."}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Tests for batched retrieval and batch answering."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src import rag, store
+from src.store import query_many
+
+def _collection():
+    """Stub collection answering each query embedding with one chunk named after it."""
+    # A cosine space reports similarities as distances, so needs no stored vectors
+    collection = MagicMock(metadata={"hnsw:space": "cosine"})
+
+    def query(query_embeddings, n_results):
+        names = [f"chunk-{int(vector[0])}" for vector in query_embeddings]
+        return {
+            "ids": [[name] for name in names],
+            "documents": [[f"Text of {name}."] for name in names],
+            "metadatas": [[{"source": f"{name}.txt", "chunk": 0}] for name in names]
+        }
+
+    collection.query.side_effect = query
+    return collection
+
+class TestQueryMany(unittest.TestCase):
+
+    @patch.object(store, "embed_texts", side_effect=lambda texts: [[float(len(t))] for t in texts])
+    def test_one_embedding_call_and_one_query(self, embed):
+        """Test that a batch is embedded together and looked up with a single query."""
+        collection = _collection()
+
+        results = query_many(collection, ["ab", "  ", "abcd"], k=3, mode="dense")
+
+        embed.assert_called_once_with(["ab", "abcd"])
+        collection.query.assert_called_once_with(query_embeddings=[[2.0], [4.0]], n_results=3)
+        self.assertEqual([ids for ids, _ in results], [["chunk-2"], [], ["chunk-4"]])
+        self.assertEqual(results[2][1], [("Text of chunk-4.", {"source": "chunk-4.txt", "chunk": 0})])
+
+    @patch.object(store, "embed_texts")
+    def test_precomputed_embeddings_are_used(self, embed):
+        """Test that embeddings passed in by the caller are not computed again."""
+        collection = _collection()
+
+        results = query_many(collection, ["q"], k=1, mode="dense", query_embeddings=[[7.0]])
+
+        embed.assert_not_called()
+        self.assertEqual(results[0][0], ["chunk-7"])
+
+@patch.object(store, "RETRIEVAL_MODE", "dense")
+@patch.object(store, "embed_texts", side_effect=lambda texts: [[float(len(t))] for t in texts])
+class TestAnswerMany(unittest.TestCase):
+
+    def test_every_question_gets_a_result(self, _embed):
+        """Test that answers, empty retrievals and failures each yield one result line."""
+        collection = _collection()
+        collection.query.side_effect = lambda query_embeddings, n_results: {
+            "ids": [["x"], [], ["z"]],
+            "documents": [["X."], [], ["Z."]],
+            "metadatas": [[{"source": "x.txt", "chunk": 0}], [], [{"source": "z.txt", "chunk": 1}]]
+        }
+
+        def chat(messages):
+            if "Z." in messages[-1]["content"]:
+                raise RuntimeError("model crashed")
+            return "Answer"
+
+        with patch.object(rag, "chat", side_effect=chat) as chat_mock:
+            results = sorted(rag.answer_many(["a", "bb", "ccc"], collection, k=1, concurrency=2),
+                             key=lambda result: result["index"])
+
+        self.assertEqual(chat_mock.call_count, 2)
+        self.assertEqual(results[0]["answer"], "Answer")
+        self.assertEqual(results[0]["sources"], [{"source": "x.txt", "chunk": 0, "text": "X."}])
+        self.assertEqual(results[1], {"index": 1, "question": "bb", "answer": rag.NO_ANSWER, "sources": []})
+        self.assertEqual(results[2], {"index": 2, "question": "ccc", "error": "model crashed"})
+
+    def test_retrieval_failure_fails_every_question(self, embed):
+        """Test that a failed batch retrieval is reported per question."""
+        embed.side_effect = RuntimeError("Ollama is down")
+
+        results = list(rag.answer_many(["a", "b"], _collection(), k=1))
+
+        self.assertEqual([result["error"] for result in results], ["Ollama is down"] * 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tests for micro-batching of concurrent calls."""
+import asyncio
+import unittest
+
+from src.batching import MicroBatcher
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    async def _double(self, items):
+        self.calls.append(list(items))
+        await asyncio.sleep(0)
+        return [item * 2 for item in items]
+
+    def test_concurrent_items_share_a_call(self):
+        """Test that items submitted together are processed in one call, in order."""
+        async def main():
+            batcher = MicroBatcher(self._double, max_batch=10, max_wait=0.01)
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+            return results, batcher.stats()
+
+        results, stats = asyncio.run(main())
+
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+        self.assertEqual(self.calls, [[0, 1, 2, 3, 4]])
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["mean_batch_size"], 5)
+        self.assertEqual(stats["batch_sizes"], {"<=8": 1})
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_full_batch_is_sent_without_waiting(self):
+        """Test that the size cap splits a burst and does not wait out the timer."""
+        async def main():
+            batcher = MicroBatcher(self._double, max_batch=2, max_wait=60)
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), 5)
+
+        self.assertEqual(asyncio.run(main()), [0, 2, 4, 6])
+        self.assertEqual(self.calls, [[0, 1], [2, 3]])
+
+    def test_failure_reaches_every_caller(self):
+        """Test that a failed batch raises in each waiting caller."""
+        async def fail(items):
+            raise RuntimeError("Ollama is down")
+
+        async def main():
+            batcher = MicroBatcher(fail, max_batch=10, max_wait=0)
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+        errors = asyncio.run(main())
+
+        self.assertEqual([str(error) for error in errors], ["Ollama is down"] * 3)
+
+    def test_abandoned_items_are_not_processed(self):
+        """Test that a caller that timed out is left out of its batch."""
+        async def main():
+            batcher = MicroBatcher(self._double, max_batch=10, max_wait=0.05)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(batcher.submit(1), 0.001)
+            return await batcher.submit(2)
+
+        self.assertEqual(asyncio.run(main()), 4)
+        self.assertEqual(self.calls, [[2]])
+
+if __name__ == '__main__':
+    unittest.main()
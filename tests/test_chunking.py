@@ -1,6 +1,51 @@
 """Tests for the chunking module."""
+import os
+import random
+import tempfile
 import unittest
-from src.chunking import split_into_chunks
+from unittest.mock import patch
+
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+from src import chunking
+from src.chunking import split_into_chunks, iter_chunks, iter_token_chunks, _fallback_chunk
+from src.tokenizer import RegexTokenCounter, get_token_counter
+
+SAMPLE = (
+    "Dr. Smith reviewed the case on Jan. 5. The patient, aged 64, presented with fever "
+    "(38.9 C) and chills. \"Start antibiotics now,\" he said. Was neutropenia confirmed? "
+    "Yes! ANC was 0.4 x 10^9/L, i.e. severe. See e.g. section 4.2 of the guideline. "
+    "Cultures were drawn.\n\nFollow-up in 48 hours...   Then reassess.   "
+)
+
+def _reference_chunks(text, max_chars, overlap, tokenizer):
+    """The original string-concatenating chunker, for comparison."""
+    chunks = []
+    current_chunk = ""
+    for sentence in tokenizer.tokenize(text):
+        if len(current_chunk) + len(sentence) > max_chars and current_chunk:
+            chunks.append(current_chunk.strip())
+            if overlap > 0:
+                current_chunk = current_chunk[-overlap:] + " " + sentence
+            else:
+                current_chunk = sentence
+        else:
+            if current_chunk:
+                current_chunk += " " + sentence
+            else:
+                current_chunk = sentence
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    return chunks
+
+def _pieces(text, rng, max_size):
+    """Split text at random points, including mid-word and mid-sentence."""
+    pieces, start = [], 0
+    while start < len(text):
+        size = rng.randint(1, max_size)
+        pieces.append(text[start:start + size])
+        start += size
+    return pieces
 
 class TestChunking(unittest.TestCase):
     
@@ -31,5 +76,139 @@ class TestChunking(unittest.TestCase):
         self.assertTrue(len(chunks) >= 9)  # Should create multiple chunks
         self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
 
+class TestStreamingChunker(unittest.TestCase):
+
+    def setUp(self):
+        # Untrained punkt needs no downloaded data but behaves like sent_tokenize
+        self.tokenizer = PunktSentenceTokenizer()
+        patcher = patch.object(chunking, "_get_sentence_tokenizer", return_value=self.tokenizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_original_chunker(self):
+        """Test identical output to the original chunker for any piece boundaries."""
+        rng = random.Random(7)
+        text = SAMPLE * 40
+
+        for max_chars, overlap in ((1100, 200), (120, 30), (60, 0), (40, 100)):
+            expected = _reference_chunks(text, max_chars, overlap, self.tokenizer)
+            self.assertEqual(split_into_chunks(text, max_chars, overlap), expected)
+            for max_size in (1, 17, 500):
+                pieces = _pieces(text, rng, max_size)
+                self.assertEqual(list(iter_chunks(pieces, max_chars, overlap)), expected)
+
+        # Long enough for consumed text to be trimmed from the buffer
+        text = SAMPLE * 400
+        expected = _reference_chunks(text, 1100, 200, self.tokenizer)
+        self.assertEqual(list(iter_chunks(_pieces(text, rng, 4000), 1100, 200)), expected)
+
+        # A sentence far longer than any piece
+        text = SAMPLE * 5 + "word " * 5000 + SAMPLE * 5 + "x" * 20000 + " " + SAMPLE
+        expected = _reference_chunks(text, 1100, 200, self.tokenizer)
+        self.assertEqual(split_into_chunks(text, 1100, 200), expected)
+        for max_size in (1, 17, 500):
+            pieces = _pieces(text, rng, max_size)
+            self.assertEqual(list(iter_chunks(pieces, 1100, 200)), expected)
+
+    def test_yields_before_input_is_exhausted(self):
+        """Test that chunks are produced while later pieces are still unread."""
+        consumed = []
+
+        def pages():
+            for i in range(50):
+                consumed.append(i)
+                yield SAMPLE
+
+        first = next(iter_chunks(pages(), max_chars=200, overlap=20))
+
+        self.assertTrue(first)
+        self.assertLess(len(consumed), 5)
+
+    def test_fallback_matches_slicing(self):
+        """Test streaming fallback slicing against _fallback_chunk."""
+        rng = random.Random(3)
+        text = ("word " * 700) + "   " + ("x" * 333)
+
+        with patch.object(chunking, "_get_sentence_tokenizer", side_effect=LookupError):
+            for max_chars, overlap in ((100, 10), (250, 0), (64, 63)):
+                expected = _fallback_chunk(text, max_chars, overlap)
+                pieces = _pieces(text, rng, 90)
+                self.assertEqual(list(iter_chunks(pieces, max_chars, overlap)), expected)
+
+    def test_unpunctuated_text_is_linear(self):
+        """Test that text without sentence breaks is not tokenized again for every piece."""
+        text = SAMPLE * 3 + "word " * 100_000 + SAMPLE * 3
+        tokenized = []
+        span_tokenize = self.tokenizer.span_tokenize
+
+        def counting(text):
+            tokenized.append(len(text))
+            return span_tokenize(text)
+
+        expected = _reference_chunks(text, 1100, 200, self.tokenizer)
+        with patch.object(self.tokenizer, "span_tokenize", side_effect=counting):
+            chunks = list(iter_chunks(_pieces(text, random.Random(5), 2000), 1100, 200))
+
+        self.assertEqual(chunks, expected)
+        self.assertLess(sum(tokenized), 3 * len(text))
+
+class TestTokenChunker(unittest.TestCase):
+
+    def setUp(self):
+        self.tokenizer = PunktSentenceTokenizer()
+        patcher = patch.object(chunking, "_get_sentence_tokenizer", return_value=self.tokenizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.counter = RegexTokenCounter()
+
+    def test_chunks_fit_budget_and_overlap(self):
+        """Test that chunks stay within max_tokens and repeat trailing sentences."""
+        text = SAMPLE * 20
+        chunks = list(iter_token_chunks(_pieces(text, random.Random(1), 300), 60, 15, self.counter))
+
+        self.assertGreater(len(chunks), 5)
+        for chunk in chunks:
+            self.assertLessEqual(self.counter.count(chunk), 60)
+        self.assertEqual(list(iter_token_chunks([text], 60, 15, self.counter)), chunks)
+
+        # Five-token sentences: 20 tokens per chunk, the last two sentences repeated
+        text = " ".join(f"Item {i} is here." for i in range(10))
+        chunks = list(iter_token_chunks([text], 20, 10, self.counter))
+        self.assertEqual(chunks[0], "Item 0 is here. Item 1 is here. Item 2 is here. Item 3 is here.")
+        self.assertTrue(chunks[1].startswith("Item 2 is here. Item 3 is here. Item 4"))
+        self.assertTrue(chunks[-1].endswith("Item 9 is here."))
+
+    def test_long_sentence_split_between_words(self):
+        """Test that a sentence over budget is split at word boundaries."""
+        sentence = " ".join(f"word{i}" for i in range(100)) + "."
+        chunks = list(iter_token_chunks([sentence], 30, 0, self.counter))
+
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(" ".join(chunks), sentence)
+
+    def test_approximate_counts(self):
+        """Test the vocabulary-free WordPiece approximation."""
+        self.assertEqual(self.counter.count("The patient, aged 64."), 6)
+        self.assertEqual(self.counter.count("immunocompromised"), 5)
+        self.assertEqual(self.counter.count(""), 0)
+
+    def test_tokenizer_file(self):
+        """Test exact counts from a tokenizer.json and the approximate fallback."""
+        from tokenizers import Tokenizer
+        from tokenizers.models import WordLevel
+        from tokenizers.pre_tokenizers import Whitespace
+
+        tokenizer = Tokenizer(WordLevel({"[UNK]": 0, "fever": 1}, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = Whitespace()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "tokenizer.json")
+            tokenizer.save(path)
+
+            counter = get_token_counter(path)
+
+        self.assertEqual(counter.name, "tokenizers")
+        self.assertEqual(counter.count("fever and chills!"), 4)
+        self.assertEqual(get_token_counter(os.path.join(temp_dir, "missing.json")).name, "approximate")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for the persistent embedding cache."""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import embeddings
+from src.embed_cache import EmbeddingCache
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite3")
+        self.cache = EmbeddingCache(self.path, max_bytes=1024 * 1024)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip_and_counters(self):
+        """Test that stored vectors come back and hits/misses are counted."""
+        self.cache.put_many("m", ["alpha", "beta"], [[1.0, 2.0], [0.5, -0.5]])
+
+        result = self.cache.get_many("m", ["alpha", "gamma", "beta"])
+
+        self.assertEqual(result, [[1.0, 2.0], None, [0.5, -0.5]])
+        self.assertEqual(self.cache.stats()["hits"], 2)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_keyed_by_model(self):
+        """Test that the same text under another model is a miss."""
+        self.cache.put_many("m1", ["alpha"], [[1.0]])
+
+        self.assertEqual(self.cache.get_many("m2", ["alpha"]), [None])
+
+    def test_persists_across_instances(self):
+        """Test that vectors survive reopening the cache file."""
+        self.cache.put_many("m", ["alpha"], [[0.25]])
+        self.cache.close()
+
+        self.cache = EmbeddingCache(self.path, max_bytes=1024 * 1024)
+
+        self.assertEqual(self.cache.get_many("m", ["alpha"]), [[0.25]])
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+    def test_lru_eviction(self):
+        """Test that least recently used vectors are evicted first."""
+        # Each 4-dim float32 vector is 16 bytes; allow room for 10
+        self.cache.max_bytes = 160
+        texts = [f"text {i}" for i in range(10)]
+        clock = iter(range(100))
+
+        with patch("src.embed_cache.time.time", side_effect=lambda: next(clock)):
+            for i, text in enumerate(texts):
+                self.cache.put_many("m", [text], [[float(i)] * 4])
+            self.cache.get_many("m", texts[:1])  # touch the oldest entry
+            self.cache.put_many("m", ["new"], [[9.0] * 4])
+
+        self.assertLessEqual(self.cache.stats()["size_mb"] * 1024 * 1024, 160)
+        self.assertIsNotNone(self.cache.get_many("m", texts[:1])[0])
+        self.assertIsNone(self.cache.get_many("m", texts[1:2])[0])
+
+    def test_embed_texts_only_fetches_misses(self):
+        """Test that embed_texts sends only uncached, distinct texts to Ollama."""
+        self.cache.put_many(embeddings.EMBED_MODEL, ["cached"], [[1.0]])
+        fetched = []
+
+        def fetch(texts, batch_size, concurrency):
+            fetched.append(list(texts))
+            return [[2.0] for _ in texts]
+
+        with patch.object(embeddings, "get_embedding_cache", return_value=self.cache), \
+                patch.object(embeddings, "_fetch_embeddings", side_effect=fetch):
+            vectors = embeddings.embed_texts(["cached", "fresh", "fresh"])
+            again = embeddings.embed_texts(["fresh"])
+
+        self.assertEqual(vectors, [[1.0], [2.0], [2.0]])
+        self.assertEqual(again, [[2.0]])
+        self.assertEqual(fetched, [["fresh"]])
+
+if __name__ == '__main__':
+    unittest.main()
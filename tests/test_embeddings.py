@@ -0,0 +1,69 @@
+"""Tests for the embeddings module."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src import embeddings
+from src.ollama_client import OllamaClient
+
+def _response(status=200, payload=None):
+    response = MagicMock()
+    response.status_code = status
+    if payload is None:
+        response.json.side_effect = ValueError("not JSON")
+    else:
+        response.json.return_value = payload
+    if status >= 400:
+        response.raise_for_status.side_effect = embeddings.requests.HTTPError(str(status))
+    return response
+
+class TestEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        embeddings._legacy_endpoint = False
+        self.addCleanup(setattr, embeddings, "_legacy_endpoint", False)
+        self.session = MagicMock()
+        no_cache = patch.object(embeddings, "get_embedding_cache", return_value=None)
+        no_cache.start()
+        self.addCleanup(no_cache.stop)
+        client = OllamaClient(base_url="http://ollama", retries=0, session=self.session)
+        patcher = patch.object(embeddings, "get_ollama_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batches_preserve_input_order(self):
+        """Test that concurrent batches are reassembled in input order."""
+        def post(url, json, timeout, stream):
+            return _response(payload={"embeddings": [[float(t)] for t in json["input"]]})
+
+        self.session.post.side_effect = post
+        texts = [str(i) for i in range(10)]
+
+        vectors = embeddings.embed_texts(texts, batch_size=3, concurrency=4)
+
+        self.assertEqual(vectors, [[float(i)] for i in range(10)])
+        self.assertEqual(self.session.post.call_count, 4)
+
+    def test_fallback_to_legacy_endpoint(self):
+        """Test per-text fallback when /api/embed does not exist."""
+        def post(url, json, timeout, stream):
+            if url.endswith("/api/embed"):
+                return _response(404)
+            return _response(payload={"embedding": [3.0, 4.0]})
+
+        self.session.post.side_effect = post
+
+        vectors = embeddings.embed_texts(["a", "b"], batch_size=2)
+
+        self.assertEqual(vectors, [[0.6, 0.8], [0.6, 0.8]])
+        self.assertTrue(embeddings._legacy_endpoint)
+
+    def test_model_not_found_is_an_error(self):
+        """Test that a JSON 404 is not mistaken for an old server."""
+        self.session.post.return_value = _response(404, {"error": "model not found"})
+
+        with self.assertRaises(RuntimeError):
+            embeddings.embed_texts(["a"])
+        self.assertFalse(embeddings._legacy_endpoint)
+
+if __name__ == '__main__':
+    unittest.main()
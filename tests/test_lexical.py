@@ -0,0 +1,119 @@
+"""Tests for the BM25 lexical index and hybrid retrieval."""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import store
+from src.lexical import LexicalIndex, tokenize
+from src.store import (
+    get_client, get_or_create_collection, add_texts, delete_file,
+    fuse_results, lexical_index_of, rebuild_lexical_index, search
+)
+
+DOCS = {
+    "a": "Error ERR-4012 means the license server rejected the token.",
+    "b": "The license server is configured in settings.yaml.",
+    "c": "Part 7781-B ships with firmware v2.3.1 and a spare fuse."
+}
+
+def _meta(chunk_id):
+    return {"source": f"{chunk_id}.txt", "chunk": 1, "file_path": f"/docs/{chunk_id}.txt"}
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index = LexicalIndex(os.path.join(self.temp_dir.name, "lexical.sqlite3"))
+        self.index.add(list(DOCS), list(DOCS.values()), [_meta(i) for i in DOCS])
+
+    def tearDown(self):
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def test_tokenize_keeps_identifiers_whole(self):
+        """Test that compound identifiers are indexed whole and as parts."""
+        self.assertEqual(tokenize("See ERR-4012"), ["see", "err-4012", "err", "4012"])
+
+    def test_exact_identifier_ranks_first(self):
+        """Test that a rare identifier outranks common words."""
+        hits = self.index.search("what does err-4012 mean for the license server", k=3)
+
+        self.assertEqual(hits[0][0], "a")
+        self.assertEqual(self.index.search("7781-B", k=3)[0][0], "c")
+        self.assertEqual(self.index.search("nonexistent", k=3), [])
+
+    def test_readd_replaces_and_delete_removes(self):
+        """Test that re-adding an ID replaces it and deleting a file drops its chunks."""
+        self.index.add(["a"], ["Nothing to see here."], [_meta("a")])
+        self.assertEqual(self.index.count(), 3)
+        self.assertNotIn("a", [chunk_id for chunk_id, _ in self.index.search("ERR-4012")])
+
+        self.index.delete_file("/docs/c.txt")
+        self.assertEqual(self.index.count(), 2)
+        self.assertEqual(self.index.search("firmware"), [])
+
+    def test_fuse_results(self):
+        """Test reciprocal rank fusion favours chunks ranked by both retrievers."""
+        dense = (["x", "y", "z"], [("X", {}), ("Y", {}), ("Z", {})])
+        lexical = (["z", "w"], [("Z", {}), ("W", {})])
+
+        ids, contexts = fuse_results([dense, lexical], k=2)
+
+        self.assertEqual(ids, ["z", "x"])
+        self.assertEqual(contexts, [("Z", {}), ("X", {})])
+
+class TestHybridSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        client = get_client(os.path.join(self.temp_dir.name, "store"))
+        self.collection = get_or_create_collection(client, "test_lexical")
+        # Dense vectors that know nothing about identifiers: all equally close
+        add_texts(
+            self.collection,
+            list(DOCS),
+            list(DOCS.values()),
+            [_meta(i) for i in DOCS],
+            [[1.0, 0.0]] * len(DOCS)
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_store_writes_update_index(self):
+        """Test that add_texts and delete_file keep the index in sync."""
+        self.assertEqual(lexical_index_of(self.collection).count(), 3)
+
+        delete_file(self.collection, "/docs/a.txt")
+
+        self.assertEqual(lexical_index_of(self.collection).count(), 2)
+
+    @patch.object(store, "embed_texts", return_value=[[1.0, 0.0]])
+    def test_hybrid_finds_identifier(self, _embed):
+        """Test that hybrid retrieval surfaces the chunk with the exact identifier."""
+        ids, contexts = search(self.collection, "ERR-4012", k=1, mode="hybrid")
+
+        self.assertEqual(ids, ["a"])
+        text, metadata = contexts[0]
+        self.assertEqual(text, DOCS["a"])
+        self.assertGreater(metadata.pop("bm25"), 0)
+        metadata.pop("score", None)
+        self.assertEqual(metadata, _meta("a"))
+
+    @patch.object(store, "embed_texts", side_effect=RuntimeError("Ollama is down"))
+    def test_falls_back_to_lexical_when_embedding_fails(self, _embed):
+        """Test that hybrid retrieval still answers from BM25 without embeddings."""
+        ids, _ = search(self.collection, "firmware v2.3.1", k=2, mode="hybrid")
+
+        self.assertEqual(ids, ["c"])
+
+    def test_rebuild_from_collection(self):
+        """Test that the index can be rebuilt from documents stored in Chroma."""
+        lexical_index_of(self.collection).clear()
+
+        self.assertEqual(rebuild_lexical_index(self.collection, batch_size=2), 3)
+        self.assertEqual(search(self.collection, "settings.yaml", k=1, mode="lexical")[0], ["b"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Tests for incremental ingestion and the ingest manifest."""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.manifest import Manifest
+from src.pipeline import run_pipeline
+from src.store import get_client, get_or_create_collection
+
+def _fake_embed(texts):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+class TestIncrementalIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.temp_dir.name, "docs")
+        os.makedirs(self.docs)
+        client = get_client(os.path.join(self.temp_dir.name, "store"))
+        self.collection = get_or_create_collection(client, "test_incremental")
+        self.manifest_path = os.path.join(self.temp_dir.name, "store", "manifest.json")
+        patcher = patch("src.pipeline.embed_with_retry", side_effect=_fake_embed)
+        self.embed = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.docs, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def _sync(self, incremental=True):
+        files = sorted(
+            os.path.join(self.docs, name) for name in os.listdir(self.docs)
+        )
+        return run_pipeline(files, self.collection, Manifest(self.manifest_path),
+                            self.docs, incremental=incremental)
+
+    def test_rerun_does_not_duplicate(self):
+        """Test that a full re-ingest produces the same chunk IDs."""
+        self._write("a.txt", "Alpha document. It has two sentences.")
+
+        self._sync(incremental=False)
+        first_ids = set(self.collection.get()["ids"])
+        self._sync(incremental=False)
+
+        self.assertEqual(set(self.collection.get()["ids"]), first_ids)
+
+    def test_unchanged_files_are_skipped(self):
+        """Test that an incremental run skips files recorded in the manifest."""
+        self._write("a.txt", "Alpha document.")
+        self._write("b.txt", "Beta document.")
+        self._sync()
+        self.embed.reset_mock()
+
+        stats = self._sync()
+
+        self.assertEqual(stats["unchanged"], 2)
+        self.embed.assert_not_called()
+
+    def test_modified_and_deleted_files(self):
+        """Test that stale chunks of modified and deleted files are removed."""
+        path_a = self._write("a.txt", "Alpha document.")
+        path_b = self._write("b.txt", "Beta document.")
+        self._sync()
+
+        self._write("a.txt", "Alpha document, revised and longer.")
+        os.remove(path_b)
+        stats = self._sync()
+
+        self.assertEqual(stats["ingested"], 1)
+        self.assertEqual(stats["removed"], 1)
+        stored = self.collection.get()
+        self.assertEqual(stored["documents"], ["Alpha document, revised and longer."])
+        self.assertEqual({m["file_path"] for m in stored["metadatas"]}, {path_a})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for latency histograms and their Prometheus rendering."""
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src import llm, metrics
+from src.metrics import Counter, Histogram
+
+class TestHistogram(unittest.TestCase):
+
+    def test_render_is_cumulative(self):
+        """Test that buckets are reported cumulatively with count and sum."""
+        histogram = Histogram("test_render_seconds", "Test.", labelnames=("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, stage="embed")
+
+        lines = histogram.render()
+
+        self.assertIn("# TYPE test_render_seconds histogram", lines)
+        self.assertIn('test_render_seconds_bucket{stage="embed",le="0.1"} 1', lines)
+        self.assertIn('test_render_seconds_bucket{stage="embed",le="1"} 3', lines)
+        self.assertIn('test_render_seconds_bucket{stage="embed",le="+Inf"} 4', lines)
+        self.assertIn('test_render_seconds_count{stage="embed"} 4', lines)
+        self.assertIn('test_render_seconds_sum{stage="embed"} 4.05', lines)
+
+    def test_timer_decorates_functions(self):
+        """Test that time() measures each call of a decorated function."""
+        histogram = Histogram("test_timer_seconds", "Test.")
+
+        @histogram.time()
+        def work(x):
+            return x * 2
+
+        self.assertEqual(work(2), 4)
+        self.assertEqual(work(3), 6)
+        self.assertEqual(histogram.count(), 2)
+
+    def test_labels_are_checked(self):
+        """Test that observing with the wrong labels is an error."""
+        counter = Counter("test_labels_total", "Test.", labelnames=("stage",))
+
+        with self.assertRaises(ValueError):
+            counter.inc(route="x")
+
+class TestGenerationMetrics(unittest.TestCase):
+
+    def test_chat_stream_records_ttft_and_speed(self):
+        """Test that a streamed answer records time to first token and Ollama's eval speed."""
+        lines = [json.dumps({"message": {"content": "Hi"}, "done": False}).encode(),
+                 json.dumps({"message": {"content": ""}, "done": True,
+                             "eval_count": 40, "eval_duration": 2_000_000_000}).encode()]
+        response = MagicMock()
+        response.iter_lines.return_value = iter(lines)
+        response.__enter__.return_value = response
+        client = MagicMock()
+        client.post.return_value = response
+
+        ttft = metrics.TIME_TO_FIRST_TOKEN.count()
+        speed = metrics.TOKENS_PER_SECOND.sum()
+        tokens = metrics.GENERATED_TOKENS.value()
+
+        with patch.object(llm, "get_ollama_client", return_value=client):
+            self.assertEqual(llm.chat([]), "Hi")
+
+        self.assertEqual(metrics.TIME_TO_FIRST_TOKEN.count(), ttft + 1)
+        self.assertAlmostEqual(metrics.TOKENS_PER_SECOND.sum() - speed, 20.0)
+        self.assertEqual(metrics.GENERATED_TOKENS.value() - tokens, 40)
+        self.assertIn("rag_llm_tokens_per_second_bucket", metrics.render())
+
+if __name__ == '__main__':
+    unittest.main()
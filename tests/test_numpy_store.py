@@ -0,0 +1,119 @@
+"""Tests for the in-process NumPy vector store backend."""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src import numpy_store
+from src.numpy_store import NumpyCollection
+from src.store import get_client, get_or_create_collection, add_texts, delete_file, query_with_ids
+
+def _records(n, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    ids = [f"c{i}" for i in range(n)]
+    documents = [f"chunk {i}" for i in range(n)]
+    metadatas = [{"source": f"f{i % 3}.txt", "file_path": f"/docs/f{i % 3}.txt"} for i in range(n)]
+    return ids, documents, metadatas, vectors
+
+def _exact(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"c{i}" for i in np.argsort(-(normed @ (query / np.linalg.norm(query))))[:k]]
+
+class TestNumpyCollection(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, "numpy_test")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _open(self, **options):
+        return NumpyCollection("test", self.directory, **options)
+
+    def test_query_matches_exact_search(self):
+        """Test that flat search returns the exact cosine top-k, best first."""
+        collection = self._open()
+        ids, documents, metadatas, vectors = _records(300)
+        collection.upsert(ids, documents, metadatas, vectors.tolist())
+
+        results = collection.query(query_embeddings=[vectors[7].tolist()], n_results=5)
+
+        self.assertEqual(results["ids"][0], _exact(vectors, vectors[7], 5))
+        self.assertEqual(results["ids"][0][0], "c7")
+        self.assertEqual(results["documents"][0][0], "chunk 7")
+        self.assertAlmostEqual(results["distances"][0][0], 0.0, places=5)
+
+    def test_upsert_replaces_and_delete_compacts(self):
+        """Test that re-used IDs are replaced and deletes keep the rest searchable."""
+        collection = self._open()
+        ids, documents, metadatas, vectors = _records(30)
+        collection.upsert(ids, documents, metadatas, vectors.tolist())
+        collection.upsert(["c0"], ["replaced"], [metadatas[0]], [vectors[0].tolist()])
+        self.assertEqual(collection.count(), 30)
+
+        collection.delete(where={"file_path": "/docs/f1.txt"})
+
+        self.assertEqual(collection.count(), 20)
+        for i in (0, 2, 29):
+            hit = collection.query(query_embeddings=[vectors[i].tolist()], n_results=1)
+            self.assertEqual(hit["ids"][0], [f"c{i}"])
+        self.assertEqual(collection.get(ids=["c0"])["documents"], ["replaced"])
+        self.assertEqual(collection.get(where={"file_path": "/docs/f1.txt"})["ids"], [])
+
+    def test_reopen_and_paged_get(self):
+        """Test that a fresh instance sees persisted rows, in float16 precision."""
+        collection = self._open(dtype="float16")
+        ids, documents, metadatas, vectors = _records(50)
+        collection.upsert(ids, documents, metadatas, vectors.tolist())
+        collection.close()
+
+        reopened = self._open()
+
+        self.assertEqual(reopened.dtype, np.float16)
+        self.assertEqual(reopened.count(), 50)
+        page = reopened.get(limit=20, offset=40)
+        self.assertEqual(page["ids"], ids[40:])
+        hit = reopened.query(query_embeddings=[vectors[42].tolist()], n_results=1)
+        self.assertEqual(hit["ids"][0], ["c42"])
+
+    @patch.object(numpy_store, "IVF_MIN_ROWS", 500)
+    def test_ivf_recall(self):
+        """Test that IVF search on clustered data recovers most exact neighbours."""
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(20, 16))
+        vectors = (centers[rng.integers(0, 20, 2000)] + 0.3 * rng.normal(size=(2000, 16))).astype(np.float32)
+        ids = [f"c{i}" for i in range(2000)]
+        collection = self._open(index="ivf", nprobe=4)
+        collection.upsert(ids, ids, [{}] * 2000, vectors.tolist())
+        self.assertIsNotNone(collection._centroids)
+
+        found = 0
+        for i in range(0, 2000, 100):
+            hits = collection.query(query_embeddings=[vectors[i].tolist()], n_results=10)["ids"][0]
+            found += len(set(hits) & set(_exact(vectors, vectors[i], 10)))
+
+        self.assertGreater(found / 200, 0.9)
+
+class TestNumpyBackend(unittest.TestCase):
+
+    def test_store_api(self):
+        """Test add_texts, delete_file and query_with_ids on the NumPy backend."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            collection = get_or_create_collection(get_client(temp_dir, backend="numpy"), "test_backend")
+            ids, documents, metadatas, vectors = _records(12)
+            add_texts(collection, ids, documents, metadatas, vectors.tolist())
+
+            delete_file(collection, "/docs/f0.txt")
+            chunk_ids, contexts = query_with_ids(collection, vectors[1].tolist(), k=3)
+
+            self.assertEqual(collection.count(), 8)
+            self.assertEqual(chunk_ids[0], "c1")
+            self.assertEqual(contexts[0], ("chunk 1", {**metadatas[1], "score": 1.0}))
+            self.assertLess(contexts[1][1]["score"], 1.0)
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, "collection_version")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests for the shared Ollama client."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from src import ollama_client
+from src.ollama_client import CircuitBreaker, CircuitOpenError, OllamaClient
+
+def _response(status):
+    response = MagicMock()
+    response.status_code = status
+    return response
+
+class TestOllamaClient(unittest.TestCase):
+
+    def setUp(self):
+        self.session = MagicMock()
+        sleep = patch.object(ollama_client.time, "sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def _client(self, **options):
+        return OllamaClient(base_url="http://ollama/", session=self.session, **options)
+
+    def test_retries_only_the_failed_request(self):
+        """Test that transient failures are retried with jittered backoff."""
+        self.session.post.side_effect = [requests.ConnectionError("reset"), _response(503), _response(200)]
+        client = self._client(retries=3, backoff=0.5)
+
+        with patch.object(ollama_client.random, "uniform", side_effect=lambda low, high: high) as uniform:
+            response = client.post("/api/embed", json={"input": ["a"]}, timeout=60)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.post.call_count, 3)
+        self.assertEqual(self.session.post.call_args[0][0], "http://ollama/api/embed")
+        self.assertEqual([call.args for call in uniform.call_args_list], [(0, 0.5), (0, 1.0)])
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 4xx answer is returned at once."""
+        self.session.post.return_value = _response(404)
+
+        response = self._client().post("/api/embed", json={}, timeout=60)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.session.post.call_count, 1)
+
+    def test_budget_limits_retries(self):
+        """Test that no retry is attempted once its backoff would overrun the budget."""
+        self.session.post.side_effect = requests.Timeout("slow")
+        client = self._client(retries=10, backoff=5.0, backoff_max=5.0)
+
+        with patch.object(ollama_client.random, "uniform", return_value=5.0):
+            with self.assertRaises(requests.Timeout):
+                client.post("/api/embed", json={}, timeout=1.0)
+
+        self.assertEqual(self.session.post.call_count, 1)
+
+    def test_open_circuit_fails_fast(self):
+        """Test that repeated failures open the circuit and stop calling Ollama."""
+        self.session.post.side_effect = requests.ConnectionError("refused")
+        client = self._client(retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_after=30))
+
+        for _ in range(3):
+            with self.assertRaises(requests.ConnectionError):
+                client.post("/api/chat", json={}, timeout=5)
+        with self.assertRaises(CircuitOpenError):
+            client.post("/api/chat", json={}, timeout=5)
+
+        self.assertEqual(self.session.post.call_count, 3)
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_half_open_trial(self):
+        """Test that one trial call is allowed after the reset period."""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_after=10, clock=lambda: now[0])
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 10.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # only one trial at a time
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+        now[0] = 20.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+
+if __name__ == '__main__':
+    unittest.main()
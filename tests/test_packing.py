@@ -0,0 +1,109 @@
+"""Tests for context packing."""
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import rag
+from src.packing import pack_contexts
+from src.store import add_texts, get_client, get_or_create_collection, query_with_ids
+from src.prompt import build_user_prompt
+
+class WordCounter:
+    def count(self, text):
+        return len(text.split())
+
+def _meta(chunk, score=None, source="a.txt", **extra):
+    metadata = {"source": source, "file_path": f"/docs/{source}", "chunk": chunk, **extra}
+    if score is not None:
+        metadata["score"] = score
+    return metadata
+
+class TestPackContexts(unittest.TestCase):
+
+    def test_drops_low_scores(self):
+        """Test that chunks under the threshold go, and BM25-only chunks stay."""
+        contexts = [
+            ("relevant", _meta(1, 0.8)),
+            ("unrelated", _meta(5, 0.1)),
+            ("keyword match", {"source": "b.txt", "chunk": 2, "bm25": 3.2})
+        ]
+
+        packed = pack_contexts(contexts, token_budget=0, min_score=0.3)
+
+        self.assertEqual([text for text, _ in packed], ["relevant", "keyword match"])
+        self.assertEqual(pack_contexts(contexts[1:2], token_budget=0, min_score=0.3), [])
+
+    def test_merges_neighbours_without_overlap(self):
+        """Test that consecutive chunks of a file become one passage without repeated text."""
+        shared = "the shared overlap sentence."
+        first = "Intro sentence. " + shared
+        second = shared + " Closing sentence."
+        contexts = [
+            ("other file", _meta(1, 0.9, source="b.txt")),
+            (second, _meta(4, 0.7)),
+            (first, _meta(3, 0.6)),
+            (first, _meta(3, 0.6))
+        ]
+
+        packed = pack_contexts(contexts, token_budget=0, min_score=0)
+
+        self.assertEqual(len(packed), 2)
+        text, metadata = packed[1]
+        self.assertEqual(text, "Intro sentence. the shared overlap sentence. Closing sentence.")
+        self.assertEqual((metadata["chunk"], metadata["last_chunk"], metadata["score"]), (3, 4, 0.7))
+        self.assertIn("(chunks 3-4)", build_user_prompt("q", packed))
+
+    def test_keeps_distant_chunks_and_pages_apart(self):
+        """Test that chunks are only merged when consecutive and on the same page."""
+        contexts = [
+            ("one", _meta(1)),
+            ("three", _meta(3)),
+            ("four", _meta(4, page=2)),
+            ("five", _meta(5, page=3))
+        ]
+
+        packed = pack_contexts(contexts, token_budget=0, min_score=0)
+
+        self.assertEqual([text for text, _ in packed], ["one", "three", "four", "five"])
+
+    def test_token_budget(self):
+        """Test that passages are kept best first within the budget."""
+        contexts = [
+            ("one two three four", _meta(1, source="a.txt")),
+            ("one two three four five six", _meta(1, source="b.txt")),
+            ("one two", _meta(1, source="c.txt"))
+        ]
+
+        packed = pack_contexts(contexts, token_budget=7, min_score=0, counter=WordCounter())
+        self.assertEqual([m["source"] for _, m in packed], ["a.txt", "c.txt"])
+
+        packed = pack_contexts(contexts[1:], token_budget=3, min_score=0, counter=WordCounter())
+        self.assertEqual(packed[0][0], "one two")
+
+    def test_skips_llm_when_nothing_clears_threshold(self):
+        """Test that retrieve_and_answer does not call the LLM for unrelated chunks."""
+        with patch("src.store.query", return_value=[("unrelated", _meta(1, 0.05))]), \
+                patch.object(rag, "pack_contexts", lambda c: pack_contexts(c, min_score=0.3)), \
+                patch.object(rag, "chat") as chat:
+            answer, sources = rag.retrieve_and_answer("Question?", collection=None)
+
+        self.assertEqual((answer, sources), (rag.NO_ANSWER, []))
+        chat.assert_not_called()
+
+    def test_scores_of_unnormalized_store(self):
+        """Test that a Chroma store of raw, non-unit vectors keeps its relevant chunks."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            collection = get_or_create_collection(get_client(temp_dir, backend="chroma"), "raw")
+            # Embedded before vectors were normalized: same directions, large norms
+            add_texts(collection, ["a", "b"], ["relevant", "unrelated"],
+                      [_meta(1), _meta(2, source="b.txt")], [[30.0, 40.0, 0.0], [0.0, 0.0, 25.0]])
+
+            _, contexts = query_with_ids(collection, [0.6, 0.8, 0.0], k=2)
+
+        self.assertEqual({text: metadata["score"] for text, metadata in contexts},
+                         {"relevant": 1.0, "unrelated": 0.0})
+        packed = pack_contexts(contexts, token_budget=0, min_score=0.3)
+        self.assertEqual([text for text, _ in packed], ["relevant"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Tests for page-parallel PDF extraction and the PDF text cache."""
+import itertools
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from src import chunking, pdf, rag
+from src.pdf import PdfTextCache, iter_pdf_pages
+
+def _write_pdf(path, page_texts):
+    """Write a PDF with one line of Helvetica text per page."""
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")
+    })
+    for text in page_texts:
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+class TestPdfExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "guide.pdf")
+        self.texts = [f"Page {i} covers topic number {i}." for i in range(1, 12)]
+        _write_pdf(self.path, self.texts)
+
+        self.cache = PdfTextCache(os.path.join(self.temp_dir.name, "pdf.sqlite3"), 1 << 20)
+        patcher = patch.object(pdf, "get_pdf_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    @patch.object(pdf, "PAGES_PER_TASK", 2)
+    def test_parallel_extraction_keeps_page_order(self):
+        """Test that page ranges extracted by a pool come back in page order."""
+        pages = list(iter_pdf_pages(self.path, workers=3))
+
+        self.assertEqual([page.strip() for page in pages], self.texts)
+        self.assertEqual(self.cache.stats()["documents"], 1)
+
+    def test_cached_text_skips_parsing(self):
+        """Test that a second read is served from the cache without pypdf."""
+        first = list(iter_pdf_pages(self.path, workers=1))
+
+        with patch.object(pdf, "_extract_ranges", side_effect=AssertionError("parsed again")):
+            second = list(iter_pdf_pages(self.path, workers=1))
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_incomplete_extraction_is_not_served(self):
+        """Test that a document abandoned part-way is extracted again."""
+        pages = iter_pdf_pages(self.path, workers=1)
+        next(pages)
+        pages.close()
+
+        self.assertIsNone(self.cache.page_count(pdf.file_sha256(self.path)))
+
+    def test_abandoned_pages_are_evicted(self):
+        """Test that pages of extractions that never completed count against the budget."""
+        cache = PdfTextCache(os.path.join(self.temp_dir.name, "small.sqlite3"), 1000)
+        self.addCleanup(cache.close)
+        for i in range(10):
+            cache.put_pages(f"abandoned{i}", 0, ["x" * 100, "y" * 100])
+        cache.put_pages("done", 0, ["z" * 100])
+        cache.complete("done", 1)
+
+        stored = cache._conn.execute("SELECT COALESCE(SUM(LENGTH(text)), 0) FROM pages").fetchone()[0]
+        self.assertLessEqual(stored, 1000)
+        self.assertLessEqual(cache.stats()["size_mb"] * 1024 * 1024, 1000)
+        self.assertEqual(cache.page_count("done"), 1)
+
+    def test_document_with_evicted_pages_is_not_served(self):
+        """Test that a document whose early pages were evicted mid-extraction is not marked complete."""
+        cache = PdfTextCache(os.path.join(self.temp_dir.name, "small.sqlite3"), 1000)
+        self.addCleanup(cache.close)
+        with patch.object(pdf.time, "time", side_effect=itertools.count()):
+            cache.put_pages("slow", 0, ["a" * 400])
+            cache.put_pages("other", 0, ["b" * 700])
+            cache.put_pages("slow", 1, ["c" * 100])
+            cache.complete("slow", 2)
+
+        self.assertIsNone(cache.page_count("slow"))
+
+    @patch.object(chunking, "_get_sentence_tokenizer", return_value=PunktSentenceTokenizer())
+    def test_chunks_carry_page_numbers(self, _):
+        """Test that each chunk records the pages it was taken from."""
+        chunks, extras = rag.load_document(self.path, max_chars=70, overlap=0, pdf_workers=1)
+
+        self.assertEqual(len(chunks), len(extras))
+        self.assertIn("Page 1 covers", chunks[0])
+        self.assertEqual(extras[0]["page"], 1)
+        for chunk, extra in zip(chunks, extras):
+            self.assertTrue(chunk.startswith(f"Page {extra['page']} "))
+            self.assertGreaterEqual(extra["page_end"], extra["page"])
+        self.assertEqual(extras[-1]["page_end"], 11)
+
+        _, metadatas = rag.build_chunk_records(rag.Path(self.path), chunks, extras)
+        self.assertEqual(metadatas[0]["page"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""Tests for the pipelined ingestion engine."""
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from src import pipeline
+from src.checkpoint import Checkpoint
+from src.manifest import Manifest
+from src.pipeline import discover_files, run_pipeline
+from src.store import get_client, get_or_create_collection
+
+def _fake_embed(chunks):
+    return [[float(len(chunk)), 1.0, 0.5] for chunk in chunks]
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.temp_dir.name, "docs")
+        os.makedirs(os.path.join(self.docs, "nested"))
+        client = get_client(os.path.join(self.temp_dir.name, "store"))
+        self.collection = get_or_create_collection(client, "test_pipeline")
+        self.manifest = Manifest(os.path.join(self.temp_dir.name, "manifest.json"))
+
+        for i in range(6):
+            folder = self.docs if i % 2 else os.path.join(self.docs, "nested")
+            with open(os.path.join(folder, f"doc{i}.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"Document {i} talks about topic {i}. " * 40)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_discover_files_deduplicates(self):
+        """Test that each file is discovered exactly once."""
+        files = discover_files(self.docs)
+
+        self.assertEqual(len(files), 6)
+        self.assertEqual(len(set(files)), 6)
+
+    def test_pipeline_with_worker_processes(self):
+        """Test that a multi-process run stores every chunk and updates the manifest."""
+        files = discover_files(self.docs)
+
+        with patch("src.pipeline.embed_with_retry", side_effect=_fake_embed):
+            stats = run_pipeline(files, self.collection, self.manifest, self.docs,
+                                 workers=2, write_batch_size=3)
+
+        self.assertEqual(stats["ingested"], 6)
+        self.assertEqual(stats["failed"], 0)
+        self.assertEqual(self.collection.count(), stats["chunks"])
+        self.assertEqual(stats["stages"]["extract"]["chunks"], stats["chunks"])
+        self.assertEqual(set(self.manifest.files), set(files))
+
+    def test_embedding_failure_is_not_recorded(self):
+        """Test that files that fail to embed are retried on the next run."""
+        files = discover_files(self.docs)
+
+        with patch("src.pipeline.embed_with_retry", return_value=[]):
+            stats = run_pipeline(files, self.collection, self.manifest, self.docs)
+
+        self.assertEqual(stats["failed"], 6)
+        self.assertEqual(self.manifest.files, {})
+    def test_writer_error_does_not_hang(self):
+        """Test that an error outside the guarded store calls stops the run instead of hanging it."""
+        files = discover_files(self.docs)
+        outcome = []
+
+        def run():
+            try:
+                run_pipeline(files, self.collection, self.manifest, self.docs, embed_workers=1, write_batch_size=1)
+            except OSError as e:
+                outcome.append(e)
+
+        # The writer thread is the first to save the manifest
+        with patch("src.pipeline.embed_with_retry", side_effect=_fake_embed), \
+             patch("src.pipeline.remove_deleted_files", return_value=0), \
+             patch.object(Manifest, "save", side_effect=OSError("disk full")):
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            thread.join(timeout=60)
+
+        self.assertFalse(thread.is_alive(), "run_pipeline hung")
+        self.assertEqual(len(outcome), 1)
+        self.assertTrue(Checkpoint.for_store(self.temp_dir.name).interrupted)
+
+    def test_interrupted_run_resumes(self):
+        """Test that a rerun skips finished files and re-embeds only unwritten chunks."""
+        files = discover_files(self.docs)
+        real_add = pipeline.add_texts
+        calls = []
+
+        def flaky_add(*args):
+            calls.append(args[1])
+            if len(calls) > 5:
+                raise RuntimeError("store went away")
+            real_add(*args)
+
+        # A crash never reaches the end of the run, where the checkpoint is deleted
+        with patch("src.pipeline.embed_with_retry", side_effect=_fake_embed), \
+             patch("src.pipeline.add_texts", side_effect=flaky_add), \
+             patch.object(Checkpoint, "close"):
+            run_pipeline(files, self.collection, self.manifest, self.docs, write_batch_size=1)
+        checkpoint = Checkpoint.for_store(self.temp_dir.name)
+        self.assertTrue(checkpoint.interrupted)
+
+        embedded = []
+        with patch("src.pipeline.embed_with_retry", side_effect=lambda chunks: embedded.extend(chunks) or _fake_embed(chunks)):
+            stats = run_pipeline(files, self.collection, self.manifest, self.docs, incremental=False)
+
+        self.assertEqual(stats["failed"], 0)
+        self.assertEqual(stats["ingested"] + stats["resumed"], 6)
+        self.assertGreaterEqual(stats["resumed"], 1)
+        self.assertEqual(len(embedded), self.collection.count() - 5)
+        self.assertEqual(sum(entry["chunks"] for entry in self.manifest.files.values()), self.collection.count())
+        self.assertFalse(os.path.exists(checkpoint.path))
+
+    def test_torn_checkpoint_tail_is_dropped(self):
+        """Test that a partial last record is ignored and cut off."""
+        path = os.path.join(self.temp_dir.name, "checkpoint.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"op":"file","path":"a.txt","sha256":"x"}\n{"op":"batch","path":"a.txt","ids":["a_0')
+
+        checkpoint = Checkpoint(path)
+        checkpoint.write_batch("a.txt", ["a_1"])
+        checkpoint.close(completed=False)
+
+        reloaded = Checkpoint(path)
+        self.assertTrue(reloaded.resumes("a.txt", "x"))
+        self.assertEqual(reloaded.written["a.txt"], {"a_1"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Tests for quantized vector codes in the NumPy store."""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src import numpy_store
+from src.numpy_store import NumpyCollection
+from src.quantization import Int8Quantizer, ProductQuantizer
+
+def _clustered(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(16, dim))
+    vectors = centers[rng.integers(0, 16, n)] + 0.4 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def _exact(vectors, query, k):
+    return set(np.argsort(-(vectors @ query))[:k].tolist())
+
+class TestQuantizers(unittest.TestCase):
+
+    def test_int8_scores_close_to_exact(self):
+        """Test that int8 codes preserve inner products closely."""
+        vectors = _clustered(200)
+        quantizer = Int8Quantizer(32)
+        codes, scales = quantizer.encode(vectors)
+
+        approx = quantizer.scores(quantizer.prepare(vectors[0]), codes, scales)
+
+        self.assertEqual(codes.dtype, np.int8)
+        np.testing.assert_allclose(approx, vectors @ vectors[0], atol=0.02)
+
+    def test_pq_codes_and_scores(self):
+        """Test that product quantization packs rows into one byte per subvector."""
+        vectors = _clustered(2000)
+        quantizer = ProductQuantizer(32, subvectors=6)
+        quantizer.train(vectors, np.random.default_rng(0))
+        codes, _ = quantizer.encode(vectors)
+
+        approx = quantizer.scores(quantizer.prepare(vectors[0]), codes)
+
+        self.assertEqual(codes.shape, (2000, 6))
+        self.assertEqual(quantizer.width, 6)  # 32 dims padded to 36
+        self.assertGreater(np.corrcoef(approx, vectors @ vectors[0])[0, 1], 0.95)
+
+class TestQuantizedCollection(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, "numpy_test")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _fill(self, collection, vectors):
+        ids = [str(i) for i in range(len(vectors))]
+        collection.upsert(ids, ids, [{}] * len(ids), vectors.tolist())
+
+    def _recall(self, collection, vectors, k=10):
+        found = 0
+        for i in range(0, len(vectors), len(vectors) // 20):
+            hits = collection.query(query_embeddings=[vectors[i].tolist()], n_results=k)
+            found += len({int(h) for h in hits["ids"][0]} & _exact(vectors, vectors[i], k))
+        return found / (20 * k)
+
+    def test_int8_search_reranks_exactly(self):
+        """Test that int8 search returns exact distances after re-ranking."""
+        vectors = _clustered(1000)
+        collection = NumpyCollection("test", self.directory, quantization="int8")
+        self._fill(collection, vectors)
+
+        hits = collection.query(query_embeddings=[vectors[3].tolist()], n_results=5)
+
+        self.assertEqual(hits["ids"][0][0], "3")
+        self.assertAlmostEqual(hits["distances"][0][0], 0.0, places=5)
+        self.assertGreaterEqual(self._recall(collection, vectors), 0.95)
+
+    @patch.object(numpy_store, "PQ_MIN_ROWS", 1000)
+    def test_pq_trains_once_large_enough(self):
+        """Test that PQ codes are trained at PQ_MIN_ROWS and keep recall high."""
+        vectors = _clustered(2000)
+        collection = NumpyCollection("test", self.directory, quantization="pq", subvectors=8, rerank=8)
+        self._fill(collection, vectors[:500])
+        self.assertFalse(collection._codes_ready())
+
+        self._fill(collection, vectors)
+
+        self.assertTrue(collection._codes_ready())
+        self.assertGreaterEqual(self._recall(collection, vectors), 0.9)
+
+    def test_enabling_quantization_encodes_existing_rows(self):
+        """Test that reopening an exact collection with int8 codes every stored row on the next write."""
+        vectors = _clustered(300)
+        collection = NumpyCollection("test", self.directory)
+        self._fill(collection, vectors)
+        collection.close()
+
+        quantized = NumpyCollection("test", self.directory, quantization="int8")
+
+        # Reads search exactly rather than encode
+        self.assertFalse(quantized._codes_ready())
+        self.assertEqual(quantized.query(query_embeddings=[vectors[7].tolist()], n_results=1)["ids"][0], ["7"])
+        self.assertFalse(quantized._codes_ready())
+
+        quantized.build_index()
+
+        self.assertTrue(quantized._codes_ready())
+        self.assertTrue(np.any(np.asarray(quantized._codes[:300]) != 0))
+        self.assertEqual(quantized.query(query_embeddings=[vectors[7].tolist()], n_results=1)["ids"][0], ["7"])
+
+    @patch.object(numpy_store, "PQ_MIN_ROWS", 200)
+    def test_reads_do_not_train(self):
+        """Test that query() and count() never train codebooks, and the next upsert does."""
+        vectors = _clustered(300)
+        collection = NumpyCollection("test", self.directory)
+        self._fill(collection, vectors)
+        collection.close()
+
+        quantized = NumpyCollection("test", self.directory, quantization="pq", subvectors=8)
+        with patch.object(NumpyCollection, "_train_codes", side_effect=AssertionError("trained on read")):
+            self.assertEqual(quantized.count(), 300)
+            self.assertEqual(quantized.query(query_embeddings=[vectors[5].tolist()], n_results=1)["ids"][0], ["5"])
+
+        quantized.upsert(["new"], ["new"], [{}], [vectors[0].tolist()])
+
+        self.assertTrue(quantized._codes_ready())
+
+if __name__ == '__main__':
+    unittest.main()
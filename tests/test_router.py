@@ -0,0 +1,120 @@
+"""Tests for routing Ollama requests across several servers."""
+import asyncio
+import unittest
+from contextlib import ExitStack
+
+from benchmarks.fake_ollama import FakeOllama
+from src.async_ollama import AsyncOllamaClient
+from src.ollama_client import OllamaClient
+from src.router import CircuitOpenError, EndpointRouter
+
+def _embed(client, text="hello"):
+    response = client.post("/api/embed", json={"model": "m", "input": [text]}, timeout=5)
+    response.raise_for_status()
+    return response
+
+class TestEndpointRouter(unittest.TestCase):
+
+    def test_least_outstanding(self):
+        """Test that each request goes to the server with the fewest in flight."""
+        router = EndpointRouter(["http://a", "http://b", "http://c"])
+
+        held = [router.acquire("embed") for _ in range(3)]
+        self.assertEqual(sorted(e.url for e in held), ["http://a", "http://b", "http://c"])
+
+        router.release(held[1], "embed", 0.0, ok=True)
+        self.assertIs(router.acquire("embed"), held[1])
+
+    def test_roles(self):
+        """Test that embeddings and chat only go to the servers configured for them."""
+        router = EndpointRouter(["http://embed"], ["http://chat"])
+
+        self.assertEqual({router.acquire("embed").url for _ in range(4)}, {"http://embed"})
+        self.assertEqual({router.acquire("chat").url for _ in range(4)}, {"http://chat"})
+
+    def test_all_open_fails_fast(self):
+        """Test that acquire() refuses once every server for the role is out."""
+        router = EndpointRouter(["http://a", "http://b"])
+        for endpoint in router.endpoints:
+            endpoint.breaker.trip()
+
+        with self.assertRaises(CircuitOpenError):
+            router.acquire("embed")
+
+class TestRoutingAcrossServers(unittest.TestCase):
+
+    def setUp(self):
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        self.servers = [stack.enter_context(FakeOllama(dim=4, request_latency=0, item_latency=0, first_token_latency=0, answer_tokens=2)) for _ in range(3)]
+        self.urls = [server.url for server in self.servers]
+
+    def test_requests_spread_over_servers(self):
+        """Test that sequential requests take turns and per-server stats add up."""
+        client = OllamaClient(base_url=self.urls, retries=0)
+
+        for i in range(9):
+            _embed(client, f"text {i}")
+
+        self.assertEqual([server.requests for server in self.servers], [3, 3, 3])
+        stats = client.router.stats()
+        self.assertEqual([s["requests"] for s in stats], [3, 3, 3])
+        self.assertTrue(all(s["outstanding"] == 0 and s["mean_ms"] is not None for s in stats))
+
+    def test_failed_server_is_ejected_and_readmitted(self):
+        """Test that requests avoid a broken server until it answers its health check again."""
+        router = EndpointRouter(self.urls)
+        client = OllamaClient(router=router, retries=2, backoff=0)
+        self.servers[1].failing = True
+
+        # A failed attempt is retried on another server straight away
+        for i in range(6):
+            _embed(client, f"text {i}")
+        router.probe()
+        self.assertEqual([s["state"] for s in router.stats()], ["closed", "open", "closed"])
+
+        before = self.servers[1].requests
+        for i in range(6):
+            _embed(client, f"again {i}")
+        self.assertEqual(self.servers[1].requests, before)
+
+        self.servers[1].failing = False
+        router.probe()
+        for i in range(6):
+            _embed(client, f"back {i}")
+        self.assertGreater(self.servers[1].requests, before)
+        self.assertEqual(router.stats()[1]["ejections"], 1)
+
+    def test_stream_holds_server_until_closed(self):
+        """Test that a streamed chat answer counts as outstanding until it is closed."""
+        router = EndpointRouter(self.urls[:1], self.urls[1:2])
+        client = OllamaClient(router=router, retries=0)
+
+        with client.post("/api/chat", json={"model": "m", "messages": []}, timeout=5, stream=True) as response:
+            self.assertEqual(router.stats()[1]["outstanding"], 1)
+            list(response.iter_lines())
+
+        self.assertEqual(router.stats()[1]["outstanding"], 0)
+        self.assertEqual([server.requests for server in self.servers], [0, 1, 0])
+
+    def test_async_client_routes_by_role(self):
+        """Test that the async client sends embeddings and chat to their own servers."""
+        router = EndpointRouter(self.urls[:2], self.urls[2:])
+
+        async def main():
+            client = AsyncOllamaClient(router=router, query_batching=False)
+            try:
+                await client._fetch_embeddings(["a"] * 40)
+                return await client.chat([{"role": "user", "content": "hi"}])
+            finally:
+                await client.aclose()
+
+        answer = asyncio.run(main())
+
+        self.assertEqual(answer, "tok0 tok1 ")
+        self.assertGreater(self.servers[0].requests, 0)
+        self.assertGreater(self.servers[1].requests, 0)
+        self.assertEqual(self.servers[2].requests, 1)
+
+if __name__ == "__main__":
+    unittest.main()
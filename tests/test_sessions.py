@@ -0,0 +1,117 @@
+"""Tests for multi-turn chat sessions."""
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from src import rag
+from src.sessions import SessionStore
+
+def _context(chunk, text=None):
+    return text or f"chunk {chunk} text", {"source": "a.txt", "file_path": "/docs/a.txt", "chunk": chunk, "score": 0.9}
+
+class FakeClient:
+    """Records the messages of every chat request."""
+
+    def __init__(self, fail=False):
+        self.requests = []
+        self.fail = fail
+
+    async def chat_stream(self, messages):
+        self.requests.append(messages)
+        if self.fail:
+            raise RuntimeError("Ollama is down")
+        yield f"answer {len(self.requests)}"
+
+class TestSessionStore(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        """Test that the least recently used session is evicted first."""
+        store = SessionStore(max_sessions=2)
+        first, second = store.create(), store.create()
+        store.get(first.id)
+
+        store.create()
+
+        self.assertIsNotNone(store.get(first.id))
+        self.assertIsNone(store.get(second.id))
+        self.assertEqual(store.stats()["evictions"], 1)
+
+    def test_expiry(self):
+        """Test that idle sessions expire."""
+        store = SessionStore(ttl_seconds=10)
+        with patch("src.sessions.time.time", return_value=1000.0):
+            session = store.create()
+        with patch("src.sessions.time.time", return_value=1011.0):
+            self.assertIsNone(store.get(session.id))
+        self.assertEqual(store.stats()["expirations"], 1)
+
+    def test_turns_are_bounded(self):
+        """Test that only the last max_turns turns are kept, and their chunks."""
+        session = SessionStore(max_turns=2).create()
+        for i in range(3):
+            session.add_turn(f"q{i}", f"a{i}", [f"c{i}"], 1)
+
+        self.assertEqual([m["content"] for m in session.messages()], ["q1", "a1", "q2", "a2"])
+        self.assertEqual(session.chunk_ids, {"c1", "c2"})
+        self.assertEqual(session.citations, 3)
+
+class TestSessionAnswers(unittest.TestCase):
+
+    def _ask(self, session, client, question, chunk_ids, contexts):
+        async def retrieve(*args, **kwargs):
+            return [0.1], chunk_ids, contexts
+
+        with patch.object(rag, "_retrieve_async", retrieve):
+            return asyncio.run(rag.answer_in_session_async(question, session, None, client, 5))
+
+    def test_follow_up_extends_previous_prompt(self):
+        """Test that a follow-up resends the earlier turn unchanged and only new chunks."""
+        session = SessionStore().create()
+        client = FakeClient()
+
+        self._ask(session, client, "First?", ["c1", "c5"], [_context(1), _context(5)])
+        answer, sources = self._ask(session, client, "Second?", ["c5", "c9"], [_context(5), _context(9)])
+
+        first, second = client.requests
+        self.assertEqual(second[:len(first)], first)
+        self.assertEqual(second[len(first)], {"role": "assistant", "content": "answer 1"})
+        follow_up = second[-1]["content"]
+        self.assertIn("[3] From: a.txt (chunk 9)", follow_up)
+        self.assertNotIn("chunk 5 text", follow_up)
+        self.assertEqual(answer, "answer 2")
+        self.assertEqual([source["chunk"] for source in sources], [9])
+        self.assertEqual(session.chunk_ids, {"c1", "c5", "c9"})
+
+    def test_follow_up_without_new_context(self):
+        """Test that a follow-up is answered from earlier context when nothing new is found."""
+        session = SessionStore().create()
+        client = FakeClient()
+
+        self._ask(session, client, "First?", ["c1"], [_context(1)])
+        answer, sources = self._ask(session, client, "And then?", ["c1"], [_context(1)])
+
+        self.assertEqual((answer, sources), ("answer 2", []))
+        self.assertIn("No new context", client.requests[1][-1]["content"])
+
+    def test_no_context_skips_llm(self):
+        """Test that a first question without context is not sent to the LLM."""
+        session = SessionStore().create()
+        client = FakeClient()
+
+        answer, _ = self._ask(session, client, "Unrelated?", [], [])
+
+        self.assertEqual(answer, rag.NO_ANSWER)
+        self.assertEqual(client.requests, [])
+        self.assertEqual(session.turns, [])
+
+    def test_failed_turn_not_recorded(self):
+        """Test that a turn whose generation failed leaves the session unchanged."""
+        session = SessionStore().create()
+
+        with self.assertRaises(RuntimeError):
+            self._ask(session, FakeClient(fail=True), "First?", ["c1"], [_context(1)])
+
+        self.assertEqual(session.turns, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Tests for sharded stores."""
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from src import store
+from src.shards import ShardedCollection, list_shards, shard_dir, shard_of
+from src.store import (
+    add_texts, clear_collection, collection_version, get_client, get_or_create_collection,
+    lexical_query_with_ids, open_collection, query_with_ids
+)
+
+def _records(n, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    ids = [f"c{i}" for i in range(n)]
+    documents = [f"chunk {i} about {'billing' if i % 2 else 'firmware'}" for i in range(n)]
+    metadatas = [{"source": f"f{i}.txt", "file_path": f"/docs/f{i}.txt"} for i in range(n)]
+    return ids, documents, metadatas, vectors
+
+class TestShardRouting(unittest.TestCase):
+
+    def test_hash_routing(self):
+        """Test that files spread over the configured shards, independent of the folder's location."""
+        names = {shard_of(f"/docs/file{i}.txt", "/docs", shards=4, by="hash") for i in range(50)}
+
+        self.assertEqual(names, {"shard_00", "shard_01", "shard_02", "shard_03"})
+        self.assertEqual(
+            shard_of("/docs/a/b.txt", "/docs", shards=4, by="hash"),
+            shard_of("/srv/docs/a/b.txt", "/srv/docs", shards=4, by="hash")
+        )
+
+    def test_folder_routing(self):
+        """Test that each top-level folder is a shard and loose files share one."""
+        self.assertEqual(shard_of("/docs/billing/2024/a.txt", "/docs", by="folder"), "billing")
+        self.assertEqual(shard_of("/docs/readme.md", "/docs", by="folder"), "_root")
+
+class TestShardedCollection(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.mode = patch.object(store, "RETRIEVAL_MODE", "dense")
+        self.mode.start()
+
+    def tearDown(self):
+        self.mode.stop()
+        self.temp_dir.cleanup()
+
+    def _shard(self, name):
+        return get_or_create_collection(get_client(shard_dir(name, self.root), backend="numpy"))
+
+    def _fill(self, count=30, shards=3):
+        ids, documents, metadatas, vectors = _records(count)
+        collections = {f"shard_{s:02d}": self._shard(f"shard_{s:02d}") for s in range(shards)}
+        for s, collection in enumerate(collections.values()):
+            rows = range(s, count, shards)
+            add_texts(collection, [ids[i] for i in rows], [documents[i] for i in rows],
+                      [metadatas[i] for i in rows], [vectors[i].tolist() for i in rows])
+        return collections, vectors
+
+    def test_query_merges_top_k(self):
+        """Test that the merged top k equal a search over all chunks together."""
+        shards, vectors = self._fill()
+        whole = get_or_create_collection(get_client(os.path.join(self.root, "whole"), backend="numpy"))
+        ids, documents, metadatas, _ = _records(30)
+        add_texts(whole, ids, documents, metadatas, vectors.tolist())
+
+        sharded = ShardedCollection(shards, self.root)
+
+        self.assertEqual(sharded.count(), 30)
+        expected, _ = query_with_ids(whole, vectors[4].tolist(), k=6)
+        chunk_ids, contexts = query_with_ids(sharded, vectors[4].tolist(), k=6)
+        self.assertEqual(chunk_ids, expected)
+        scores = [metadata["score"] for _, metadata in contexts]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_failed_shard_is_skipped(self):
+        """Test that the other shards keep answering when one fails."""
+        shards, vectors = self._fill()
+        broken = MagicMock()
+        broken.query.side_effect = RuntimeError("rebuilding")
+        sharded = ShardedCollection({**shards, "shard_03": broken}, self.root)
+
+        chunk_ids, _ = query_with_ids(sharded, vectors[0].tolist(), k=3)
+
+        self.assertEqual(chunk_ids[0], "c0")
+
+    def test_lexical_search_across_shards(self):
+        """Test that BM25 hits from every shard are merged by score."""
+        shards, _ = self._fill(count=12)
+
+        with patch.object(store, "LEXICAL_INDEX_ENABLED", True):
+            chunk_ids, contexts = lexical_query_with_ids(ShardedCollection(shards, self.root), "billing", k=20)
+
+        self.assertEqual(sorted(chunk_ids), sorted(f"c{i}" for i in range(1, 12, 2)))
+        scores = [metadata["bm25"] for _, metadata in contexts]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_open_and_version(self):
+        """Test that a store with shards opens sharded, and its version follows every shard."""
+        shards, _ = self._fill(count=6, shards=2)
+
+        self.assertEqual(list_shards(self.root), ["shard_00", "shard_01"])
+        with patch.object(store, "get_client", lambda path: get_client(path, backend="numpy")):
+            self.assertIsInstance(open_collection(self.root), ShardedCollection)
+
+        before = collection_version(self.root)
+        self.assertEqual(clear_collection(shards["shard_01"]), 3)
+        self.assertEqual(shards["shard_01"].count(), 0)
+        self.assertNotEqual(collection_version(self.root), before)
+
+    def test_writes_are_rejected(self):
+        """Test that writing through the sharded view fails instead of picking a shard."""
+        shards, _ = self._fill(count=3, shards=1)
+
+        with self.assertRaises(RuntimeError):
+            ShardedCollection(shards, self.root).upsert(ids=["x"])
+
+if __name__ == "__main__":
+    unittest.main()
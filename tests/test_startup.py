@@ -0,0 +1,62 @@
+"""Tests for lazy imports, the cached collection and the startup warm-up."""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import store
+from src.store import add_texts, get_collection, warm_up
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = patch.object(store, "VECTOR_BACKEND", "numpy")
+        self.backend.start()
+
+    def tearDown(self):
+        self.backend.stop()
+        store._collections.clear()
+        self.temp_dir.cleanup()
+
+    def test_heavy_dependencies_not_imported(self):
+        """Test that importing the query path does not load chromadb, NLTK or pypdf."""
+        code = (
+            "import sys, src.rag, src.pipeline\n"
+            "print(','.join(m for m in ('chromadb', 'nltk', 'pypdf') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_get_collection_is_cached(self):
+        """Test that the collection is opened once per directory and name."""
+        with patch.object(store, "get_or_create_collection", wraps=store.get_or_create_collection) as opened:
+            first = get_collection(self.temp_dir.name, "startup_test")
+            second = get_collection(self.temp_dir.name, "startup_test")
+            other = get_collection(self.temp_dir.name, "startup_other")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(opened.call_count, 2)
+
+    def test_warm_up(self):
+        """Test that warming up an empty or populated store succeeds."""
+        collection = get_collection(self.temp_dir.name, "startup_test")
+        with patch.object(store, "RETRIEVAL_MODE", "dense"):
+            self.assertIn("vector_index", warm_up(collection))
+
+            add_texts(collection, ["c0", "c1"], ["alpha", "beta"],
+                      [{"source": "a.txt"}, {"source": "b.txt"}], [[1.0, 0.0], [0.0, 1.0]])
+            timings = warm_up(collection)
+
+        self.assertNotIn("lexical_index", timings)
+        self.assertGreaterEqual(timings["vector_index"], 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
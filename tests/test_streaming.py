@@ -0,0 +1,71 @@
+"""Tests for streamed chat responses."""
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src import llm, rag
+
+def _ndjson(*pieces, done=True):
+    lines = [json.dumps({"message": {"content": p}, "done": False}).encode() for p in pieces]
+    lines.append(json.dumps({"message": {"content": ""}, "done": done}).encode())
+    return lines
+
+class TestChatStream(unittest.TestCase):
+
+    def _mock_post(self, lines):
+        response = MagicMock()
+        response.iter_lines.return_value = iter(lines)
+        response.__enter__.return_value = response
+        client = MagicMock()
+        client.post.return_value = response
+        return patch.object(llm, "get_ollama_client", return_value=client), response
+
+    def test_tokens_are_yielded_in_order(self):
+        """Test that chat_stream yields each content piece as it arrives."""
+        patcher, _ = self._mock_post([b"", b"not json"] + _ndjson("Hel", "lo", "!"))
+
+        with patcher:
+            self.assertEqual(list(llm.chat_stream([])), ["Hel", "lo", "!"])
+
+    def test_chat_joins_stream(self):
+        """Test that chat returns the full answer."""
+        patcher, _ = self._mock_post(_ndjson("Hel", "lo"))
+
+        with patcher:
+            self.assertEqual(llm.chat([]), "Hello")
+
+    def test_closing_generator_closes_response(self):
+        """Test that abandoning the stream releases the HTTP response."""
+        patcher, response = self._mock_post(_ndjson("a", "b", "c"))
+
+        with patcher:
+            stream = llm.chat_stream([])
+            next(stream)
+            stream.close()
+
+        response.__exit__.assert_called_once()
+
+class TestRetrieveAndAnswerStream(unittest.TestCase):
+
+    def test_sources_come_before_tokens(self):
+        """Test that sources are emitted first, then answer tokens."""
+        contexts = [("Some context.", {"source": "a.txt", "chunk": 1})]
+
+        with patch("src.store.query", return_value=contexts), \
+                patch.object(rag, "chat_stream", return_value=iter(["An", "swer"])):
+            events = list(rag.retrieve_and_answer_stream("Q?", collection=None))
+
+        self.assertEqual(events[0], ("sources", [{"source": "a.txt", "chunk": 1, "text": "Some context."}]))
+        self.assertEqual(events[1:], [("token", "An"), ("token", "swer")])
+
+    def test_no_context_skips_generation(self):
+        """Test that an empty retrieval yields the fallback answer without calling the LLM."""
+        with patch("src.store.query", return_value=[]), \
+                patch.object(rag, "chat_stream") as chat_stream:
+            events = list(rag.retrieve_and_answer_stream("Q?", collection=None))
+
+        self.assertEqual(events, [("sources", []), ("token", rag.NO_ANSWER)])
+        chat_stream.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()